@@ -6,15 +6,22 @@ from datetime import datetime, timezone
 from dotenv import load_dotenv
 from flask import Flask, request, g, Response
 from flask_cors import CORS
-from flask_jwt_extended import get_jwt_identity, get_jwt, create_access_token
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, get_jwt_request_location
 from werkzeug.exceptions import NotFound
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app.config import get_config
 from app.extensions import db, migrate, jwt
 from app.blueprints import auth_bp, students_bp, admins_bp, schools_bp, evaluations_bp, profile_bp
-from app.utils.responses import fail, ApiCodes
-from app.utils.exceptions import BizError
+from app.utils.responses import fail, fold_errors, ApiCodes, ApiResponse
+from app.utils.exceptions import BizError, HashBusyError
 from app.cli import register_cli
+from app.services.token_refresh import refreshed_tokens
+from app.services.token_blocklist import token_blocklist
+from app.utils.security import configure_password_hashing
+from app.services.versions import table_versions
+from app.services.snapshots import roster_snapshots
+from app.utils.compression import compress_response
 
 load_dotenv()
 def _looks_like_wrapped(obj: object) -> bool:
@@ -23,10 +30,18 @@ def _looks_like_wrapped(obj: object) -> bool:
 def create_app():
     app = Flask(__name__)
     app.config.from_object(get_config())
-    CORS(app, expose_headers=['X-Refreshed-Token'])
+    if app.config['TRUSTED_PROXY_COUNT']:
+        # 经 nginx 等代理转发时 remote_addr 是代理地址，按信任的层数取真实客户端 IP（登录失败计数按 IP 区分）
+        hops = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    CORS(app, expose_headers=['X-Refreshed-Token', 'X-Hash-Queue-Wait', 'Retry-After'])
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    configure_password_hashing(app)
+    table_versions.init_app(app)
+    token_blocklist.init_app(app)
+    roster_snapshots.init_app(app)
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(students_bp)
@@ -35,40 +50,40 @@ def create_app():
     app.register_blueprint(evaluations_bp)
     app.register_blueprint(profile_bp)
 
+    # after_request 按注册的逆序执行：压缩最先注册，才能在 _unify_response 等之后运行
+    app.after_request(compress_response)
+
     @app.after_request
     def refresh_expiring_jwt(response):
         """
         在每个请求后检查 JWT 是否即将过期，如果是则刷新它。
+        同一旧令牌（按 jti）在 JWT_REFRESH_CACHE_SECONDS 内只续签一次，并发请求拿到同一个新令牌。
         """
-        try:
-            # 获取当前 token 的过期时间戳 (exp)
-            exp_timestamp = get_jwt()["exp"]
-            now = datetime.now(timezone.utc)
-            target_timestamp = datetime.timestamp(now + app.config['JWT_REFRESH_IF_EXPIRES_IN'])
-
-            # 如果 token 的过期时间在我们的“刷新窗口”内
-            if target_timestamp > exp_timestamp:
-                # 生成一个新的 access_token
-                identity = get_jwt_identity()
-                # 重新调用 /auth/refresh 接口的逻辑来获取新的 claims
-                # (这里为了简化，我们只保留了最核心的 identity)
-                # 在实际复杂业务中，您可能需要重新查询用户以获取完整的 claims
-                claims = get_jwt()
-                # 过滤掉旧的过期时间等信息
-                claims_to_keep = {k: v for k, v in claims.items() if k not in ['exp', 'iat', 'nbf', 'jti']}
-
-                new_token = create_access_token(identity=identity, additional_claims=claims_to_keep)
-                # 将新 token 放入响应头中
-                response.headers.set('X-Refreshed-Token', new_token)
-
+        # 没经过 jwt_required 的接口（匿名接口、登录等）或可选认证未带令牌时没有已解码的 JWT，直接跳过
+        if get_jwt_request_location() is None:
             return response
-        except (RuntimeError, KeyError):
-            # 异常处理：
-            # RuntimeError: 在请求上下文之外，或者请求的接口不需要认证 (没有有效的JWT)
-            # KeyError: 'exp' 字段不存在 (例如在一个 refresh_token 中)
-            # 对于这些情况，我们直接返回原始响应，不做任何处理
+        claims = get_jwt()
+        # refresh token 由 /auth/refresh 换取，缺少 exp 的令牌同样不处理
+        if claims.get('type') == 'refresh' or 'exp' not in claims or 'jti' not in claims:
             return response
 
+        now = datetime.now(timezone.utc)
+        target_timestamp = datetime.timestamp(now + app.config['JWT_REFRESH_IF_EXPIRES_IN'])
+
+        # 如果 token 的过期时间在我们的“刷新窗口”内
+        if target_timestamp > claims['exp']:
+            # 过滤掉旧的过期时间等信息，只保留业务 claims
+            claims_to_keep = {k: v for k, v in claims.items() if k not in ['exp', 'iat', 'nbf', 'jti']}
+            identity = get_jwt_identity()
+            new_token = refreshed_tokens.get_or_mint(
+                claims['jti'],
+                app.config['JWT_REFRESH_CACHE_SECONDS'],
+                lambda: create_access_token(identity=identity, additional_claims=claims_to_keep),
+            )
+            # 将新 token 放入响应头中
+            response.headers.set('X-Refreshed-Token', new_token)
+        return response
+
 
     @app.get("/ping")
     def ping():
@@ -76,7 +91,21 @@ def create_app():
 
     @app.errorhandler(BizError)
     def handle_biz_error(e: BizError):
-        return fail(ApiCodes.BAD_REQUEST, str(e))
+        return fail(ApiCodes.BAD_REQUEST, e.description)
+
+    @app.errorhandler(HashBusyError)
+    def handle_hash_busy(e: HashBusyError):
+        resp, status = fail(ApiCodes.SERVICE_UNAVAILABLE, e.description, http_status=e.code)
+        resp.headers['Retry-After'] = '1'
+        return resp, status
+
+    @app.after_request
+    def _expose_hash_wait(resp: Response):
+        # 本次请求在 bcrypt 线程池中的排队时间（毫秒）
+        wait_ms = g.get('hash_queue_wait_ms')
+        if wait_ms is not None:
+            resp.headers['X-Hash-Queue-Wait'] = f'{wait_ms:.1f}'
+        return resp
 
     @app.errorhandler(404)
     def handle_404(e):
@@ -111,6 +140,11 @@ def create_app():
     def _expired_token(jwt_header, jwt_data):
         return fail(ApiCodes.UNAUTHORIZED, "令牌已过期")
 
+    @jwt.token_in_blocklist_loader
+    def _check_revoked(jwt_header, jwt_data):
+        # 纯内存判断，撤销记录由后台线程增量同步
+        return token_blocklist.is_revoked(jwt_data)
+
     @jwt.revoked_token_loader
     def _revoked_token(jwt_header, jwt_data):
         return fail(ApiCodes.UNAUTHORIZED, "令牌已撤销")
@@ -120,13 +154,19 @@ def create_app():
         if getattr(g, 'no_wrapper', False):
             return resp
 
-        # 2) 文件/流/直通响应跳过（如 send_file）
+        # 2) success()/fail() 返回的统一结构：已在 Python 对象上完成包装，直接放行
+        if isinstance(resp, ApiResponse):
+            return resp
+
+        # 3) 304/204 不能带响应体；文件/流/直通响应跳过（如 send_file）
+        if resp.status_code in (204, 304):
+            return resp
         if resp.direct_passthrough or resp.is_streamed:
             return resp
 
         ctype = (resp.mimetype or '').lower()
 
-        # 3) 空响应体：包装成功
+        # 4) 空响应体：包装成功
         raw_text = resp.get_data(as_text=True) if resp.data is not None else ''
         if (not raw_text) and (ctype in ('', 'text/plain', 'application/octet-stream')):
             # 空则包装为 success
@@ -134,17 +174,15 @@ def create_app():
             resp.set_data(json.dumps(wrapped, ensure_ascii=False))
             resp.mimetype = 'application/json'
             return resp
-        # 4) 已经是 JSON 的处理
+        # 5) 视图直接返回 dict/list 等 JSON 的处理
         if ctype == 'application/json':
             try:
                 obj = json.loads(raw_text) if raw_text else {}
             except Exception:
                 # 不是合法 JSON，就别动它
                 return resp
-            if 'errors' in obj:
-                for _, error in obj['errors'].items():
-                    obj['msg'] = obj['msg'] + "," + ",".join(error)
-                del obj['errors']
+            if isinstance(obj, dict) and 'errors' in obj:
+                fold_errors(obj)
                 resp.set_data(json.dumps(obj, ensure_ascii=False))
             # 已是统一结构 → 直接返回
 
@@ -164,15 +202,14 @@ def create_app():
             resp.set_data(json.dumps(new_body, ensure_ascii=False))
             return resp
 
-        # 5) 文本 → 包一层并改为 JSON
-        # 5) 文本 → 包一层并改为 JSON，但 HTML 保持原样
+        # 6) 文本 → 包一层并改为 JSON，但 HTML 保持原样
         if ctype.startswith('text/') and ctype != 'text/csv':
             new_body = {'success': True, 'code': 0, 'msg': '成功', 'data': raw_text}
             resp.set_data(json.dumps(new_body, ensure_ascii=False))
             resp.mimetype = 'application/json'
             return resp
 
-        # 6) 其他类型（比如 html、xml、图片等）默认不动
+        # 7) 其他类型（比如 html、xml、图片等）默认不动
         return resp
     register_cli(app)
     return app
@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import request
+from flask import request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from marshmallow import ValidationError
 from sqlalchemy import or_
@@ -7,18 +7,22 @@ from sqlalchemy.orm import selectinload
 
 from app.blueprints import admins_bp
 from app.models import AdminSchoolMap
+from app.services.projections import project_admins, admin_rows
 from app.services.admin_school import bind_schools_to_admin, replace_admin_schools, ensure_schools_exist_or_400
 from app.utils.model import update_model_fields
-from app.utils.pagination import get_pagination, page_result
+from app.utils.pagination import get_pagination, page_result, paginate, get_cursor, keyset_paginate, cursor_result
 from app.utils.responses import success, fail, ApiCodes
 from app.models.admin import Admin
 from app.schemas.admin import AdminSchema, AdminUpdateSchema, AdminShowSchema
+from app.schemas.compiler import compile_schema
+from app.schemas.validators import compiled_loader
 from app.extensions import db
 from app.utils.security import hash_password, ROLE_ADMIN, ROLE_SUPERADMIN
 
 admin_schema = AdminSchema()
-admin_update_schema = AdminUpdateSchema()
+admin_update_loader = compiled_loader(AdminUpdateSchema)
 admins_show_schema = AdminShowSchema(many=True)
+dump_admins = compile_schema(AdminShowSchema, many=True)
 admins_schema = AdminSchema(many=True)
 
 def admin_required(fn):
@@ -48,18 +52,29 @@ def list_admins():
     account = (request.args.get('account') or '').strip()
     name = (request.args.get('display_name') or '').strip()
     page, size = get_pagination()
-    q = (Admin.query.filter_by(is_deleted=False)
-         .options(selectinload(Admin.school_maps).load_only(
-             AdminSchoolMap.school_id, AdminSchoolMap.is_deleted
-         ))
-         .order_by(Admin.created_at.desc()))
+    q = Admin.query.filter_by(is_deleted=False).order_by(Admin.created_at.desc())
     q = q.filter(
         Admin.account.ilike(f'%{account}%'),
         Admin.display_name.ilike(f'%{name}%'),
         Admin.id.notilike(f'%SUPER%'),
     )
-    p = q.paginate(page=page, per_page=size, error_out=False)
-    data = page_result(p, admins_show_schema.dump(p.items))
+    # 开启投影时只查列表所需的列，学校绑定用一条查询批量补齐
+    projection = current_app.config['LIST_PROJECTION_ADMINS']
+    if projection:
+        q = project_admins(q)
+    else:
+        q = q.options(selectinload(Admin.school_maps).load_only(
+            AdminSchoolMap.school_id, AdminSchoolMap.is_deleted
+        ))
+    cursor = get_cursor()
+    if cursor is not None:
+        rows, has_more = keyset_paginate(q, Admin.created_at, Admin.id, size, cursor)
+        items = admin_rows(rows) if projection else rows
+        return success(cursor_result(items, dump_admins(items), size, has_more))
+
+    p = paginate(q, page, size, ('admins',))
+    items = admin_rows(p.items) if projection else p.items
+    data = page_result(p, dump_admins(items))
     return success(data)
 
 @admins_bp.post('')
@@ -90,7 +105,7 @@ def update_admin(aid: str):
     if json_data is None:
         return fail(ApiCodes.BAD_REQUEST, "请求体必须为 JSON（Content-Type: application/json）")
     try:
-        data = admin_update_schema.load(json_data)  # ✅ 中文校验提示
+        data = admin_update_loader.load(json_data)  # ✅ 中文校验提示
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
     exists = Admin.query.filter(
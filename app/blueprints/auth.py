@@ -1,17 +1,19 @@
 # app/blueprints/auth.py
 from flask import request
+from sqlalchemy import or_, and_
 from flask_jwt_extended import (
     create_access_token, create_refresh_token,
-    jwt_required, get_jwt_identity, get_jwt
+    jwt_required, get_jwt_identity, get_jwt, decode_token
 )
 from app.blueprints import auth_bp
 from app.utils.responses import success, fail, ApiCodes
 from app.models.student import Student
 from app.models.admin import Admin
-# ✨ 新增导入
-from app.models.school import School
+from app.services.school_alias import school_alias_index
+from app.services.login_guard import login_guard
+from app.services.token_blocklist import token_blocklist
 from app.extensions import db
-from app.utils.security import verify_password, ROLE_ADMIN, ROLE_STUDENT, ROLE_SUPERADMIN, is_super_id
+from app.utils.security import verify_and_update, ROLE_ADMIN, ROLE_STUDENT, ROLE_SUPERADMIN, is_super_id
 
 
 @auth_bp.post('/login')
@@ -24,25 +26,28 @@ def login():
     if not account:
         return fail(ApiCodes.BAD_REQUEST, '用户名不能为空')
 
+    # 失败次数过多的账号或客户端 IP 直接拒绝，不查库、不跑 bcrypt
+    account_key = login_guard.account_key(user_type, account)
+    ip_key = login_guard.ip_key(request.remote_addr)
+    wait = login_guard.retry_after((account_key, ip_key))
+    if wait:
+        return _too_many_attempts(wait)
+
     if user_type == 'student':
         # --- ✨ 学生登录逻辑重构 ---
-        schools = School.query.filter_by(is_deleted=False).all()
+        # 1. 通过进程级别名索引把账号拆成 (学校, 学号) 候选，按别名从长到短排列
+        candidates = school_alias_index.candidates(account)
         user_obj = None
 
-        # 1. 遍历所有学校，匹配别名
-        for school in schools:
-            if account.startswith(school.alias):
-                student_number = account[len(school.alias):]
-
-                # 2. 根据 school_id 和 student_number 查找学生
-                user_obj = Student.query.filter_by(
-                    school_id=school.id,
-                    student_number=student_number,
-                    is_deleted=False
-                ).first()
-
-                if user_obj:
-                    break
+        # 2. 一次查询取回所有候选学生，按候选顺序取第一个命中的
+        if candidates:
+            rows = Student.query.filter(
+                Student.is_deleted.is_(False),
+                or_(*[and_(Student.school_id == school_id, Student.student_number == number)
+                      for school_id, number in candidates])
+            ).all()
+            found = {(r.school_id, r.student_number): r for r in rows}
+            user_obj = next((found[c] for c in candidates if c in found), None)
 
         # 3. 验证密码（处理密码为空的情况）
         password_ok = False
@@ -52,10 +57,14 @@ def login():
                 password_ok = True  # 密码为空时，直接验证通过
             # Case 2: 学生密码已设置，需要验证
             else:
-                password_ok = verify_password(password, user_obj.password_hash)
+                password_ok, new_hash = verify_and_update(password, user_obj.password_hash)
+                # 轮数与当前配置不一致时透明重算
+                if new_hash:
+                    user_obj.password_hash = new_hash
+                    db.session.commit()
 
         if not user_obj or not password_ok:
-            return fail(ApiCodes.BAD_REQUEST, '用户名或密码错误')
+            return _login_failed(user_obj, account_key, ip_key)
         # --- 登录逻辑重构结束 ---
 
         uid = str(user_obj.id)
@@ -65,7 +74,8 @@ def login():
             'type': 'student',
             'role': role,
             'account': user_obj.account,  # 使用 account 属性
-            'name': user_obj.name
+            'name': user_obj.name,
+            'school_id': user_obj.school_id,
         }
         user_view = {
             'id': uid,
@@ -75,8 +85,12 @@ def login():
 
     elif user_type == 'admin':
         user_obj = Admin.query.filter_by(account=account, is_deleted=False).first()
-        if not user_obj or not verify_password(password, user_obj.password_hash):
-            return fail(ApiCodes.BAD_REQUEST, '用户名或密码错误')
+        password_ok, new_hash = verify_and_update(password, user_obj.password_hash) if user_obj else (False, None)
+        if not password_ok:
+            return _login_failed(user_obj, account_key, ip_key)
+        if new_hash:
+            user_obj.password_hash = new_hash
+            db.session.commit()
 
         uid = str(user_obj.id)
         role = ROLE_SUPERADMIN if is_super_id(uid) else ROLE_ADMIN
@@ -97,8 +111,10 @@ def login():
     else:
         return fail(ApiCodes.BAD_REQUEST, '不支持的登录类型')
 
+    login_guard.record_success(account_key)
     access = create_access_token(identity=uid, additional_claims=claims)
-    refresh = create_refresh_token(identity=uid, additional_claims={'type': claims['type']})
+    # type 留给 JWT 标记令牌种类（refresh），用户类型放在 user_type
+    refresh = create_refresh_token(identity=uid, additional_claims={'user_type': claims['type']})
 
     return success({
         'access_token': access,
@@ -108,12 +124,30 @@ def login():
     })
 
 
+def _too_many_attempts(wait: int):
+    resp, status = fail(ApiCodes.TOO_MANY_REQUESTS, f'登录失败次数过多，请 {wait} 秒后再试', http_status=429)
+    resp.headers['Retry-After'] = str(wait)
+    return resp, status
+
+
+def _login_failed(user_obj, account_key: str, ip_key: str):
+    """
+    记录一次失败：计入客户端 IP，账号存在时同时计入账号。
+    这次失败使 IP 达到阈值时直接返回 429；账号的封禁在下次尝试时生效。
+    """
+    login_guard.record_failure(account_key if user_obj else None, ip_key)
+    wait = login_guard.retry_after((ip_key,))
+    if wait:
+        return _too_many_attempts(wait)
+    return fail(ApiCodes.BAD_REQUEST, '用户名或密码错误')
+
+
 @auth_bp.post('/refresh')
 @jwt_required(refresh=True)
 def refresh_token():
     uid = str(get_jwt_identity())
     j = get_jwt()
-    user_type = j.get('type', 'student')
+    user_type = j.get('user_type', 'student')
 
     if user_type == 'admin':
         admin = Admin.query.get(uid)
@@ -135,6 +169,7 @@ def refresh_token():
             'role': role,
             'account': stu.account if stu else None,
             'name': stu.name if stu else None,
+            'school_id': stu.school_id if stu else None,
         }
 
     access = create_access_token(identity=uid, additional_claims=claims)
@@ -148,4 +183,24 @@ def me():
     j = get_jwt()
     reserved = {'exp', 'iat', 'nbf', 'jti', 'type'}
     ext = {k: v for k, v in j.items() if k not in reserved}
-    return success({'identity': {'uid': uid, **ext}})
\ No newline at end of file
+    return success({'identity': {'uid': uid, **ext}})
+
+
+@auth_bp.post('/logout')
+@jwt_required()
+def logout():
+    """撤销当前 access token；请求体中带上 refresh_token 时一并撤销。"""
+    j = get_jwt()
+    token_blocklist.revoke_jti(j['jti'], j['exp'])
+
+    refresh = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh:
+        try:
+            r = decode_token(refresh, allow_expired=True)
+        except Exception:
+            return fail(ApiCodes.BAD_REQUEST, 'refresh_token 无效')
+        if str(r.get('sub')) == str(get_jwt_identity()):
+            token_blocklist.revoke_jti(r['jti'], r['exp'])
+
+    db.session.commit()
+    return success(None, '已退出登录')
@@ -1,26 +1,45 @@
 # app/blueprints/evaluations.py
-from flask import request
-from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy.orm import joinedload, selectinload
+from flask import request, current_app
+from flask_jwt_extended import get_jwt_identity, jwt_required, get_jwt
+from sqlalchemy.orm import joinedload
 from marshmallow import ValidationError
 
 from app.blueprints import evaluations_bp
 from app.models.evaluation import Evaluation, EvaluationCategory
-from app.schemas.evaluation import EvaluationSchema, EvaluationCategorySchema, EvaluationCreateSchema, \
-    StudentEvaluationCreateSchema
+from app.schemas.evaluation import EvaluationSchema, EvaluationListSchema, EvaluationCategorySchema, \
+    EvaluationCreateSchema, StudentEvaluationCreateSchema
+from app.schemas.compiler import compile_schema
+from app.schemas.validators import compiled_loader
 from app.utils.responses import success, fail, ApiCodes
-from app.utils.pagination import get_pagination, page_result
+from app.utils.pagination import get_pagination, page_result, paginate, get_cursor, keyset_paginate, cursor_result
 from app.extensions import db
 from app.blueprints.admins import admin_required
-from app.utils.security import is_super_id
-from app.models import AdminSchoolMap, Student, School
+from app.models import Student, School, Admin
+from app.services.projections import (project_evaluations, evaluation_rows, load_thread, project_evaluation_list,
+                                      EvaluationListRow)
+from app.services.evaluation_threads import record_reply, delete_thread
+from app.services.admin_scope import admin_scopes
+from app.utils.streaming import get_export_format, stream_export
+from app.utils.etag import etag
+
+# 导出 CSV 的列（回复只在 NDJSON 中完整输出）
+EVALUATION_CSV_COLUMNS = [
+    ('ID', 'id'), ('内容', 'content'), ('学校', 'school.name'), ('类别', 'category.name'),
+    ('学生', 'student.name'), ('管理员', 'admin.display_name'), ('创建时间', 'created_at'),
+]
 
 # 创建一个名为 'evaluations' 的新蓝图
 
 evaluation_schema = EvaluationSchema()
 evaluations_schema = EvaluationSchema(many=True)
+dump_evaluation = compile_schema(EvaluationSchema)
+# 列表不带回复内容，只带回复统计
+dump_evaluation_list = compile_schema(EvaluationListSchema, many=True)
 category_schema = EvaluationCategorySchema()
 categories_schema = EvaluationCategorySchema(many=True)
+category_loader = compiled_loader(EvaluationCategorySchema)
+evaluation_create_loader = compiled_loader(EvaluationCreateSchema)
+student_evaluation_create_loader = compiled_loader(StudentEvaluationCreateSchema)
 
 # --- 评价消息管理 API ---
 
@@ -30,11 +49,17 @@ categories_schema = EvaluationCategorySchema(many=True)
 @evaluations_bp.get('/<int:eid>')
 @jwt_required()
 def get_evaluation_thread(eid):
-    # 使用 selectinload 预加载所有层级的 replies
-    evaluation = Evaluation.query.options(
-        selectinload(Evaluation.replies).selectinload(Evaluation.replies)
-    ).filter_by(id=eid, is_deleted=False).first_or_404("评价不存在")
-    return success(evaluation_schema.dump(evaluation))
+    """
+    评价及其完整回复树（不含已删除的回复）。?depth= 限制回复的层数，默认并最多为 EVALUATION_THREAD_MAX_DEPTH。
+    """
+    max_depth = current_app.config['EVALUATION_THREAD_MAX_DEPTH']
+    depth = request.args.get('depth', type=int)
+    if depth is not None and depth < 0:
+        return fail(ApiCodes.BAD_REQUEST, "depth 不能小于 0")
+    thread = load_thread(eid, max_depth if depth is None else min(depth, max_depth))
+    if thread is None:
+        return fail(ApiCodes.NOT_FOUND, "评价不存在")
+    return success(dump_evaluation(thread))
 
 
 @evaluations_bp.post('/<int:eid>/reply')
@@ -42,7 +67,7 @@ def get_evaluation_thread(eid):
 def reply_to_evaluation(eid: int):
     uid = str(get_jwt_identity() or "")
     try:
-        data = EvaluationCreateSchema().load(request.json)
+        data = evaluation_create_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -53,6 +78,8 @@ def reply_to_evaluation(eid: int):
         parent_id=parent_eval.id,
         admin_id=uid,
     )
+    claims = get_jwt()
+    record_reply(parent_eval, reply, claims.get('name') or claims.get('account'))
     db.session.add(reply)
     db.session.commit()
     return success(evaluation_schema.dump(reply))
@@ -62,7 +89,7 @@ def reply_to_evaluation(eid: int):
 @admin_required
 def delete_evaluation(eid: int):
     evaluation = Evaluation.query.filter_by(id=eid, is_deleted=False).first_or_404("评价不存在")
-    evaluation.soft_delete()
+    delete_thread(evaluation)
     db.session.commit()
     return success(None, "删除成功")
 @evaluations_bp.get('/categories/list')
@@ -76,7 +103,7 @@ def list_categories_paginated():
     if kw:
         q = q.filter(EvaluationCategory.name.ilike(f'%{kw}%'))
 
-    p = q.order_by(EvaluationCategory.created_at.desc()).paginate(page=page, per_page=size, error_out=False)
+    p = paginate(q.order_by(EvaluationCategory.created_at.desc()), page, size, ('evaluation_categories',))
 
     data = page_result(p, categories_schema.dump(p.items))
 
@@ -87,6 +114,7 @@ def list_categories_paginated():
 
 @evaluations_bp.get('/categories')
 @jwt_required()
+@etag('evaluation_categories')
 def list_categories():
     categories = EvaluationCategory.query.filter_by(is_deleted=False).order_by(
         EvaluationCategory.created_at.desc()).all()
@@ -97,7 +125,7 @@ def list_categories():
 @admin_required
 def create_category():
     try:
-        data = category_schema.load(request.json)
+        data = category_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -114,7 +142,7 @@ def create_category():
 @admin_required
 def update_category(cid: int):
     try:
-        data = category_schema.load(request.json)
+        data = category_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -141,33 +169,51 @@ def delete_category(cid: int):
 @evaluations_bp.get('')
 @admin_required
 def list_evaluations():
-    uid = str(get_jwt_identity() or "")
-    is_super = is_super_id(uid)
+    scope = admin_scopes.current()
     page, size = get_pagination()
 
     school_id = request.args.get('school_id')
     category_id = request.args.get('category_id')
     # 只查询顶层评价 (parent_id 为 None)
     q = Evaluation.query.filter(Evaluation.parent_id.is_(None), Evaluation.is_deleted == False)
-    q = q.options(
-        joinedload(Evaluation.student).load_only(Student.name),
-        joinedload(Evaluation.category).load_only(EvaluationCategory.name),
-        joinedload(Evaluation.school).load_only(School.name)  # <-- 新增: 预加载学校信息
-    )
 
-    if not is_super:
-        managed_school_ids = [m.school_id for m in AdminSchoolMap.query.filter_by(admin_id=uid, is_deleted=False).all()]
-        if school_id and school_id not in managed_school_ids:
-            return fail(ApiCodes.FORBIDDEN, "无权访问该学校的评价")
-        q = q.filter(Evaluation.school_id.in_(managed_school_ids))
+    if school_id and not scope.can_access(school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权访问该学校的评价")
+    q = scope.apply(q, Evaluation.school_id)
 
     if school_id:
         q = q.filter(Evaluation.school_id == school_id)
     if category_id:
         q = q.filter(Evaluation.category_id == category_id)
 
-    p = q.order_by(Evaluation.created_at.desc()).paginate(page=page, per_page=size, error_out=False)
-    data = page_result(p, evaluations_schema.dump(p.items))
+    # 导出：流式返回全部顶层评价，每批各自挂上回复树
+    fmt = get_export_format()
+    if fmt:
+        q = project_evaluations(q).order_by(Evaluation.created_at.desc(), Evaluation.id.desc())
+        return stream_export(q, fmt, 'evaluations', dump_evaluation, EVALUATION_CSV_COLUMNS,
+                             transform=evaluation_rows)
+
+    # 列表不带回复树，回复数与最后回复取顶层评价上的冗余列；开启投影时只查列表所需的列
+    projection = current_app.config['LIST_PROJECTION_EVALUATIONS']
+    if projection:
+        q = project_evaluation_list(q)
+    else:
+        q = q.options(
+            joinedload(Evaluation.student).load_only(Student.name),
+            joinedload(Evaluation.category).load_only(EvaluationCategory.name),
+            joinedload(Evaluation.school).load_only(School.name),  # <-- 新增: 预加载学校信息
+            joinedload(Evaluation.admin).load_only(Admin.id, Admin.display_name)
+        )
+
+    cursor = get_cursor()
+    if cursor is not None:
+        rows, has_more = keyset_paginate(q, Evaluation.created_at, Evaluation.id, size, cursor)
+        items = [EvaluationListRow(r) for r in rows] if projection else rows
+        return success(cursor_result(items, dump_evaluation_list(items), size, has_more))
+
+    p = paginate(q.order_by(Evaluation.created_at.desc()), page, size, ('evaluations',))
+    items = [EvaluationListRow(r) for r in p.items] if projection else p.items
+    data = page_result(p, dump_evaluation_list(items))
 
     return success(data)
 
@@ -184,13 +230,19 @@ def list_my_evaluations():
     q = q.options(
         joinedload(Evaluation.student).load_only(Student.name),
         joinedload(Evaluation.category).load_only(EvaluationCategory.name),
-        joinedload(Evaluation.school).load_only(School.name)  # <-- 新增: 预加载学校信息
+        joinedload(Evaluation.school).load_only(School.name),  # <-- 新增: 预加载学校信息
+        joinedload(Evaluation.admin).load_only(Admin.id, Admin.display_name)
     )
     if category_id:
         q = q.filter(Evaluation.category_id == category_id)
-   
-    p = q.order_by(Evaluation.created_at.desc()).paginate(page=page, per_page=size, error_out=False)
-    data = page_result(p, evaluations_schema.dump(p.items))
+
+    cursor = get_cursor()
+    if cursor is not None:
+        items, has_more = keyset_paginate(q, Evaluation.created_at, Evaluation.id, size, cursor)
+        return success(cursor_result(items, dump_evaluation_list(items), size, has_more))
+
+    p = paginate(q.order_by(Evaluation.created_at.desc()), page, size, ('evaluations',))
+    data = page_result(p, dump_evaluation_list(p.items))
 
     return success(data)
 
@@ -204,7 +256,7 @@ def create_evaluation_by_student():
     student = Student.query.filter_by(id=uid, is_deleted=False).first_or_404("学生不存在")
 
     try:
-        data = StudentEvaluationCreateSchema().load(request.json)
+        data = student_evaluation_create_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -234,7 +286,7 @@ def reply_to_evaluation_by_student(eid: int):
     student = Student.query.filter_by(id=uid, is_deleted=False).first_or_404("学生不存在")
 
     try:
-        data = EvaluationCreateSchema().load(request.json) # 复用管理员的回复 Schema
+        data = evaluation_create_loader.load(request.json) # 复用管理员的回复 Schema
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -250,6 +302,7 @@ def reply_to_evaluation_by_student(eid: int):
         student_id=student.id,
         admin_id=None # 学生回复时 admin_id 为空
     )
+    record_reply(parent_eval, reply, student.name)
     db.session.add(reply)
     db.session.commit()
     return success(evaluation_schema.dump(reply), "回复成功")
@@ -6,11 +6,12 @@ from marshmallow import ValidationError
 from app.blueprints import profile_bp  # 确保导入正确
 from app.models import Student, Admin
 from app.schemas.profile import ProfileUpdateSchema
+from app.schemas.validators import compiled_loader
 from app.utils.responses import success, fail, ApiCodes
 from app.extensions import db
 from app.utils.security import hash_password, verify_password  # ✨ 导入 verify_password
 
-profile_update_schema = ProfileUpdateSchema()
+profile_update_loader = compiled_loader(ProfileUpdateSchema)
 
 
 @profile_bp.put('')
@@ -25,7 +26,7 @@ def update_my_profile():
     user_type = claims.get('type')
 
     try:
-        data = profile_update_schema.load(request.json)
+        data = profile_update_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
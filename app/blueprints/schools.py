@@ -5,12 +5,18 @@ from marshmallow import ValidationError
 from sqlalchemy import or_
 
 from app.blueprints import schools_bp
-from app.models import AdminSchoolMap
 from app.utils.responses import success, fail, ApiCodes
-from app.utils.pagination import get_pagination, page_result
+from app.utils.pagination import get_pagination, page_result, paginate, get_cursor, keyset_paginate, cursor_result
 from app.extensions import db
 from app.models.school import School
 from app.schemas.school import SchoolCreateSchema, SchoolUpdateSchema, SchoolOutSchema
+from app.schemas.validators import compiled_loader
+from app.services.school_alias import school_alias_index
+from app.services.admin_scope import admin_scopes
+from app.services.projections import project_schools, SchoolRow
+from app.schemas.compiler import compile_schema
+from app.utils.streaming import get_export_format, stream_export
+from app.utils.etag import etag
 
 # 复用管理员权限装饰器（你如果已经抽到 utils 里就从那里 import）
 from app.blueprints.admins import admin_required  # 若担心循环依赖，可把装饰器挪到 utils/authz.py
@@ -18,34 +24,34 @@ from app.utils.security import is_super_id
 
 school_out = SchoolOutSchema()
 school_out_many = SchoolOutSchema(many=True)
+school_create_loader = compiled_loader(SchoolCreateSchema)
+school_update_loader = compiled_loader(SchoolUpdateSchema)
+dump_school = compile_schema(SchoolOutSchema)
+
+SCHOOL_CSV_COLUMNS = [('ID', 'id'), ('名称', 'name'), ('别名', 'alias'), ('创建时间', 'created_at')]
+
+def _managed_schools_scope():
+    # 普通管理员的可见学校取决于其绑定关系
+    uid = str(get_jwt_identity() or "")
+    return [] if is_super_id(uid) else [('admin_school_map', uid)]
+
 
 @schools_bp.get('')
 @jwt_required()
+@etag('schools', scoped=_managed_schools_scope)
 def list_schools():
     """
     分页查询：
     支持 ?page=1&size=10 或 ?current=1&pageSize=10
     关键字：?kw=xxx（模糊匹配 name/alias）
     返回结构：{records, total, size, current, pages}
+    游标分页：?cursor=（首页留空，之后传上一页的 next_cursor），返回 {records, size, next_cursor, has_more}
     """
-    uid = str(get_jwt_identity() or "")
-    print(get_jwt_identity())
-    is_super = is_super_id(uid)
     page, size = get_pagination()
     kw = (request.args.get('kw') or '').strip()
 
-    if is_super:
-        q = School.query.filter(School.is_deleted.is_(False))
-    else:
-        # 只取该管理员被绑定的学校
-        q = (School.query
-             .join(AdminSchoolMap, AdminSchoolMap.school_id == School.id)
-             .filter(
-                 School.is_deleted.is_(False),
-                 AdminSchoolMap.is_deleted.is_(False),
-                 AdminSchoolMap.admin_id == uid
-             )
-             .distinct(School.id))  # 防重复
+    # 非超级管理员只取被绑定的学校
+    q = admin_scopes.current().apply(School.query.filter(School.is_deleted.is_(False)), School.id)
 
     if kw:
         q = q.filter(or_(
@@ -54,7 +60,18 @@ def list_schools():
         ))
 
     q = q.order_by(School.created_at.desc())
-    p = q.paginate(page=page, per_page=size, error_out=False)
+    # 导出：?format=ndjson|csv 流式返回全部学校
+    fmt = get_export_format()
+    if fmt:
+        return stream_export(project_schools(q), fmt, 'schools', dump_school, SCHOOL_CSV_COLUMNS,
+                             transform=lambda rows: [SchoolRow(r) for r in rows])
+
+    cursor = get_cursor()
+    if cursor is not None:
+        items, has_more = keyset_paginate(q, School.created_at, School.id, size, cursor)
+        return success(cursor_result(items, school_out_many.dump(items), size, has_more))
+
+    p = paginate(q, page, size, ('schools', 'admin_school_map'))
 
     data = page_result(p, school_out_many.dump(p.items))
     return success(data)
@@ -76,7 +93,7 @@ def create_school():
     if json_data is None:
         return fail(ApiCodes.BAD_REQUEST, "请求体必须为 JSON（Content-Type: application/json）")
     try:
-        data = SchoolCreateSchema().load(json_data)  # ✅ 中文校验提示
+        data = school_create_loader.load(json_data)  # ✅ 中文校验提示
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -91,6 +108,7 @@ def create_school():
     s = School(name=data['name'], alias=data['alias'])
     db.session.add(s)
     db.session.commit()
+    school_alias_index.invalidate()
     return success(school_out.dump(s))
 
 
@@ -99,7 +117,7 @@ def create_school():
 def update_school(sid: str):
     json_data = request.get_json(silent=True) or {}
     try:
-        data = SchoolUpdateSchema().load(json_data, partial=True)
+        data = school_update_loader.load(json_data, partial=True)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -129,6 +147,7 @@ def update_school(sid: str):
         s.alias = data['alias']
 
     db.session.commit()
+    school_alias_index.invalidate()
     return success(school_out.dump(s))
 
 
@@ -140,4 +159,5 @@ def delete_school(sid: str):
         return fail(ApiCodes.NOT_FOUND, "学校不存在")
     s.soft_delete()
     db.session.commit()
+    school_alias_index.invalidate()
     return success({"id": sid}, "已删除")
@@ -1,25 +1,54 @@
 # app/blueprints/students.py
 from datetime import datetime, timedelta
 
-from flask import request
-from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy import func, case, or_, and_
+from flask import request, current_app
+from flask_jwt_extended import get_jwt_identity, jwt_required, get_jwt
+from sqlalchemy import or_, and_, false
 from sqlalchemy.orm import joinedload
 from marshmallow import ValidationError
 
 from app.blueprints import students_bp
-from app.models import AdminSchoolMap
 from app.utils.responses import success, fail, ApiCodes
-from app.utils.pagination import get_pagination, page_result
+from app.utils.pagination import get_pagination, page_result, paginate, get_cursor, keyset_paginate, cursor_result
 from app.models.student import Student
-from app.schemas.student import StudentSchema, StudentCreateSchema, StudentUpdateSchema, StudentLeaveSchema
+from app.schemas.student import (StudentSchema, StudentCreateSchema, StudentUpdateSchema, StudentLeaveSchema,
+                                  StudentBulkLeaveSchema, StudentBulkEatingSchema, StudentCheckinSchema)
+from app.schemas.compiler import compile_schema
+from app.schemas.validators import compiled_loader
 from app.extensions import db
-from app.utils.security import hash_password, is_super_id
+from app.utils.security import hash_password
 from app.blueprints.admins import admin_required
 from app.utils.tz import now_local
+from app.services.token_blocklist import token_blocklist
+from app.services.projections import project_students, StudentRow
+from app.services.admin_scope import admin_scopes
+from app.services.headcounts import (student_state, record_student_change, bulk_set_eating,
+                                    headcount_stats, headcount_matrix)
+from app.services.leaves import (on_leave_students, current_leave, add_leave, cancel_leaves, replace_leave,
+                                 bulk_replace_leave)
+from app.utils.streaming import get_export_format, stream_export
+from app.services.student_import import IMPORT_FORMATS, iter_import_rows, import_students
+from app.services.checkin import eating_rosters, STATUS_NAMES, EATING, ON_LEAVE, NOT_EATING_ON_LEAVE
+from app.services.snapshots import snapshots_for, snapshot_student_ids
+from app.utils.etag import etag
+
+# 导出 CSV 的列：(表头, 序列化结果中的字段路径)
+STUDENT_CSV_COLUMNS = [
+    ('ID', 'id'), ('姓名', 'name'), ('学号', 'student_number'), ('账号', 'account'),
+    ('学校', 'school.name'), ('就餐', 'is_eating'),
+    ('请假开始', 'leave_start_date'), ('请假结束', 'leave_end_date'), ('创建时间', 'created_at'),
+]
 
 student_schema = StudentSchema()
 students_schema = StudentSchema(many=True)
+dump_students = compile_schema(StudentSchema, many=True)
+dump_student = compile_schema(StudentSchema)
+student_create_loader = compiled_loader(StudentCreateSchema)
+student_update_loader = compiled_loader(StudentUpdateSchema)
+student_leave_loader = compiled_loader(StudentLeaveSchema)
+student_bulk_leave_loader = compiled_loader(StudentBulkLeaveSchema)
+student_bulk_eating_loader = compiled_loader(StudentBulkEatingSchema)
+student_checkin_loader = compiled_loader(StudentCheckinSchema)
 
 
 # app/blueprints/students.py
@@ -35,8 +64,7 @@ from sqlalchemy import and_, or_
 @students_bp.get('')
 @admin_required
 def list_students():
-    uid = str(get_jwt_identity() or "")
-    is_super = is_super_id(uid)
+    scope = admin_scopes.current()
     page, size = get_pagination()
     school_id = request.args.get('school_id')
     kw = (request.args.get('kw') or '').strip()
@@ -44,14 +72,12 @@ def list_students():
     # 从 request.args 中获取 is_eating 字符串
     is_eating_str = request.args.get('is_eating')
 
-    q = Student.query.options(joinedload(Student.school)).filter(Student.is_deleted == False)
+    q = Student.query.filter(Student.is_deleted == False)
 
     # --- 权限和基本筛选 ---
-    if not is_super:
-        managed_school_ids = [m.school_id for m in AdminSchoolMap.query.filter_by(admin_id=uid, is_deleted=False).all()]
-        if school_id and school_id not in managed_school_ids:
-            return fail(ApiCodes.FORBIDDEN, "无权访问该学校")
-        q = q.filter(Student.school_id.in_(managed_school_ids))
+    if school_id and not scope.can_access(school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权访问该学校")
+    q = scope.apply(q, Student.school_id)
 
     if school_id:
         q = q.filter(Student.school_id == school_id)
@@ -63,13 +89,15 @@ def list_students():
     if date_str:
         try:
             target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            # 筛选条件: 该日期在学生的请假开始和结束日期之间
-            q = q.filter(and_(
-                Student.leave_start_date.isnot(None),
-                Student.leave_end_date.isnot(None),
-                Student.leave_start_date <= target_date,
-                Student.leave_end_date >= target_date
-            ))
+            # 筛选条件: 该日期落在学生的某段请假记录内（student_leaves 按日期区间建有索引）
+            on_leave = Student.id.in_(on_leave_students(target_date))
+            # 过去的日期：有名单快照的学校按快照筛选
+            snaps = snapshots_for(scope, target_date, school_id)
+            if snaps:
+                snap_ids = [i for snap in snaps for i in snapshot_student_ids(snap, ON_LEAVE, NOT_EATING_ON_LEAVE)]
+                on_leave = or_(Student.id.in_(snap_ids) if snap_ids else false(),
+                               and_(Student.school_id.notin_([snap.school_id for snap in snaps]), on_leave))
+            q = q.filter(on_leave)
         except ValueError:
             return fail(ApiCodes.BAD_REQUEST, "日期格式不正确，请使用 YYYY-MM-DD 格式")
 
@@ -79,9 +107,30 @@ def list_students():
         is_eating_bool = is_eating_str.lower() == 'true'
         q = q.filter(Student.is_eating == is_eating_bool)
 
+    # --- 导出：?format=ndjson|csv 流式返回全部结果，不分页、不 COUNT ---
+    fmt = get_export_format()
+    if fmt:
+        q = project_students(q).order_by(Student.created_at.desc(), Student.id.desc())
+        return stream_export(q, fmt, 'students', dump_student, STUDENT_CSV_COLUMNS,
+                             transform=lambda rows: [StudentRow(r) for r in rows])
+
     # --- 分页和返回 ---
-    p = q.order_by(Student.created_at.desc()).paginate(page=page, per_page=size, error_out=False)
-    data = page_result(p, students_schema.dump(p.items))
+    # 开启投影时只查列表所需的列，不构造 ORM 实例
+    projection = current_app.config['LIST_PROJECTION_STUDENTS']
+    q = project_students(q) if projection else q.options(joinedload(Student.school))
+    # ?cursor= 游标分页：按 (created_at, id) 定位，不做 OFFSET/COUNT
+    cursor = get_cursor()
+    if cursor is not None:
+        rows, has_more = keyset_paginate(q, Student.created_at, Student.id, size, cursor)
+        items = [StudentRow(r) for r in rows] if projection else rows
+        return success(cursor_result(items, dump_students(items), size, has_more))
+    # 按日期/就餐状态筛选时结果还取决于请假记录与名单快照，这两张表有写入同样要让总数缓存失效
+    tables = ('students',)
+    if date_str or is_eating_str is not None:
+        tables += ('student_leaves', 'roster_snapshots')
+    p = paginate(q.order_by(Student.created_at.desc()), page, size, tables)
+    items = [StudentRow(r) for r in p.items] if projection else p.items
+    data = page_result(p, dump_students(items))
     return success(data)
 
 
@@ -89,8 +138,7 @@ def list_students():
 @students_bp.get('/stats')
 @admin_required
 def get_student_stats():
-    uid = str(get_jwt_identity() or "")
-    is_super = is_super_id(uid)
+    scope = admin_scopes.current()
 
     date_str = request.args.get('date')
     school_id = request.args.get('school_id')
@@ -103,64 +151,52 @@ def get_student_stats():
     except ValueError:
         return fail(ApiCodes.BAD_REQUEST, "日期格式不正确，请使用 YYYY-MM-DD 格式")
 
-    q = db.session.query(Student.id).filter(Student.is_deleted == False)
+    if school_id and not scope.can_access(school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权访问该学校的统计数据")
 
-    # 权限控制
-    if not is_super:
-        managed_school_ids = [m.school_id for m in AdminSchoolMap.query.filter_by(admin_id=uid, is_deleted=False).all()]
-        if school_id and school_id not in managed_school_ids:
-            return fail(ApiCodes.FORBIDDEN, "无权访问该学校的统计数据")
-        q = q.filter(Student.school_id.in_(managed_school_ids))
+    # 读增量维护的各校人数表，耗时只与学校数相关
+    return success(headcount_stats(scope, target_date, school_id))
 
-    if school_id:
-        q = q.filter(Student.school_id == school_id)
 
-    # 定义学生当天是否在请假
-    is_on_leave = and_(
-        Student.leave_start_date.isnot(None),
-        Student.leave_end_date.isnot(None),
-        Student.leave_start_date <= target_date,
-        Student.leave_end_date >= target_date
-    )
-
-    # 不就餐的条件：is_eating 为 False，或者当天在请假期间
-    is_not_eating_condition = or_(
-        Student.is_eating == False,
-        is_on_leave
-    )
+@students_bp.get('/stats/range')
+@admin_required
+def get_student_stats_range():
+    """
+    按学校 × 日期返回 [start, end] 每天的就餐/不就餐人数，供厨房提前备餐。
+    可选 ?school_id= 只看一所学校；权限范围与 /stats 一致。
+    """
+    scope = admin_scopes.current()
+    school_id = request.args.get('school_id')
 
-    # 使用 case 语句进行条件计数
-    stats_query = q.with_entities(
-        func.count(Student.id).label("total_students"),
-        func.sum(case((is_not_eating_condition, 1), else_=0)).label("not_eating_count"),
-        func.sum(case((~is_not_eating_condition, 1), else_=0)).label("eating_count")
-    )
+    try:
+        start = datetime.strptime(request.args.get('start') or '', '%Y-%m-%d').date()
+        end = datetime.strptime(request.args.get('end') or '', '%Y-%m-%d').date()
+    except ValueError:
+        return fail(ApiCodes.BAD_REQUEST, "必须提供 start/end 参数，格式为 YYYY-MM-DD")
+    if end < start:
+        return fail(ApiCodes.BAD_REQUEST, "结束日期不能早于开始日期")
+    max_days = current_app.config['STATS_RANGE_MAX_DAYS']
+    if (end - start).days + 1 > max_days:
+        return fail(ApiCodes.BAD_REQUEST, f"单次最多查询 {max_days} 天")
 
-    result = stats_query.one()
+    if school_id and not scope.can_access(school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权访问该学校的统计数据")
 
-    return success({
-        "total_students": result.total_students or 0,
-        "eating_count": result.eating_count or 0,
-        "not_eating_count": result.not_eating_count or 0,
-    })
+    return success(headcount_matrix(scope, start, end, school_id))
 
 
 @students_bp.post('')
 @admin_required
 def create_student():
-    uid = str(get_jwt_identity() or "")
-    is_super = is_super_id(uid)
-
     try:
-        data = StudentCreateSchema().load(request.json)
+        data = student_create_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
     school_id = data['school_id']
-    if not is_super:
-        # 检查管理员是否有权操作此学校
-        if not AdminSchoolMap.query.filter_by(admin_id=uid, school_id=school_id, is_deleted=False).first():
-            return fail(ApiCodes.FORBIDDEN, "无权在该学校下创建学生")
+    # 检查管理员是否有权操作此学校
+    if not admin_scopes.current().can_access(school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权在该学校下创建学生")
 
     # 检查学号是否已存在
     if Student.query.filter_by(school_id=school_id, student_number=data['student_number'], is_deleted=False).first():
@@ -176,30 +212,145 @@ def create_student():
         s.password_hash = hash_password(data['password'])
 
     db.session.add(s)
+    record_student_change(None, student_state(s))
     db.session.commit()
     return success(student_schema.dump(s))
 
 
+@students_bp.post('/bulk')
+@admin_required
+def bulk_create_students():
+    """
+    批量导入学生，请求体为 CSV（text/csv，首行表头）或 NDJSON（每行一个 JSON 对象），流式读取。
+    字段同新增学生：name, student_number, school_id, password, is_eating；
+    可用 ?school_id= 为未填学校的行指定默认学校。
+    返回 {total, created, failed, errors: [{line, student_number, msg}]}；
+    密码哈希繁忙或超过 BULK_IMPORT_MAX_ROWS 时提前结束并带上 truncated。
+    """
+    fmt = (request.args.get('format') or '').strip().lower()
+    if fmt not in IMPORT_FORMATS:
+        fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+
+    default_school_id = request.args.get('school_id')
+    scope = admin_scopes.current()
+    if default_school_id and not scope.can_access(default_school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权在该学校下创建学生")
+
+    report = import_students(iter_import_rows(request.stream, fmt), scope, default_school_id)
+    return success(report, f"导入完成：成功 {report['created']} 条，失败 {report['failed']} 条")
+
+
+def _bulk_update(loader, apply):
+    """批量接口公共部分：校验请求体，把筛选条件与管理员范围拼成 WHERE，交给 apply(where, data) 用集合语句完成。"""
+    try:
+        data = loader.load(request.json)
+    except ValidationError as err:
+        return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
+
+    scope = admin_scopes.current()
+    school_id = data.get('school_id')
+    if school_id and not scope.can_access(school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权修改该学校的学生")
+
+    where = []
+    cond = scope.condition(Student.school_id)
+    if cond is not None:
+        where.append(cond)
+    if school_id:
+        where.append(Student.school_id == school_id)
+    kw = (data.get('kw') or '').strip()
+    if kw:
+        where.append(or_(Student.name.ilike(f'%{kw}%'), Student.student_number.ilike(f'%{kw}%')))
+    if data.get('ids'):
+        where.append(Student.id.in_(data['ids']))
+
+    affected = apply(where, data)
+    db.session.commit()
+    return success({'affected': affected}, f"已更新 {affected} 名学生")
+
+
+@students_bp.put('/bulk/leave')
+@admin_required
+def bulk_update_leave():
+    """
+    按筛选条件（school_id / kw / ids）批量设置请假时间段，替换今天以后的请假（开始日期早于今天时从今天算起）；
+    两个日期传 null 表示取消。
+    """
+    return _bulk_update(student_bulk_leave_loader,
+                        lambda where, data: bulk_replace_leave(where, data['leave_start_date'], data['leave_end_date']))
+
+
+@students_bp.put('/bulk/eating')
+@admin_required
+def bulk_update_eating():
+    """按筛选条件（school_id / kw / ids）批量设置是否就餐。"""
+    return _bulk_update(student_bulk_eating_loader, lambda where, data: bulk_set_eating(where, data['is_eating']))
+
+
+def _checkin_results(school_id: str, ids: list[int]) -> list[dict]:
+    states = eating_rosters.lookup(school_id, ids)
+    return [{'id': sid, 'is_eating': state == EATING, 'status': STATUS_NAMES[state]}
+            for sid, state in zip(ids, states)]
+
+
+@students_bp.get('/checkin')
+@admin_required
+def checkin_lookup():
+    """
+    食堂核验：学生今天是否就餐。?school_id=&id=
+    status: eating / not_eating（未开启就餐）/ on_leave（今天请假）/ unknown（不是该校学生）
+    """
+    school_id = request.args.get('school_id')
+    sid = request.args.get('id', type=int)
+    if not school_id or sid is None:
+        return fail(ApiCodes.BAD_REQUEST, "必须提供 school_id 和 id 参数")
+    if not admin_scopes.current().can_access(school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权访问该学校")
+    return success(_checkin_results(school_id, [sid])[0])
+
+
+@students_bp.post('/checkin')
+@admin_required
+def checkin_batch():
+    """食堂核验（批量）：{"school_id": "...", "ids": [1, 2, ...]}，按 ids 顺序返回。"""
+    try:
+        data = student_checkin_loader.load(request.json)
+    except ValidationError as err:
+        return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
+    if not admin_scopes.current().can_access(data['school_id']):
+        return fail(ApiCodes.FORBIDDEN, "无权访问该学校")
+    return success(_checkin_results(data['school_id'], data['ids']))
+
+
 @students_bp.put('/<int:sid>')
 @admin_required
 def update_student(sid: int):
-    uid = str(get_jwt_identity() or "")
-    is_super = is_super_id(uid)
-
     try:
-        data = StudentUpdateSchema().load(request.json)
+        data = student_update_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
-    s = Student.query.filter_by(id=sid, is_deleted=False).first()
+    # 锁住学生行：与批量写入和其他单个写入互斥，前后两次 student_state() 之间不会被并发修改
+    s = Student.query.filter_by(id=sid, is_deleted=False).with_for_update().first()
     if not s:
         return fail(ApiCodes.NOT_FOUND, "学生不存在")
 
-    if not is_super:
-        if not AdminSchoolMap.query.filter_by(admin_id=uid, school_id=s.school_id, is_deleted=False).first():
-            return fail(ApiCodes.FORBIDDEN, "无权修改该学生信息")
+    if not admin_scopes.current().can_access(s.school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权修改该学生信息")
+
+    # 请假时间段写入 student_leaves，镜像列随之同步
+    leave = None
+    if 'leave_start_date' in data or 'leave_end_date' in data:
+        leave = (data.pop('leave_start_date', s.leave_start_date), data.pop('leave_end_date', s.leave_end_date))
+        if (leave[0] is None) != (leave[1] is None):
+            return fail(ApiCodes.BAD_REQUEST, "请假开始和结束日期需同时提供或同时为空")
+        if leave[0] and leave[0] > leave[1]:
+            return fail(ApiCodes.BAD_REQUEST, "请假结束日期不能早于开始日期")
 
     # 更新字段
+    before = student_state(s)
+    if leave is not None and leave != (s.leave_start_date, s.leave_end_date):
+        replace_leave(s, *leave)
     for key, value in data.items():
         if key == 'password':
             if value:
@@ -209,6 +360,7 @@ def update_student(sid: int):
         else:
             setattr(s, key, value)
 
+    record_student_change(before, student_state(s))
     db.session.commit()
     return success(student_schema.dump(s))
 
@@ -216,21 +368,28 @@ def update_student(sid: int):
 @students_bp.delete('/<int:sid>')
 @admin_required
 def remove_student(sid: int):
-    uid = str(get_jwt_identity() or "")
-    is_super = is_super_id(uid)
-
-    s = Student.query.get_or_404(sid)
-    if not is_super:
-        if not AdminSchoolMap.query.filter_by(admin_id=uid, school_id=s.school_id, is_deleted=False).first():
-            return fail(ApiCodes.FORBIDDEN, "无权删除该学生")
+    s = Student.query.filter_by(id=sid).with_for_update().first_or_404()
+    if not admin_scopes.current().can_access(s.school_id):
+        return fail(ApiCodes.FORBIDDEN, "无权删除该学生")
 
+    before = student_state(s)
     s.soft_delete()
+    record_student_change(before, None)
+    # 强制下线：该学生此前签发的令牌全部失效
+    token_blocklist.revoke_subject('student', sid)
     db.session.commit()
     return success({'id': sid}, '已删除')
 
 
+def _my_school_scope():
+    # 旧令牌没有 school_id，不启用 ETag
+    school_id = get_jwt().get('school_id')
+    return [('students', school_id), ('student_leaves', school_id)] if school_id else None
+
+
 @students_bp.get('/me/status')
 @jwt_required()
+@etag(scoped=_my_school_scope, vary=lambda: now_local().date().isoformat())
 def get_my_eating_status():
     """
     获取当前登录学生今天的就餐状态。
@@ -241,12 +400,9 @@ def get_my_eating_status():
     student = Student.query.filter_by(id=uid, is_deleted=False).first_or_404("学生不存在")
 
     today = now_local().date()
-    is_on_leave = False
-
-    # 检查今天是否在请假期间
-    if student.leave_start_date and student.leave_end_date:
-        if student.leave_start_date <= today <= student.leave_end_date:
-            is_on_leave = True
+    # 今天进行中（或下一个将要开始）的请假
+    leave = current_leave(student.id, today)
+    is_on_leave = bool(leave) and leave[0] <= today
 
     # 最终就餐状态：is_eating 必须为 True 且 今天不在请假期间
     final_status = student.is_eating and not is_on_leave
@@ -261,9 +417,9 @@ def get_my_eating_status():
     }
 
     # ✨ 如果是请假状态，则在返回数据中附上请假日期
-    if student.leave_start_date and student.leave_end_date:
-        response_data['reason']['leave_start_date'] = student.leave_start_date.isoformat()
-        response_data['reason']['leave_end_date'] = student.leave_end_date.isoformat()
+    if leave:
+        response_data['reason']['leave_start_date'] = leave[0].isoformat()
+        response_data['reason']['leave_end_date'] = leave[1].isoformat()
 
     return success(response_data)
 
@@ -275,14 +431,16 @@ def set_my_eating_status():
     学生设置自己的就餐状态（停餐/就餐申请）。
     """
     uid = get_jwt_identity()
-    student = Student.query.filter_by(id=uid, is_deleted=False).first_or_404("学生不存在")
+    student = Student.query.filter_by(id=uid, is_deleted=False).with_for_update().first_or_404("学生不存在")
 
     json_data = request.get_json(silent=True)
     if json_data is None or 'is_eating' not in json_data or not isinstance(json_data['is_eating'], bool):
         return fail(ApiCodes.BAD_REQUEST, "请求参数错误，需要提供布尔型的 'is_eating' 字段")
 
     status = json_data['is_eating']
+    before = student_state(student)
     student.is_eating = status
+    record_student_change(before, student_state(student))
     db.session.commit()
 
     return success({'is_eating': status}, "就餐状态已更新")
@@ -295,10 +453,10 @@ def apply_for_leave():
     学生提交就餐请假申请。
     """
     uid = get_jwt_identity()
-    student = Student.query.filter_by(id=uid, is_deleted=False).first_or_404("学生不存在")
+    student = Student.query.filter_by(id=uid, is_deleted=False).with_for_update().first_or_404("学生不存在")
 
     try:
-        data = StudentLeaveSchema().load(request.json)
+        data = student_leave_loader.load(request.json)
     except ValidationError as err:
         return fail(ApiCodes.BAD_REQUEST, "参数校验失败", errors=err.messages)
 
@@ -308,13 +466,14 @@ def apply_for_leave():
     if data['leave_start_date'] < tomorrow:
         return fail(ApiCodes.BAD_REQUEST, "请假申请必须至少提前一天提交")
 
-    student.leave_start_date = data['leave_start_date']
-    student.leave_end_date = data['leave_end_date']
+    before = student_state(student)
+    add_leave(student, data['leave_start_date'], data['leave_end_date'])
+    record_student_change(before, student_state(student))
     db.session.commit()
 
     return success({
-        'leave_start_date': student.leave_start_date.isoformat(),
-        'leave_end_date': student.leave_end_date.isoformat()
+        'leave_start_date': data['leave_start_date'].isoformat(),
+        'leave_end_date': data['leave_end_date'].isoformat()
     }, "请假申请成功")
 
 
@@ -325,10 +484,12 @@ def cancel_leave():
     学生清空（取消）自己的请假时间。
     """
     uid = get_jwt_identity()
-    student = Student.query.filter_by(id=uid, is_deleted=False).first_or_404("学生不存在")
+    student = Student.query.filter_by(id=uid, is_deleted=False).with_for_update().first_or_404("学生不存在")
 
-    student.leave_start_date = None
-    student.leave_end_date = None
+    before = student_state(student)
+    # 今天及以后的请假取消，已经过去的请假记录保留
+    cancel_leaves(student, now_local().date())
+    record_student_change(before, student_state(student))
     db.session.commit()
 
     return "请假已取消"
\ No newline at end of file
@@ -2,8 +2,10 @@ from uuid import uuid4
 
 import click
 from flask.cli import with_appcontext
+from sqlalchemy import func
 from app.extensions import db
 from app.models.admin import Admin
+from app.models.student import Student
 from app.utils.security import hash_password
 
 @click.command('init-db')
@@ -26,6 +28,210 @@ def create_super(account, password):
     db.session.commit()
     click.echo(f'已创建超级管理员: {account} (id={admin_id})')
 
+@click.command('password-hash-stats')
+@with_appcontext
+def password_hash_stats():
+    """按 bcrypt 轮数统计已存储的密码哈希分布（$2b$12$ 前缀即 12 轮）。"""
+    from flask import current_app
+    click.echo(f"当前配置轮数: {current_app.config['BCRYPT_ROUNDS']}")
+    for label, model in (('学生', Student), ('管理员', Admin)):
+        prefix = func.substr(model.password_hash, 1, 7)
+        rows = (db.session.query(prefix, func.count())
+                .filter(model.is_deleted.is_(False))
+                .group_by(prefix)
+                .all())
+        click.echo(f'[{label}]')
+        for p, cnt in sorted(rows, key=lambda r: r[0] or ''):
+            if not p:
+                click.echo(f'  未设置密码: {cnt}')
+            else:
+                click.echo(f'  {p.strip("$").replace("$", " cost=")}: {cnt}')
+
+@click.command('prune-revoked-tokens')
+@with_appcontext
+def prune_revoked_tokens():
+    """清理已过期的令牌撤销记录。"""
+    from app.services.token_blocklist import token_blocklist
+    click.echo(f'已清理 {token_blocklist.prune_expired()} 条过期撤销记录')
+
+@click.command('reconcile-headcounts')
+@click.option('--compact-before', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='把早于该日期（YYYY-MM-DD）的请假差分合并，之前日期的统计不再精确')
+@with_appcontext
+def reconcile_headcounts(compact_before):
+    """从 students / student_leaves 表全量重建各校就餐人数统计表。"""
+    from app.services.headcounts import rebuild_headcounts
+    schools, deltas = rebuild_headcounts(compact_before.date() if compact_before else None)
+    db.session.commit()
+    click.echo(f'已重建 {schools} 所学校的人数统计，请假差分 {deltas} 行')
+
+@click.command('compact-headcounts')
+@click.option('--keep-days', type=int, default=None, help='保留最近多少天的请假差分，默认 HEADCOUNT_COMPACT_KEEP_DAYS')
+@with_appcontext
+def compact_headcounts(keep_days):
+    """把过去的请假差分并入各校人数表（统计接口所在进程也会按 HEADCOUNT_COMPACT_POLL_SECONDS 自动执行）。"""
+    from datetime import timedelta
+    from flask import current_app
+    from app.services.headcounts import compact_leave_deltas
+    from app.utils.tz import now_local
+    keep = current_app.config['HEADCOUNT_COMPACT_KEEP_DAYS'] if keep_days is None else keep_days
+    n = compact_leave_deltas(now_local().date() - timedelta(days=keep))
+    db.session.commit()
+    click.echo(f'已合并 {n} 行请假差分')
+
+@click.command('snapshot-rosters')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='快照日期（YYYY-MM-DD），默认今天；补历史日期时按当前数据计算')
+@click.option('--workers', type=int, default=None, help='并行处理的学校数，默认 ROSTER_SNAPSHOT_WORKERS')
+@with_appcontext
+def snapshot_rosters(day, workers):
+    """冻结各校某天的就餐名单，过去日期的统计与导出读取快照。"""
+    from app.services.snapshots import roster_snapshots
+    from app.utils.tz import now_local
+    day = day.date() if day else now_local().date()
+    n = roster_snapshots.take(day, workers=workers)
+    click.echo(f'已生成 {day} 的名单快照：{n} 所学校')
+
+@click.command('backfill-leaves')
+@with_appcontext
+def backfill_leaves():
+    """把 students 表上旧的单个请假时间段迁移到 student_leaves（已有请假记录的学生跳过）。"""
+    from sqlalchemy import insert, select, literal
+    from app.models.student_leave import StudentLeave
+    from app.utils.tz import now_local
+    now = now_local()
+    has_leave = select(StudentLeave.id).where(StudentLeave.student_id == Student.id).exists()
+    res = db.session.execute(insert(StudentLeave).from_select(
+        ['student_id', 'school_id', 'start_date', 'end_date', 'created_at', 'updated_at', 'is_deleted'],
+        select(Student.id, Student.school_id, Student.leave_start_date, Student.leave_end_date,
+               literal(now), literal(now), literal(False))
+        .where(Student.leave_start_date.isnot(None), Student.leave_end_date.isnot(None),
+               Student.leave_start_date <= Student.leave_end_date, ~has_leave)
+    ))
+    db.session.commit()
+    click.echo(f'已迁移 {res.rowcount} 条请假记录，请再执行 reconcile-headcounts')
+
+@click.command('backfill-evaluation-threads')
+@with_appcontext
+def backfill_evaluation_threads():
+    """回填回复的 root_id，并重算顶层评价的回复数 / 最后回复时间 / 最后回复人。"""
+    from app.services.evaluation_threads import backfill_threads
+    replies, roots = backfill_threads()
+    db.session.commit()
+    click.echo(f'已回填 {replies} 条回复的 root_id，重算 {roots} 条顶层评价的回复统计')
+
+@click.group('bench')
+def bench():
+    """性能基准与一致性校验。"""
+
+
+@bench.command('schemas')
+@click.option('--rows', default=10000, show_default=True, help='合成数据行数')
+@with_appcontext
+def bench_schemas(rows):
+    """对比编译序列化器与 marshmallow：先逐行校验输出一致，再计时。"""
+    import time
+    from datetime import date, datetime, timedelta
+    from types import SimpleNamespace as NS
+    from app.schemas.compiler import compile_schema
+    from app.schemas.admin import AdminShowSchema
+    from app.schemas.evaluation import EvaluationSchema
+    from app.schemas.student import StudentSchema
+
+    now = datetime.now()
+    schools = [NS(id=f'school-{i}', name=f'学校{i}', alias=f'S{i}', created_at=now, updated_at=now) for i in range(20)]
+    students = [NS(id=i, name=f'学生{i}', student_number=f'{i:06d}', account=f'S{i % 20}{i:06d}',
+                   is_eating=i % 3 != 0, leave_start_date=date.today() if i % 7 == 0 else None,
+                   leave_end_date=date.today() + timedelta(days=3) if i % 7 == 0 else None,
+                   created_at=now, updated_at=now, school=schools[i % 20]) for i in range(rows)]
+    admin = NS(id='admin-1', display_name='管理员')
+    category = NS(id=1, name='饭菜', created_at=now)
+    evaluations = []
+    for i in range(rows):
+        reply = NS(id=rows + i, content='收到', created_at=now, school=None, category=None,
+                   student=None, admin=admin, replies=[])
+        evaluations.append(NS(id=i, content=f'评价{i}', created_at=now, school=schools[i % 20],
+                              category=category, student=students[i], admin=None, replies=[reply]))
+    admins = [NS(id=f'a{i}', account=f'acc{i}', display_name=f'管理员{i}', created_at=now, updated_at=now,
+                 school_maps=[NS(school_id=s.id, is_deleted=j == 1) for j, s in enumerate(schools[:3])])
+              for i in range(rows)]
+
+    for label, schema_cls, data in (('StudentSchema', StudentSchema, students),
+                                    ('EvaluationSchema', EvaluationSchema, evaluations),
+                                    ('AdminShowSchema', AdminShowSchema, admins)):
+        schema = schema_cls(many=True)
+        fast = compile_schema(schema_cls, many=True)
+        if fast(data) != schema.dump(data):
+            raise click.ClickException(f'{label}: 编译结果与 marshmallow 不一致')
+        t0 = time.perf_counter()
+        schema.dump(data)
+        t1 = time.perf_counter()
+        fast(data)
+        t2 = time.perf_counter()
+        click.echo(f'{label:<18} rows={rows} marshmallow={(t1 - t0) * 1000:.1f}ms '
+                   f'compiled={(t2 - t1) * 1000:.1f}ms speedup={(t1 - t0) / (t2 - t1):.1f}x')
+
+@bench.command('leaves')
+@click.option('--students', default=2000, show_default=True, help='合成学生数')
+@click.option('--history', default='0,10,50', show_default=True, help='每个学生的历史请假条数（逗号分隔，逐级累加）')
+@click.option('--repeat', default=20, show_default=True, help='每个查询重复次数')
+@with_appcontext
+def bench_leaves(students, history, repeat):
+    """
+    在一个事务内合成学生与请假历史，测量“某天在请假”“与区间重叠”查询随历史增长的耗时，结束后回滚。
+    """
+    import time
+    from datetime import timedelta
+    from sqlalchemy import insert, select
+    from app.models.school import School
+    from app.models.student_leave import StudentLeave
+    from app.services.leaves import active_on, overlapping
+    from app.utils.tz import now_local
+
+    today = now_local().date()
+    try:
+        school = School(name=f'bench-{uuid4().hex[:8]}', alias=f'B{uuid4().hex[:6]}')
+        db.session.add(school)
+        db.session.flush()
+        db.session.execute(insert(Student), [
+            {'name': f'学生{i}', 'student_number': f'{i:06d}', 'school_id': school.id} for i in range(students)
+        ])
+        ids = db.session.execute(select(Student.id).where(Student.school_id == school.id)).scalars().all()
+
+        queries = {
+            '今天在请假': select(func.count()).select_from(StudentLeave)
+            .where(StudentLeave.school_id == school.id, active_on(today)),
+            '与未来一周重叠': select(func.count()).select_from(StudentLeave)
+            .where(StudentLeave.school_id == school.id, overlapping(today, today + timedelta(days=6))),
+        }
+        done = 0
+        for level in sorted(int(x) for x in history.split(',')):
+            # 每条历史请假 3 天，按周错开，互不重叠；最新一条覆盖今天
+            rows = [{'student_id': sid, 'school_id': school.id,
+                     'start_date': today - timedelta(days=7 * k + 1), 'end_date': today - timedelta(days=7 * k - 1)}
+                    for k in range(done, level) for sid in ids]
+            if rows:
+                db.session.execute(insert(StudentLeave), rows)
+            done = max(done, level)
+            for label, stmt in queries.items():
+                db.session.execute(stmt).scalar()
+                t0 = time.perf_counter()
+                for _ in range(repeat):
+                    n = db.session.execute(stmt).scalar()
+                ms = (time.perf_counter() - t0) * 1000 / repeat
+                click.echo(f'history={level:<4} rows={level * students:<8} {label}: {n} 人 {ms:.2f}ms')
+    finally:
+        db.session.rollback()
+
+
 def register_cli(app):
     app.cli.add_command(init_db)
     app.cli.add_command(create_super)
+    app.cli.add_command(password_hash_stats)
+    app.cli.add_command(prune_revoked_tokens)
+    app.cli.add_command(reconcile_headcounts)
+    app.cli.add_command(compact_headcounts)
+    app.cli.add_command(backfill_leaves)
+    app.cli.add_command(snapshot_rosters)
+    app.cli.add_command(backfill_evaluation_threads)
+    app.cli.add_command(bench)
@@ -11,6 +11,65 @@ class BaseConfig:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=ACCESS_HOURS)  # 访问令牌有效期
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=REFRESH_DAYS)  # 刷新令牌有效期
     JWT_REFRESH_IF_EXPIRES_IN = timedelta(minutes=int(os.getenv("JWT_REFRESH_IF_EXPIRES_IN", 30)))
+    # 同一旧令牌续签结果的缓存秒数（并发请求共享同一个新令牌）
+    JWT_REFRESH_CACHE_SECONDS = int(os.getenv("JWT_REFRESH_CACHE_SECONDS", 60))
+    # 各 worker 拉取令牌撤销记录的间隔（秒）
+    TOKEN_BLOCKLIST_POLL_SECONDS = float(os.getenv("TOKEN_BLOCKLIST_POLL_SECONDS", 2))
+    # 各 worker 拉取数据版本计数器（ETag 用）的间隔（秒）
+    TABLE_VERSION_POLL_SECONDS = float(os.getenv("TABLE_VERSION_POLL_SECONDS", 2))
+    # 响应压缩：小于该字节数不压缩；压缩级别 1~9
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+    # 分页总数缓存：有效期（秒）与最多缓存的筛选条件数；表统计行数超过阈值时改用执行计划估算
+    COUNT_CACHE_TTL = int(os.getenv("COUNT_CACHE_TTL", 60))
+    COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", 1024))
+    COUNT_ESTIMATE_THRESHOLD = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", 500000))
+    # 管理员学校范围不超过该数量时用 IN 字面值，否则下推为子查询
+    ADMIN_SCOPE_INLINE_MAX = int(os.getenv("ADMIN_SCOPE_INLINE_MAX", 50))
+    # 请假差分合并：保留最近多少天的差分（更早的并入各校人数表），以及后台合并的间隔（秒）
+    HEADCOUNT_COMPACT_KEEP_DAYS = int(os.getenv("HEADCOUNT_COMPACT_KEEP_DAYS", 7))
+    HEADCOUNT_COMPACT_POLL_SECONDS = float(os.getenv("HEADCOUNT_COMPACT_POLL_SECONDS", 3600))
+    # /students/stats/range 单次最多查询的天数
+    STATS_RANGE_MAX_DAYS = int(os.getenv("STATS_RANGE_MAX_DAYS", 62))
+    # 批量导入学生：每批校验/写入的行数与单次最多导入的行数
+    BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", 500))
+    BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", 20000))
+    # 食堂核验名单：定期整体重建的间隔（秒），以及检查跨天的后台轮询间隔（秒）
+    EATING_ROSTER_REBUILD_SECONDS = float(os.getenv("EATING_ROSTER_REBUILD_SECONDS", 3600))
+    EATING_ROSTER_POLL_SECONDS = float(os.getenv("EATING_ROSTER_POLL_SECONDS", 30))
+    # 就餐名单快照：每天冻结名单的截止时间（HH:MM，本地时区）与并行处理的学校数
+    ROSTER_SNAPSHOT_CUTOFF = os.getenv("ROSTER_SNAPSHOT_CUTOFF", "10:00")
+    ROSTER_SNAPSHOT_WORKERS = int(os.getenv("ROSTER_SNAPSHOT_WORKERS", 4))
+    # 是否在进程内按截止时间自动生成快照（多 worker 时建议只在一个进程开启，或改用定时任务执行 snapshot-rosters）
+    ROSTER_SNAPSHOT_SCHEDULER = os.getenv("ROSTER_SNAPSHOT_SCHEDULER", "false").lower() == "true"
+    ROSTER_SNAPSHOT_POLL_SECONDS = float(os.getenv("ROSTER_SNAPSHOT_POLL_SECONDS", 60))
+    # 评价详情最多展开的回复层数（?depth= 不能超过该值）
+    EVALUATION_THREAD_MAX_DEPTH = int(os.getenv("EVALUATION_THREAD_MAX_DEPTH", 50))
+    # 列表接口的只读投影开关（只查所需列、不构造 ORM 实例）
+    LIST_PROJECTION_STUDENTS = os.getenv("LIST_PROJECTION_STUDENTS", "false").lower() == "true"
+    LIST_PROJECTION_EVALUATIONS = os.getenv("LIST_PROJECTION_EVALUATIONS", "false").lower() == "true"
+    LIST_PROJECTION_ADMINS = os.getenv("LIST_PROJECTION_ADMINS", "false").lower() == "true"
+    # 学校别名索引的最长存活时间（秒），用于感知其他 worker 对学校的修改
+    SCHOOL_ALIAS_INDEX_TTL = int(os.getenv("SCHOOL_ALIAS_INDEX_TTL", 60))
+    # bcrypt 线程池：并发数、排队上限、单次最长等待秒数
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 16))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))
+    # bcrypt 轮数；配置 BCRYPT_TARGET_MS（毫秒）后启动时在 [MIN, MAX] 内实测校准
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", 0))
+    BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", 10))
+    BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", 15))
+    # 登录失败短路：滑动窗口（秒）、账号/IP 阈值（IP 统计该 IP 的全部失败，应明显高于账号阈值）、首次封禁秒数与封禁上限（指数退避）
+    LOGIN_GUARD_WINDOW = int(os.getenv("LOGIN_GUARD_WINDOW", 300))
+    LOGIN_GUARD_ACCOUNT_THRESHOLD = int(os.getenv("LOGIN_GUARD_ACCOUNT_THRESHOLD", 5))
+    LOGIN_GUARD_IP_THRESHOLD = int(os.getenv("LOGIN_GUARD_IP_THRESHOLD", 50))
+    LOGIN_GUARD_BASE_LOCK = int(os.getenv("LOGIN_GUARD_BASE_LOCK", 30))
+    LOGIN_GUARD_MAX_LOCK = int(os.getenv("LOGIN_GUARD_MAX_LOCK", 3600))
+    # 配置后多 worker 共享失败计数（需要 redis 包），为空则仅进程内存
+    LOGIN_GUARD_REDIS_URL = os.getenv("LOGIN_GUARD_REDIS_URL", "")
+    # 部署在反向代理之后时信任的代理层数：按 X-Forwarded-For / X-Forwarded-Proto 还原客户端地址；0 表示不信任转发头
+    TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", 0))
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
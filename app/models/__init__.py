@@ -2,4 +2,9 @@ from .student import Student
 from .admin import Admin
 from .school import School
 from .admin_school_map import AdminSchoolMap
-from .evaluation import Evaluation, EvaluationCategory
\ No newline at end of file
+from .evaluation import Evaluation, EvaluationCategory
+from .revoked_token import RevokedToken
+from .table_version import TableVersion
+from .headcount import SchoolHeadcount, SchoolLeaveDelta
+from .student_leave import StudentLeave
+from .roster_snapshot import RosterSnapshot
@@ -1,5 +1,6 @@
 # app/models/evaluation.py
-from sqlalchemy import String, Text, ForeignKey
+from datetime import datetime
+from sqlalchemy import Index, Integer, String, Text, DateTime, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import BaseModel
 
@@ -17,6 +18,8 @@ class EvaluationCategory(BaseModel):
 # --- 评价与回复 ---
 class Evaluation(BaseModel):
     __tablename__ = 'evaluations'
+    # 列表按 (created_at, id) 倒序游标翻页
+    __table_args__ = (Index('ix_evaluations_created_id', 'created_at', 'id'),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     content: Mapped[str] = mapped_column(Text, nullable=False, comment="评价或回复内容")
@@ -31,6 +34,13 @@ class Evaluation(BaseModel):
 
     # --- 树形结构 ---
     parent_id: Mapped[int | None] = mapped_column(ForeignKey("evaluations.id"), nullable=True, index=True)
+    # 回复所属的顶层评价（顶层评价自身为空），整棵树可按 root_id 一次取出
+    root_id: Mapped[int | None] = mapped_column(ForeignKey("evaluations.id"), nullable=True, index=True)
+
+    # --- 顶层评价上冗余的回复统计（随回复写入维护，可用 flask backfill-evaluation-threads 重算） ---
+    reply_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False, comment="回复数")
+    last_reply_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, comment="最后回复时间")
+    last_reply_by: Mapped[str | None] = mapped_column(String(64), nullable=True, comment="最后回复人")
 
     # --- 关系定义 ---
     school = relationship("School")
@@ -38,5 +48,6 @@ class Evaluation(BaseModel):
     student = relationship("Student")
     admin = relationship("Admin")
 
-    parent = relationship("Evaluation", remote_side=[id], back_populates="replies")
-    replies = relationship("Evaluation", back_populates="parent", cascade="all, delete-orphan")
\ No newline at end of file
+    parent = relationship("Evaluation", remote_side=[id], foreign_keys=[parent_id], back_populates="replies")
+    replies = relationship("Evaluation", foreign_keys=[parent_id], back_populates="parent",
+                           cascade="all, delete-orphan")
\ No newline at end of file
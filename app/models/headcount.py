@@ -0,0 +1,32 @@
+# app/models/headcount.py
+from datetime import date
+from sqlalchemy import String, Integer, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class SchoolHeadcount(db.Model):
+    """
+    每所学校的学生人数（增量维护，可用 flask reconcile-headcounts 从 students 表重建）：
+    - total: 未删除的学生数
+    - not_eating: 其中 is_eating=False 的人数
+    - on_leave: 已并入的历史请假差分之和（定期把过去的 school_leave_deltas 合并到这里）
+    """
+    __tablename__ = 'school_headcounts'
+
+    school_id: Mapped[str] = mapped_column(String(36), ForeignKey("schools.id"), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    not_eating: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    on_leave: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+
+class SchoolLeaveDelta(db.Model):
+    """
+    请假人数的差分表：is_eating=True 的学生请假 [start, end] 记为 start 日 +1、end 次日 -1。
+    某天请假人数 = school_headcounts.on_leave + 该校 day <= 当天的 delta 之和。
+    """
+    __tablename__ = 'school_leave_deltas'
+
+    school_id: Mapped[str] = mapped_column(String(36), ForeignKey("schools.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    delta: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,21 @@
+# app/models/revoked_token.py
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class RevokedToken(db.Model):
+    """
+    令牌撤销记录（只增不改，自增 id 兼作版本号供各 worker 增量拉取）：
+    - kind='jti'：撤销单个令牌，value 为 jti
+    - kind='subject'：撤销某用户在 not_before 之前签发的全部令牌，value 为 "<type>:<uid>"
+    """
+    __tablename__ = 'revoked_tokens'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    value: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    not_before: Mapped[int | None] = mapped_column(Integer, nullable=True, comment="subject 撤销的截止签发时间戳")
+    expires_at: Mapped[int] = mapped_column(Integer, nullable=False, index=True, comment="记录可清理的时间戳")
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,25 @@
+# app/models/roster_snapshot.py
+from datetime import date, datetime
+from sqlalchemy import String, Integer, Date, DateTime, LargeBinary, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+from app.utils.tz import now_local
+
+
+class RosterSnapshot(db.Model):
+    """
+    每所学校每天的就餐名单快照（flask snapshot-rosters 在截止时间后生成），之后不再随学生数据变化：
+    - total / eating / not_eating / on_leave：当天的人数（on_leave 为开启就餐但请假的人数，total = 三者之和）
+    - base_id + states：按学生 ID 下标的状态数组（与核验名单相同的编码），zlib 压缩存放
+    """
+    __tablename__ = 'roster_snapshots'
+
+    school_id: Mapped[str] = mapped_column(String(36), ForeignKey("schools.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    eating: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    not_eating: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    on_leave: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    base_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    states: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now_local, nullable=False)
@@ -1,12 +1,13 @@
 # app/models/school.py
 from uuid import uuid4
 from datetime import datetime
-from sqlalchemy import String, DateTime, Boolean
+from sqlalchemy import String, DateTime, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.extensions import db
 
 class School(db.Model):
     __tablename__ = "schools"
+    __table_args__ = (Index('ix_schools_created_id', 'created_at', 'id'),)
 
     # 主键 UUID（字符串存储，更通用）
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
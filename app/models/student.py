@@ -1,12 +1,14 @@
 # app/models/student.py
 from datetime import date
-from sqlalchemy import String, Boolean, Date, ForeignKey
+from sqlalchemy import Index, String, Boolean, Date, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.extensions import db
 from .base import BaseModel
 
 class Student(BaseModel):
     __tablename__ = 'students'
+    # 列表按 (created_at, id) 倒序游标翻页
+    __table_args__ = (Index('ix_students_created_id', 'created_at', 'id'),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(64), nullable=False, comment="学生姓名")
@@ -15,7 +17,7 @@ class Student(BaseModel):
 
     # 就餐状态
     is_eating: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False, comment="是否就餐")
-    # 就餐请假时间段
+    # 当前（或下一个）请假时间段，由 student_leaves 同步过来，供列表展示和旧客户端使用
     leave_start_date: Mapped[date | None] = mapped_column(Date, nullable=True, comment="请假开始日期")
     leave_end_date: Mapped[date | None] = mapped_column(Date, nullable=True, comment="请假结束日期")
 
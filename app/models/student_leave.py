@@ -0,0 +1,29 @@
+# app/models/student_leave.py
+from datetime import date
+from sqlalchemy import Index, Integer, String, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+from .base import BaseModel
+
+
+class StudentLeave(BaseModel):
+    """
+    学生的请假时间段 [start_date, end_date]（含两端），同一学生的时间段互不重叠。
+    取消请假只截断/软删除今天及以后的部分，历史记录保留，过去日期的统计不会被改写。
+    school_id 在写入时从学生冗余过来，便于按学校统计。
+    """
+    __tablename__ = 'student_leaves'
+    __table_args__ = (
+        # “某天在请假”：end_date >= D AND start_date <= D；“与 [a, b] 重叠”：end_date >= a AND start_date <= b
+        # 以 end_date 开头：历史请假都已结束，范围扫描只落在近期/未来的记录上，不随历史增长
+        Index('ix_student_leaves_school_end_start', 'school_id', 'end_date', 'start_date'),
+        Index('ix_student_leaves_end_start', 'end_date', 'start_date'),
+        # 单个学生的请假记录、重叠检查
+        Index('ix_student_leaves_student_end', 'student_id', 'end_date'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), nullable=False)
+    school_id: Mapped[str] = mapped_column(String(36), ForeignKey("schools.id"), nullable=False)
+    start_date: Mapped[date] = mapped_column(Date, nullable=False, comment="请假开始日期")
+    end_date: Mapped[date] = mapped_column(Date, nullable=False, comment="请假结束日期")
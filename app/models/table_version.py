@@ -0,0 +1,17 @@
+# app/models/table_version.py
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.extensions import db
+
+
+class TableVersion(db.Model):
+    """
+    数据版本计数器，业务事务提交后用一个单独的短事务自增，供 ETag 计算使用：
+    - name='<表名>'：整表版本，表内任意行变化都会自增
+    - name='<表名>:<范围>'：按范围（如学校 id）划分的版本，只在该范围内的行变化时自增
+    - name='<表名>:*'：批量 UPDATE/DELETE 等无法确定范围的写入，所有范围版本都应视为变化
+    """
+    __tablename__ = 'table_versions'
+
+    name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -18,7 +18,7 @@ class EvaluationCategorySchema(BaseSchema):
 
 
 # --- 评价与回复 Schema ---
-class EvaluationSchema(BaseSchema):
+class EvaluationBaseSchema(BaseSchema):
     id = fields.Int(dump_only=True)
     content = fields.Str()
     created_at = fields.DateTime(dump_only=True)
@@ -29,10 +29,19 @@ class EvaluationSchema(BaseSchema):
     student = fields.Nested(StudentSchema, only=("id", "name"))
     admin = fields.Nested(AdminSchema, only=("id", "display_name"))
 
+
+class EvaluationSchema(EvaluationBaseSchema):
     # 递归嵌套，用于显示树形结构的回复
     replies = fields.List(fields.Nested('self'))
 
 
+class EvaluationListSchema(EvaluationBaseSchema):
+    """列表用：不带回复内容，只带回复统计。"""
+    reply_count = fields.Int()
+    last_reply_at = fields.DateTime(allow_none=True)
+    last_reply_by = fields.Str(allow_none=True)
+
+
 class EvaluationCreateSchema(BaseSchema):
     content = fields.Str(
         required=True,
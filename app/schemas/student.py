@@ -1,5 +1,5 @@
 # app/schemas/student.py
-from marshmallow import fields, validate, post_load, ValidationError
+from marshmallow import fields, validate, post_load, validates_schema, ValidationError
 from app.schemas.base import BaseSchema
 from app.schemas.school import SchoolOutSchema
 
@@ -81,3 +81,57 @@ class StudentLeaveSchema(BaseSchema):
             raise ValidationError("请假结束日期不能早于开始日期", "leave_end_date")
         return data
 
+
+class StudentBulkFilterSchema(BaseSchema):
+    """批量操作的学生筛选条件：学校、关键字、学生 ID 列表，至少提供一项。"""
+    school_id = fields.Str()
+    kw = fields.Str()
+    ids = fields.List(fields.Int(), validate=validate.Length(min=1, max=10000, error="学生 ID 数量需在1-10000之间"))
+
+    @validates_schema
+    def validate_filter(self, data, **kwargs):
+        if not (data.get('school_id') or (data.get('kw') or '').strip() or data.get('ids')):
+            raise ValidationError("至少提供 school_id、kw、ids 中的一项筛选条件", "school_id")
+
+
+class StudentBulkLeaveSchema(StudentBulkFilterSchema):
+    # 两个日期都为 null 表示清除请假
+    leave_start_date = fields.Date(
+        required=True,
+        allow_none=True,
+        error_messages={"required": "请假开始日期不能为空"}
+    )
+    leave_end_date = fields.Date(
+        required=True,
+        allow_none=True,
+        error_messages={"required": "请假结束日期不能为空"}
+    )
+
+    @post_load
+    def validate_dates(self, data, **kwargs):
+        start, end = data['leave_start_date'], data['leave_end_date']
+        if (start is None) != (end is None):
+            raise ValidationError("请假开始和结束日期需同时提供或同时为空", "leave_end_date")
+        if start and start > end:
+            raise ValidationError("请假结束日期不能早于开始日期", "leave_end_date")
+        return data
+
+
+class StudentBulkEatingSchema(StudentBulkFilterSchema):
+    is_eating = fields.Boolean(
+        required=True,
+        error_messages={"required": "就餐状态不能为空"}
+    )
+
+
+class StudentCheckinSchema(BaseSchema):
+    school_id = fields.Str(
+        required=True,
+        error_messages={"required": "学校不能为空", "null": "学校不能为空"}
+    )
+    ids = fields.List(
+        fields.Int(),
+        required=True,
+        validate=validate.Length(min=1, max=1000, error="学生 ID 数量需在1-1000之间"),
+        error_messages={"required": "学生 ID 不能为空"}
+    )
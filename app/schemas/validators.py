@@ -0,0 +1,207 @@
+# app/schemas/validators.py
+"""
+写接口的请求校验层：每个 Schema 只构造一次，并预先为每个字段生成快速转换函数。
+
+- 快速路径只处理“规范”输入（str 就是 str、bool 就是 bool、日期为 YYYY-MM-DD……），
+  字段自带的 validate=、@validates、@validates_schema、pre_load/post_load 钩子照常执行
+- 任何一步不满足或校验失败，都退回同一个 schema 实例的 load()，
+  因此错误信息（含中文提示）与直接用 marshmallow 完全一致
+- load_many() 供批量接口逐行校验，返回 (结果, 错误) 列表，单行开销很小
+- 快速路径用到 marshmallow 3 的内部方法（_invoke_*、_hooks 等），缺少时整个 loader 只走 schema.load()
+"""
+from __future__ import annotations
+import re
+import threading
+from collections.abc import Mapping
+from datetime import date
+from typing import Any, Callable
+
+from marshmallow import Schema, fields, ValidationError, EXCLUDE, missing as _missing
+from marshmallow.decorators import PRE_LOAD, POST_LOAD, VALIDATES, VALIDATES_SCHEMA
+
+try:
+    from marshmallow.error_store import ErrorStore
+except ImportError:  # pragma: no cover - marshmallow 内部模块调整时退回完整 load
+    ErrorStore = None
+
+# 快速路径依赖的 Schema 内部方法/属性
+_PRIVATE_API = ('_has_processors', '_invoke_load_processors', '_invoke_field_validators',
+                '_invoke_schema_validators', '_hooks')
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+class _Fallback(Exception):
+    """快速路径无法得出结论，交给 marshmallow 完整流程。"""
+
+
+def _convert_str(value):
+    if value.__class__ is not str:
+        raise _Fallback
+    return value
+
+
+def _convert_int(value):
+    if value.__class__ is not int:
+        raise _Fallback
+    return value
+
+
+def _convert_bool(value):
+    if value.__class__ is not bool:
+        raise _Fallback
+    return value
+
+
+def _convert_date(value):
+    if value.__class__ is not str or not _ISO_DATE.match(value):
+        raise _Fallback
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise _Fallback
+
+
+_CONVERTERS = {
+    fields.String: _convert_str,
+    fields.Integer: _convert_int,
+    fields.Boolean: _convert_bool,
+    fields.Date: _convert_date,
+}
+
+
+# Date 字段按这些格式解析时可以走 _convert_date，其余格式（如 '%d/%m/%Y'）交给字段自己解析
+_ISO_FORMATS = (None, 'iso', 'iso8601')
+
+
+def _field_converter(field: fields.Field) -> Callable[[Any], Any]:
+    conv = _CONVERTERS.get(type(field))
+    if conv is _convert_date and field.format not in _ISO_FORMATS:
+        conv = None
+    if conv is None and type(field) is fields.List:
+        inner = _field_converter(field.inner)
+
+        def conv(value):
+            if value.__class__ is not list:
+                raise _Fallback
+            return [inner(v) for v in value]
+    if conv is None:
+        # 其他字段：直接用字段自身的 deserialize（已包含其 validators）
+        def conv(value):
+            try:
+                return field.deserialize(value)
+            except ValidationError:
+                raise _Fallback
+        return conv
+
+    validators = list(field.validators)
+    if not validators:
+        return conv
+
+    def validated(value):
+        value = conv(value)
+        for v in validators:
+            try:
+                if v(value) is False:
+                    raise _Fallback
+            except ValidationError:
+                raise _Fallback
+        return value
+    return validated
+
+
+class CompiledLoader:
+    def __init__(self, schema: Schema):
+        self.schema = schema
+        # unknown 不是 EXCLUDE 时多余字段需要报错/保留，直接走 marshmallow；
+        # 当前 marshmallow 版本缺少快速路径用到的内部方法时同样如此
+        self._enabled = (schema.unknown == EXCLUDE and ErrorStore is not None
+                         and all(hasattr(schema, attr) for attr in _PRIVATE_API))
+        self._plan = []
+        if not self._enabled:
+            return
+        for name, field in schema.load_fields.items():
+            key = field.data_key if field.data_key is not None else name
+            self._plan.append((key, field.attribute or name, name, _field_converter(field),
+                               field.required, field.allow_none, field.load_default))
+        self._pre_load = schema._has_processors(PRE_LOAD)
+        self._post_load = schema._has_processors(POST_LOAD)
+        self._field_validators = bool(schema._hooks[VALIDATES])
+        self._schema_validators = schema._has_processors(VALIDATES_SCHEMA)
+
+    def load(self, data, *, partial: bool | tuple = False) -> dict:
+        """与 schema.load(data, partial=partial) 等价，失败时抛出相同的 ValidationError。"""
+        if self._enabled and isinstance(data, Mapping):
+            try:
+                # pre_load 钩子可能原地修改数据，快速路径用副本
+                return self._fast(dict(data), partial)
+            except (_Fallback, ValidationError):
+                pass
+        return self.schema.load(data, partial=partial)
+
+    def load_many(self, rows, *, partial: bool | tuple = False) -> list[tuple[dict | None, dict | None]]:
+        """逐行校验，返回 [(数据, None) 或 (None, 错误信息)]，不会因单行失败中断。"""
+        out = []
+        for row in rows:
+            try:
+                out.append((self.load(row, partial=partial), None))
+            except ValidationError as err:
+                out.append((None, err.normalized_messages()))
+        return out
+
+    def _fast(self, data: dict, partial) -> dict:
+        schema = self.schema
+        original = data
+        if self._pre_load:
+            data = schema._invoke_load_processors(PRE_LOAD, data, many=False, original_data=original,
+                                                  partial=partial)
+            if not isinstance(data, Mapping):
+                raise _Fallback
+
+        result = {}
+        partial_names = partial if isinstance(partial, (tuple, list, set, frozenset)) else ()
+        for key, attr, name, conv, required, allow_none, load_default in self._plan:
+            value = data.get(key, _missing)
+            if value is _missing:
+                if partial is True or name in partial_names:
+                    continue
+                if load_default is not _missing:
+                    result[attr] = load_default() if callable(load_default) else load_default
+                elif required:
+                    raise _Fallback
+                continue
+            if value is None:
+                if not allow_none:
+                    raise _Fallback
+                result[attr] = None
+                continue
+            result[attr] = conv(value)
+
+        if self._field_validators or self._schema_validators:
+            store = ErrorStore()
+            schema._invoke_field_validators(error_store=store, data=result, many=False)
+            for pass_many in (True, False):
+                schema._invoke_schema_validators(error_store=store, pass_many=pass_many, data=result,
+                                                 original_data=original, many=False, partial=partial)
+            if store.errors:
+                raise _Fallback
+
+        if self._post_load:
+            result = schema._invoke_load_processors(POST_LOAD, result, many=False, original_data=original,
+                                                    partial=partial)
+        return result
+
+
+_loaders: dict[type, CompiledLoader] = {}
+_loaders_lock = threading.Lock()
+
+
+def compiled_loader(schema_cls: type[Schema]) -> CompiledLoader:
+    """按 Schema 类缓存 CompiledLoader（进程内共享同一个 schema 实例）。"""
+    loader = _loaders.get(schema_cls)
+    if loader is None:
+        with _loaders_lock:
+            loader = _loaders.get(schema_cls)
+            if loader is None:
+                loader = _loaders[schema_cls] = CompiledLoader(schema_cls())
+    return loader
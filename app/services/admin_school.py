@@ -5,6 +5,8 @@ from sqlalchemy import select, update
 from app.extensions import db
 from app.models.school import School
 from app.models.admin_school_map import AdminSchoolMap
+from app.services.versions import table_versions
+from app.services.admin_scope import admin_scopes
 
 def ensure_schools_exist_or_400(ids: Sequence[str]):
     """DB 校验：所有 id 必须存在且未删除；否则抛 400（你也可以抛 ValidationError 走统一返回）。"""
@@ -43,12 +45,16 @@ def bind_schools_to_admin(aid: str, ids: Iterable[str]):
             update(AdminSchoolMap)
             .where(AdminSchoolMap.admin_id == aid, AdminSchoolMap.school_id.in_(to_reactivate))
             .values(is_deleted=False)
+            .execution_options(version_scopes=(aid,))
         )
 
     # 批量插入
     if to_insert:
         db.session.bulk_save_objects([AdminSchoolMap(admin_id=aid, school_id=sid) for sid in to_insert])
+        # bulk_save_objects 不触发 flush 事件，手动更新版本
+        table_versions.touch('admin_school_map', aid)
 
+    admin_scopes.invalidate(aid)
     return len(to_reactivate) + len(to_insert)
 
 def replace_admin_schools(aid: str, new_ids: Sequence[str]):
@@ -72,14 +78,18 @@ def replace_admin_schools(aid: str, new_ids: Sequence[str]):
             update(AdminSchoolMap)
             .where(AdminSchoolMap.admin_id == aid, AdminSchoolMap.school_id.in_(to_reactivate))
             .values(is_deleted=False)
+            .execution_options(version_scopes=(aid,))
         )
     if to_soft_delete:
         db.session.execute(
             update(AdminSchoolMap)
             .where(AdminSchoolMap.admin_id == aid, AdminSchoolMap.school_id.in_(to_soft_delete))
             .values(is_deleted=True)
+            .execution_options(version_scopes=(aid,))
         )
     if to_add:
         db.session.bulk_save_objects([AdminSchoolMap(admin_id=aid, school_id=sid) for sid in to_add])
+        table_versions.touch('admin_school_map', aid)
 
+    admin_scopes.invalidate(aid)
     return len(to_add), len(to_reactivate), len(to_soft_delete)
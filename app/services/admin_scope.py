@@ -0,0 +1,86 @@
+# app/services/admin_scope.py
+from __future__ import annotations
+import threading
+
+from flask import g, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.admin_school_map import AdminSchoolMap
+from app.services.versions import table_versions
+from app.utils.security import is_super_id
+
+
+class AdminScope:
+    """管理员可管理的学校范围；超级管理员不受限制（school_ids 为 None）。"""
+    __slots__ = ('uid', 'school_ids')
+
+    def __init__(self, uid: str, school_ids: frozenset[str] | None):
+        self.uid = uid
+        self.school_ids = school_ids
+
+    @property
+    def is_super(self) -> bool:
+        return self.school_ids is None
+
+    def can_access(self, school_id) -> bool:
+        return self.is_super or school_id in self.school_ids
+
+    def condition(self, column):
+        """
+        学校范围条件（超级管理员返回 None，即不加条件）：
+        - 学校数不超过 ADMIN_SCOPE_INLINE_MAX 时用 IN (字面值)
+        - 更大的范围下推为子查询，不在 SQL 里展开长列表
+        """
+        if self.is_super:
+            return None
+        if len(self.school_ids) <= current_app.config['ADMIN_SCOPE_INLINE_MAX']:
+            return column.in_(sorted(self.school_ids))
+        managed = (select(AdminSchoolMap.school_id)
+                   .where(AdminSchoolMap.admin_id == self.uid, AdminSchoolMap.is_deleted.is_(False)))
+        return column.in_(managed)
+
+    def apply(self, q, column):
+        """给查询加上学校范围条件。"""
+        cond = self.condition(column)
+        return q if cond is None else q.filter(cond)
+
+
+class AdminScopeResolver:
+    """
+    每个请求只解析一次（存放在 g 上）；跨请求按管理员缓存，
+    以 admin_school_map 的范围版本为戳，绑定关系变化后自动重新查询。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: dict[str, tuple[tuple, frozenset[str]]] = {}
+
+    def current(self) -> AdminScope:
+        scope = g.get('_admin_scope')
+        if scope is None:
+            scope = g._admin_scope = self.resolve(str(get_jwt_identity() or ""))
+        return scope
+
+    def resolve(self, uid: str) -> AdminScope:
+        if is_super_id(uid):
+            return AdminScope(uid, None)
+        stamp = table_versions.scoped('admin_school_map', uid)
+        cached = self._cache.get(uid)
+        if cached and cached[0] == stamp:
+            return AdminScope(uid, cached[1])
+        ids = frozenset(db.session.execute(
+            select(AdminSchoolMap.school_id)
+            .where(AdminSchoolMap.admin_id == uid, AdminSchoolMap.is_deleted.is_(False))
+        ).scalars())
+        with self._lock:
+            self._cache[uid] = (stamp, ids)
+        return AdminScope(uid, ids)
+
+    def invalidate(self, uid: str):
+        with self._lock:
+            self._cache.pop(uid, None)
+
+
+admin_scopes = AdminScopeResolver()
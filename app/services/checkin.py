@@ -0,0 +1,159 @@
+# app/services/checkin.py
+"""
+食堂核验用的“今天谁就餐”内存名单：每所学校一份，按学生 ID 下标存放状态的字节数组。
+- 首次查询（或跨天、超过 EATING_ROSTER_REBUILD_SECONDS）时按学校一次查询整体构建
+- 学校的 students / student_leaves 范围版本变化时，只查 updated_at 晚于上次构建的学生，逐个修补
+- 后台线程在跨天后预先重建已加载的学校，日切后的第一波核验不用等待
+版本戳只读内存，名单未变化时一次查询就是一次数组访问，不访问数据库。
+"""
+from __future__ import annotations
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, union, or_
+
+from app.extensions import db
+from app.models.student import Student
+from app.models.student_leave import StudentLeave
+from app.services.leaves import active_on
+from app.services.versions import table_versions
+from app.utils.poller import BackgroundPoller
+from app.utils.tz import now_local
+
+# 数组中的状态值；0 表示不是该校（未删除）的学生。未开启就餐又在请假的单独记一个值，名单快照要按请假筛选
+UNKNOWN, EATING, NOT_EATING, ON_LEAVE, NOT_EATING_ON_LEAVE = 0, 1, 2, 3, 4
+STATUS_NAMES = {UNKNOWN: 'unknown', EATING: 'eating', NOT_EATING: 'not_eating', ON_LEAVE: 'on_leave',
+                NOT_EATING_ON_LEAVE: 'not_eating'}
+
+# 修补时往前多看的时间：updated_at 在事务开始时取值，提交可能晚一些
+_LOOKBACK = timedelta(seconds=60)
+
+
+class _Roster:
+    __slots__ = ('day', 'base', 'states', 'stamp', 'built_at', 'rebuild_at')
+
+    def __init__(self, day: date, base: int, states: bytearray, stamp: tuple, built_at: datetime, rebuild_at: float):
+        self.day = day
+        self.base = base
+        self.states = states
+        self.stamp = stamp
+        self.built_at = built_at
+        self.rebuild_at = rebuild_at
+
+    def get(self, student_id: int) -> int:
+        i = student_id - self.base
+        return self.states[i] if 0 <= i < len(self.states) else UNKNOWN
+
+    def set(self, student_id: int, state: int):
+        i = student_id - self.base
+        if i < 0:
+            self.states[:0] = bytes(-i)
+            self.base, i = student_id, 0
+        elif i >= len(self.states):
+            self.states.extend(bytes(i - len(self.states) + 1))
+        self.states[i] = state
+
+
+class EatingRosters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rosters: dict[str, _Roster] = {}
+        self._poller = BackgroundPoller('eating-rosters', self._roll_over, 'EATING_ROSTER_POLL_SECONDS', 30)
+
+    def lookup(self, school_id: str, student_ids: list[int]) -> list[int]:
+        roster = self._current(school_id)
+        return [roster.get(sid) for sid in student_ids]
+
+    def _current(self, school_id: str) -> _Roster:
+        self._poller.ensure_started(current_app._get_current_object())
+        today = now_local().date()
+        stamp = _stamp(school_id)
+        roster = self._rosters.get(school_id)
+        if roster is None or roster.day != today or time.monotonic() > roster.rebuild_at:
+            roster = self._build(school_id, today)
+        elif roster.stamp != stamp:
+            roster = self._patch(roster, school_id, stamp)
+        return roster
+
+    def _build(self, school_id: str, day: date) -> _Roster:
+        stamp = _stamp(school_id)
+        built_at = now_local()
+        base, states = roster_states(school_id, day)
+        roster = _Roster(day, base, states, stamp, built_at,
+                         time.monotonic() + current_app.config['EATING_ROSTER_REBUILD_SECONDS'])
+        with self._lock:
+            self._rosters[school_id] = roster
+        return roster
+
+    def _patch(self, roster: _Roster, school_id: str, stamp: tuple) -> _Roster:
+        """
+        只重新计算上次构建/修补之后被修改过的学生（含请假记录被修改的学生）。
+        数组下标范围内的学生也要看：转去其他学校的学生不再满足 school_id 条件，需要从名单中去掉。
+        """
+        built_at = now_local()
+        since = roster.built_at - _LOOKBACK
+        in_roster = or_(Student.school_id == school_id,
+                        Student.id.between(roster.base, roster.base + len(roster.states) - 1))
+        ids = db.session.execute(union(
+            select(Student.id).where(in_roster, Student.updated_at >= since),
+            select(StudentLeave.student_id).where(StudentLeave.school_id == school_id,
+                                                  StudentLeave.updated_at >= since),
+        )).scalars().all()
+        if ids:
+            rows = db.session.execute(
+                select(Student.id, Student.is_eating, Student.is_deleted, Student.school_id)
+                .where(Student.id.in_(ids))
+            ).all()
+            on_leave = set(db.session.execute(
+                select(StudentLeave.student_id).where(StudentLeave.student_id.in_(ids), active_on(roster.day))
+            ).scalars())
+            # 在副本上修改，并发读取的线程始终看到完整的数组
+            patched = _Roster(roster.day, roster.base, bytearray(roster.states), stamp, built_at, roster.rebuild_at)
+            for sid, is_eating, is_deleted, sch in rows:
+                gone = is_deleted or sch != school_id
+                patched.set(sid, UNKNOWN if gone else _state(is_eating, sid in on_leave))
+        else:
+            patched = _Roster(roster.day, roster.base, roster.states, stamp, built_at, roster.rebuild_at)
+        with self._lock:
+            self._rosters[school_id] = patched
+        return patched
+
+    def _roll_over(self):
+        """跨天后预先重建已加载的学校。"""
+        today = now_local().date()
+        for school_id, roster in list(self._rosters.items()):
+            if roster.day != today:
+                self._build(school_id, today)
+
+
+def roster_states(school_id: str, day: date) -> tuple[int, bytearray]:
+    """按当前数据计算学校某天的状态数组，返回 (起始学生 ID, 数组)；两条查询。"""
+    students = db.session.execute(
+        select(Student.id, Student.is_eating)
+        .where(Student.school_id == school_id, Student.is_deleted.is_(False))
+    ).all()
+    on_leave = set(db.session.execute(
+        select(StudentLeave.student_id).where(StudentLeave.school_id == school_id, active_on(day))
+    ).scalars())
+
+    base = min((sid for sid, _ in students), default=0)
+    top = max((sid for sid, _ in students), default=-1)
+    states = bytearray(top - base + 1)
+    for sid, is_eating in students:
+        states[sid - base] = _state(is_eating, sid in on_leave)
+    return base, states
+
+
+def _stamp(school_id: str) -> tuple:
+    return table_versions.scoped('students', school_id), table_versions.scoped('student_leaves', school_id)
+
+
+def _state(is_eating: bool, on_leave: bool) -> int:
+    if not is_eating:
+        return NOT_EATING_ON_LEAVE if on_leave else NOT_EATING
+    return ON_LEAVE if on_leave else EATING
+
+
+eating_rosters = EatingRosters()
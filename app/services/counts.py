@@ -0,0 +1,116 @@
+# app/services/counts.py
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.extensions import db
+from app.services.versions import table_versions
+
+
+class CountCache:
+    """
+    分页 total 的缓存：
+    - 键为 COUNT 查询编译后的 SQL + 参数（筛选条件与权限范围都体现在 WHERE 中）
+    - 值带上依赖表的版本号，表有写入（版本变化）即失效；另有 COUNT_CACHE_TTL 兜底
+    - 依赖表的估算行数超过 COUNT_ESTIMATE_THRESHOLD 时，改用数据库执行计划的估算行数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[tuple, float, int, bool]] = OrderedDict()
+        self._table_rows: dict[str, tuple[float, int]] = {}
+
+    def count(self, q, tables: tuple[str, ...]) -> tuple[int, bool]:
+        """返回 (总数, 是否为估算值)。"""
+        cfg = current_app.config
+        q = q.order_by(None)
+        stmt = q.statement
+        # 展开 IN 列表的 POSTCOMPILE 占位符：缓存键按实际取值区分，EXPLAIN 也能直接执行
+        compiled = stmt.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+        key = (compiled.string, repr(sorted(compiled.params.items())))
+        versions = tuple(table_versions.get(t) for t in tables)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == versions and entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[2], entry[3]
+
+        total, estimated = None, False
+        if tables and self.table_rows(tables[0]) > cfg['COUNT_ESTIMATE_THRESHOLD']:
+            total = _planner_rows(compiled)
+            estimated = total is not None
+        if total is None:
+            total = q.count()
+
+        with self._lock:
+            self._entries[key] = (versions, now + cfg['COUNT_CACHE_TTL'], total, estimated)
+            self._entries.move_to_end(key)
+            while len(self._entries) > cfg['COUNT_CACHE_SIZE']:
+                self._entries.popitem(last=False)
+        return total, estimated
+
+    def table_rows(self, table: str) -> int:
+        """表的统计行数，按 COUNT_CACHE_TTL 缓存。"""
+        now = time.monotonic()
+        cached = self._table_rows.get(table)
+        if cached and cached[0] > now:
+            return cached[1]
+        rows = _table_rows(table)
+        self._table_rows[table] = (now + current_app.config['COUNT_CACHE_TTL'], rows)
+        return rows
+
+
+def _table_rows(table: str) -> int:
+    """数据库统计信息中的表行数（不扫表）；不支持的数据库返回 0，即总是精确 COUNT。"""
+    name = db.engine.dialect.name
+    try:
+        if name == 'postgresql':
+            sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = :t'
+        elif name in ('mysql', 'mariadb'):
+            sql = ('SELECT TABLE_ROWS FROM information_schema.TABLES '
+                   'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t')
+        else:
+            return 0
+        # 放在保存点里，失败不会中断当前事务
+        with db.session.begin_nested():
+            return int(db.session.execute(text(sql), {'t': table}).scalar() or 0)
+    except Exception:
+        current_app.logger.warning('读取 %s 行数统计失败，改用精确 COUNT', table, exc_info=True)
+        return 0
+
+
+def _planner_rows(compiled) -> int | None:
+    """用 EXPLAIN 取执行计划估算的结果行数，失败时返回 None。"""
+    if compiled.positional:
+        params = tuple(compiled.params[k] for k in compiled.positiontup)
+    else:
+        params = compiled.params
+    try:
+        with db.session.begin_nested():
+            return _explain_rows(db.session.connection(), compiled.string, params)
+    except Exception:
+        current_app.logger.warning('估算行数失败，改用精确 COUNT', exc_info=True)
+    return None
+
+
+def _explain_rows(conn, sql: str, params) -> int | None:
+    """按数据库方言执行 EXPLAIN 并取出估算行数；不支持的数据库返回 None。"""
+    name = conn.dialect.name
+    if name == 'postgresql':
+        plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql, params).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]['Plan']['Plan Rows'])
+    if name in ('mysql', 'mariadb'):
+        row = conn.exec_driver_sql('EXPLAIN ' + sql, params).mappings().first()
+        return int((row['rows'] or 0) * float(row['filtered'] or 100) / 100)
+    return None
+
+
+count_cache = CountCache()
@@ -0,0 +1,116 @@
+# app/services/evaluation_threads.py
+"""
+顶层评价上冗余的回复统计：reply_count / last_reply_at / last_reply_by。
+新增回复时对顶层评价做一次原子自增；删除回复（连同其下级）、历史数据回填时按可见的回复树重算。
+"""
+from __future__ import annotations
+
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from app.models import Admin, Student
+from app.models.evaluation import Evaluation
+from app.utils.tz import now_local
+
+
+def record_reply(parent: Evaluation, reply: Evaluation, by_name: str | None):
+    """挂上 root_id 并更新顶层评价的统计，与回复在同一事务内。"""
+    root_id = parent.root_id or parent.id
+    reply.root_id = root_id
+    reply.created_at = now = now_local()
+    db.session.execute(
+        update(Evaluation).where(Evaluation.id == root_id)
+        .values(reply_count=Evaluation.reply_count + 1, last_reply_at=now, last_reply_by=by_name)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_thread(evaluation: Evaluation):
+    """
+    软删除评价及其全部下级回复（一条递归查询取 ID，一条 UPDATE），被删的是回复时重算所属顶层评价的统计。
+    下级一并标记删除，之后对它们的回复与统计都不会再把这部分算进来。
+    """
+    tree = select(Evaluation.id).where(Evaluation.id == evaluation.id).cte('subtree', recursive=True)
+    child = aliased(Evaluation)
+    tree = tree.union_all(select(child.id).where(child.parent_id == tree.c.id, child.is_deleted.is_(False)))
+    ids = db.session.execute(select(tree.c.id)).scalars().all()
+    db.session.execute(
+        update(Evaluation).where(Evaluation.id.in_(ids)).values(is_deleted=True)
+        .execution_options(synchronize_session=False)
+    )
+    evaluation.is_deleted = True
+    if evaluation.root_id:
+        refresh_reply_stats([evaluation.root_id])
+
+
+def _visible_replies(root_ids: list[int]):
+    """
+    各顶层评价下可见的回复 (root, id)：与 load_thread 一致，逐层跳过已删除的回复，
+    其下级即使未标记删除（级联删除之前的历史数据）也不计入。
+    """
+    tree = (select(Evaluation.parent_id.label('root'), Evaluation.id)
+            .where(Evaluation.parent_id.in_(root_ids), Evaluation.is_deleted.is_(False))
+            .cte('visible', recursive=True))
+    child = aliased(Evaluation)
+    return tree.union_all(
+        select(tree.c.root, child.id).where(child.parent_id == tree.c.id, child.is_deleted.is_(False))
+    )
+
+
+def refresh_reply_stats(root_ids: list[int]):
+    """
+    重算若干顶层评价的统计（只算可见的回复）：
+    一条递归查询得到回复数与最后一条回复，再一条查询取最后回复人的名称。
+    """
+    if not root_ids:
+        return
+    tree = _visible_replies(root_ids)
+    stats = db.session.execute(
+        select(tree.c.root, func.count(), func.max(tree.c.id)).group_by(tree.c.root)
+    ).all()
+    reply_student = aliased(Student)
+    last = {row[0]: row[1:] for row in db.session.execute(
+        select(Evaluation.id, Evaluation.created_at, func.coalesce(Admin.display_name, Admin.account), reply_student.name)
+        .outerjoin(Admin, Admin.id == Evaluation.admin_id)
+        .outerjoin(reply_student, reply_student.id == Evaluation.student_id)
+        .where(Evaluation.id.in_([row[2] for row in stats]))
+    )} if stats else {}
+
+    values = {root_id: {'id': root_id, 'reply_count': 0, 'last_reply_at': None, 'last_reply_by': None}
+              for root_id in root_ids}
+    for root_id, count, last_id in stats:
+        created_at, admin_name, student_name = last[last_id]
+        values[root_id].update(reply_count=count, last_reply_at=created_at, last_reply_by=admin_name or student_name)
+    db.session.execute(update(Evaluation), list(values.values()))
+
+
+def backfill_threads(batch_size: int = 500) -> tuple[int, int]:
+    """
+    回填历史数据（不 commit）：按 parent_id 链算出每条回复的 root_id，再重算所有顶层评价的统计。
+    返回 (回填 root_id 的回复数, 重算的顶层评价数)。
+    """
+    parents = dict(db.session.execute(
+        select(Evaluation.id, Evaluation.parent_id).execution_options(yield_per=5000)
+    ).all())
+
+    roots_of: dict[int, int] = {}
+
+    def root_of(eid):
+        path = []
+        while parents.get(eid) is not None and eid not in roots_of:
+            path.append(eid)
+            eid = parents[eid]
+        root = roots_of.get(eid, eid)
+        for node in path:
+            roots_of[node] = root
+        return root
+
+    replies = [{'id': eid, 'root_id': root_of(eid)} for eid, parent_id in parents.items() if parent_id is not None]
+    for i in range(0, len(replies), batch_size):
+        db.session.execute(update(Evaluation), replies[i:i + batch_size])
+
+    roots = [eid for eid, parent_id in parents.items() if parent_id is None]
+    for i in range(0, len(roots), batch_size):
+        refresh_reply_stats(roots[i:i + batch_size])
+    return len(replies), len(roots)
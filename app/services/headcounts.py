@@ -0,0 +1,366 @@
+# app/services/headcounts.py
+"""
+各校就餐人数的增量维护：
+写接口锁住学生行（SELECT ... FOR UPDATE），在修改学生（或其请假记录）前后各取一次 student_state()，
+再调用 record_student_change(before, after)，差值以 UPDATE ... SET x = x + :d 的方式写入
+school_headcounts / school_leave_deltas，与业务写入同一事务。
+统计接口只读这两张表，耗时与学校数相关，与学生数无关。
+后台线程按 HEADCOUNT_COMPACT_POLL_SECONDS 把 HEADCOUNT_COMPACT_KEEP_DAYS 天以前的差分并入 school_headcounts.on_leave，
+差分表只保留最近一段与未来的行，读取不随历史增长。
+"""
+from __future__ import annotations
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import select, update, insert, delete, func, case
+from sqlalchemy.exc import IntegrityError
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.student import Student
+from app.models.school import School
+from app.models.student_leave import StudentLeave
+from app.models.headcount import SchoolHeadcount, SchoolLeaveDelta
+from app.models.roster_snapshot import RosterSnapshot
+from app.utils.poller import BackgroundPoller
+from app.utils.tz import now_local
+
+
+class StudentState(NamedTuple):
+    """影响人数统计的学生状态；已删除的学生没有状态（None）。"""
+    school_id: str
+    is_eating: bool
+    # 全部请假区间 ((start, end), ...)；不就餐的学生不计请假，始终为空
+    leaves: tuple[tuple[date, date], ...]
+
+
+def student_state(s: Student | None) -> StudentState | None:
+    if s is None or s.is_deleted:
+        return None
+    # 新建且尚未 flush 的学生 is_eating 可能还是 None，按列默认值 True 处理
+    is_eating = s.is_eating is not False
+    return StudentState(s.school_id, is_eating, leave_intervals(s.id) if is_eating else ())
+
+
+def leave_intervals(student_id: int | None) -> tuple[tuple[date, date], ...]:
+    if student_id is None:
+        return ()
+    return tuple(tuple(row) for row in db.session.execute(
+        select(StudentLeave.start_date, StudentLeave.end_date)
+        .where(StudentLeave.student_id == student_id, StudentLeave.is_deleted.is_(False))
+        .order_by(StudentLeave.start_date)
+    ))
+
+
+class HeadcountDelta:
+    """累积若干学生的变化，最后一次性写入（批量接口可以复用）。"""
+
+    def __init__(self):
+        self.total: Counter = Counter()
+        self.not_eating: Counter = Counter()
+        self.leave: Counter = Counter()
+
+    def add(self, state: StudentState | None, sign: int):
+        if state is None:
+            return
+        self.total[state.school_id] += sign
+        if not state.is_eating:
+            self.not_eating[state.school_id] += sign
+        for start, end in state.leaves:
+            self.add_leave(state.school_id, start, end, sign)
+
+    def add_leave(self, school_id: str, start: date, end: date, count: int):
+        """count 个就餐学生在 [start, end] 请假（count 为负表示撤销）。"""
+        if start <= end:
+            self.leave[(school_id, start)] += count
+            self.leave[(school_id, end + timedelta(days=1))] -= count
+
+    def change(self, before: StudentState | None, after: StudentState | None):
+        if before != after:
+            self.add(before, -1)
+            self.add(after, 1)
+
+    def flush(self):
+        for school_id in sorted(set(self.total) | set(self.not_eating)):
+            d_total, d_not = self.total[school_id], self.not_eating[school_id]
+            if d_total or d_not:
+                _increment(SchoolHeadcount, {'school_id': school_id},
+                           {'total': d_total, 'not_eating': d_not})
+        for (school_id, day), d in sorted(self.leave.items()):
+            if d:
+                _increment(SchoolLeaveDelta, {'school_id': school_id, 'day': day}, {'delta': d})
+        self.total.clear()
+        self.not_eating.clear()
+        self.leave.clear()
+
+
+def record_student_change(before: StudentState | None, after: StudentState | None):
+    delta = HeadcountDelta()
+    delta.change(before, after)
+    delta.flush()
+
+
+# 按学生 ID 分批执行的 IN 列表长度（SQLite 单条语句的参数个数有限）
+_ID_BATCH = 5000
+
+
+def lock_students(where: list, *columns) -> list:
+    """
+    按 ID 顺序锁住满足 where 的学生行（SELECT ... FOR UPDATE），返回 (id, *columns)。
+    单个学生的写接口同样先锁学生行，批量写入的差值只按锁住的这些行计算、UPDATE 也只作用于这些行，
+    两者之间不会有并发修改让统计表偏离。
+    """
+    return db.session.execute(
+        select(Student.id, *columns).where(*where).order_by(Student.id).with_for_update()
+    ).all()
+
+
+def id_batches(ids: list[int]):
+    for i in range(0, len(ids), _ID_BATCH):
+        yield ids[i:i + _ID_BATCH]
+
+
+def bulk_set_eating(where: list, is_eating: bool) -> int:
+    """
+    对满足 where 的学生设置 is_eating，返回修改的行数。
+    已经是目标值的学生不在 WHERE 内；先锁住命中的学生行，再按这些行的学校、(学校, 请假区间) 分组计数，
+    差值随 UPDATE 在同一事务写入统计表，不逐个加载学生。
+    """
+    where = [*where, Student.is_deleted.is_(False), Student.is_eating.is_(not is_eating)]
+    rows = lock_students(where, Student.school_id)
+    if not rows:
+        return 0
+
+    # 改为不就餐：人数计入 not_eating，原有请假不再计入；改为就餐反之
+    sign = -1 if is_eating else 1
+    delta = HeadcountDelta()
+    for school_id, n in Counter(school_id for _, school_id in rows).items():
+        delta.not_eating[school_id] += sign * n
+    school_ids = tuple(sorted(delta.not_eating))
+
+    for ids in id_batches([sid for sid, _ in rows]):
+        for school_id, start, end, n in db.session.execute(
+            select(Student.school_id, StudentLeave.start_date, StudentLeave.end_date, func.count())
+            .join(Student, Student.id == StudentLeave.student_id)
+            .where(StudentLeave.student_id.in_(ids), StudentLeave.is_deleted.is_(False))
+            .group_by(Student.school_id, StudentLeave.start_date, StudentLeave.end_date)
+        ):
+            delta.add_leave(school_id, start, end, -sign * n)
+        db.session.execute(
+            update(Student).where(Student.id.in_(ids)).values(is_eating=is_eating)
+            .execution_options(synchronize_session=False, version_scopes=school_ids)
+        )
+    delta.flush()
+    return len(rows)
+
+
+def _increment(model, keys: dict, amounts: dict):
+    """原子自增；行不存在时插入（并发插入冲突时退回自增）。"""
+    where = [getattr(model, k) == v for k, v in keys.items()]
+    values = {k: getattr(model, k) + v for k, v in amounts.items()}
+    if db.session.execute(update(model).where(*where).values(**values)).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(model).values(**keys, **amounts))
+    except IntegrityError:
+        db.session.execute(update(model).where(*where).values(**values))
+
+
+# ---------------- 差分合并 ----------------
+def compact_leave_deltas(through: date) -> int:
+    """
+    把 day <= through 的请假差分并入 school_headcounts.on_leave 并删除（不 commit），返回合并的行数。
+    按 (学校, 日期, 值) 逐行删除：并发写入改了同一行时删除落空，该行留到下次合并，增量不会丢失；
+    多个 worker 同时合并也只有一个能删掉同一行。之后早于 through 的日期只能按 through 当天的请假人数统计。
+    """
+    folded, n = Counter(), 0
+    for school_id, day, d in db.session.execute(
+        select(SchoolLeaveDelta.school_id, SchoolLeaveDelta.day, SchoolLeaveDelta.delta)
+        .where(SchoolLeaveDelta.day <= through)
+        .order_by(SchoolLeaveDelta.school_id, SchoolLeaveDelta.day)
+    ).all():
+        if db.session.execute(
+            delete(SchoolLeaveDelta).where(SchoolLeaveDelta.school_id == school_id, SchoolLeaveDelta.day == day,
+                                           SchoolLeaveDelta.delta == d)
+        ).rowcount:
+            folded[school_id] += d
+            n += 1
+    for school_id, d in sorted(folded.items()):
+        if d:
+            _increment(SchoolHeadcount, {'school_id': school_id}, {'on_leave': d})
+    return n
+
+
+def _compact_tick():
+    keep = current_app.config['HEADCOUNT_COMPACT_KEEP_DAYS']
+    compact_leave_deltas(now_local().date() - timedelta(days=keep))
+    db.session.commit()
+
+
+# 每个进程一个；统计接口第一次被调用时启动
+_compactor = BackgroundPoller('headcount-compact', _compact_tick, 'HEADCOUNT_COMPACT_POLL_SECONDS', 3600)
+
+
+# ---------------- 读取 ----------------
+def headcount_stats(scope, target_date: date, school_id: str | None = None) -> dict:
+    """
+    某天（范围内或指定学校）的总人数 / 就餐人数 / 不就餐人数。
+    过去的日期优先读名单快照，没有快照的学校按当前数据计算。
+    """
+    _compactor.ensure_started(current_app._get_current_object())
+    snap_total = snap_not_eating = 0
+    covered = []
+    if target_date < now_local().date():
+        sq = db.session.query(RosterSnapshot.school_id, RosterSnapshot.total,
+                              RosterSnapshot.not_eating + RosterSnapshot.on_leave)
+        sq = scope.apply(sq.filter(RosterSnapshot.day == target_date), RosterSnapshot.school_id)
+        if school_id:
+            sq = sq.filter(RosterSnapshot.school_id == school_id)
+        for sid, total, not_eating in sq:
+            covered.append(sid)
+            snap_total += total
+            snap_not_eating += not_eating
+
+    q = db.session.query(func.sum(SchoolHeadcount.total), func.sum(SchoolHeadcount.not_eating),
+                         func.sum(SchoolHeadcount.on_leave))
+    q = scope.apply(q, SchoolHeadcount.school_id)
+    if school_id:
+        q = q.filter(SchoolHeadcount.school_id == school_id)
+    if covered:
+        q = q.filter(SchoolHeadcount.school_id.notin_(covered))
+    total, not_eating, compacted = q.one()
+
+    lq = db.session.query(func.sum(SchoolLeaveDelta.delta)).filter(SchoolLeaveDelta.day <= target_date)
+    lq = scope.apply(lq, SchoolLeaveDelta.school_id)
+    if school_id:
+        lq = lq.filter(SchoolLeaveDelta.school_id == school_id)
+    if covered:
+        lq = lq.filter(SchoolLeaveDelta.school_id.notin_(covered))
+    on_leave = lq.scalar()
+
+    total = (total or 0) + snap_total
+    not_eating_count = (not_eating or 0) + (compacted or 0) + (on_leave or 0) + snap_not_eating
+    return {
+        "total_students": total,
+        "eating_count": total - not_eating_count,
+        "not_eating_count": not_eating_count,
+    }
+
+
+def headcount_matrix(scope, start: date, end: date, school_id: str | None = None) -> dict:
+    """
+    [start, end] 内每所学校每天的就餐/不就餐人数。
+    差分表本身就是按天的差分数组：先取 start 当天的前缀和，再把区间内的差分一次扫过去；
+    过去日期有名单快照的，改用快照的人数。总共四条查询，与天数、学生数无关。
+    """
+    _compactor.ensure_started(current_app._get_current_object())
+    days = (end - start).days + 1
+    sq = (db.session.query(School.id, School.name, SchoolHeadcount.total, SchoolHeadcount.not_eating,
+                           SchoolHeadcount.on_leave)
+          .outerjoin(SchoolHeadcount, SchoolHeadcount.school_id == School.id)
+          .filter(School.is_deleted.is_(False)))
+    sq = scope.apply(sq, School.id)
+    if school_id:
+        sq = sq.filter(School.id == school_id)
+    schools = sq.order_by(School.created_at).all()
+    ids = [row[0] for row in schools]
+
+    base = dict(db.session.execute(
+        select(SchoolLeaveDelta.school_id, func.sum(SchoolLeaveDelta.delta))
+        .where(SchoolLeaveDelta.school_id.in_(ids), SchoolLeaveDelta.day <= start)
+        .group_by(SchoolLeaveDelta.school_id)
+    ).all()) if ids else {}
+    diffs = defaultdict(lambda: [0] * days)
+    if ids:
+        for sid, day, d in db.session.execute(
+            select(SchoolLeaveDelta.school_id, SchoolLeaveDelta.day, SchoolLeaveDelta.delta)
+            .where(SchoolLeaveDelta.school_id.in_(ids),
+                   SchoolLeaveDelta.day > start, SchoolLeaveDelta.day <= end)
+        ):
+            diffs[sid][(day - start).days] += d
+    snapshots = {}
+    yesterday = now_local().date() - timedelta(days=1)
+    if ids and start <= yesterday:
+        for sid, day, eating, total in db.session.execute(
+            select(RosterSnapshot.school_id, RosterSnapshot.day, RosterSnapshot.eating, RosterSnapshot.total)
+            .where(RosterSnapshot.school_id.in_(ids), RosterSnapshot.day >= start,
+                   RosterSnapshot.day <= min(end, yesterday))
+        ):
+            snapshots[(sid, (day - start).days)] = (eating, total - eating)
+
+    result = []
+    for sid, name, total, not_eating, compacted in schools:
+        total, not_eating = total or 0, not_eating or 0
+        on_leave = (compacted or 0) + (base.get(sid) or 0)
+        row_diff = diffs.get(sid)
+        eating_row, not_eating_row = [], []
+        for i in range(days):
+            if row_diff:
+                on_leave += row_diff[i]
+            snap = snapshots.get((sid, i))
+            if snap:
+                eating_row.append(snap[0])
+                not_eating_row.append(snap[1])
+                continue
+            n = not_eating + on_leave
+            not_eating_row.append(n)
+            eating_row.append(total - n)
+        result.append({
+            'school_id': sid,
+            'school_name': name,
+            'total_students': total,
+            'eating': eating_row,
+            'not_eating': not_eating_row,
+        })
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'dates': [(start + timedelta(days=i)).isoformat() for i in range(days)],
+        'schools': result,
+    }
+
+
+# ---------------- 重建 ----------------
+def rebuild_headcounts(compact_before: date | None = None) -> tuple[int, int]:
+    """
+    从 students / student_leaves 表全量重建两张统计表（不 commit），返回 (学校数, 差分行数)。
+    compact_before: 早于该日期的差分合并到这一天，减少历史行数（之前的日期不再能精确统计）。
+    """
+    totals = db.session.execute(
+        select(Student.school_id, func.count(),
+               func.sum(case((Student.is_eating.is_(False), 1), else_=0)))
+        .where(Student.is_deleted.is_(False))
+        .group_by(Student.school_id)
+    ).all()
+
+    leave = defaultdict(int)
+    rows = db.session.execute(
+        select(Student.school_id, StudentLeave.start_date, StudentLeave.end_date)
+        .join(Student, Student.id == StudentLeave.student_id)
+        .where(Student.is_deleted.is_(False), Student.is_eating.is_(True), StudentLeave.is_deleted.is_(False),
+               StudentLeave.start_date <= StudentLeave.end_date)
+        .execution_options(yield_per=1000)
+    )
+    for school_id, start, end in rows:
+        end_next = end + timedelta(days=1)
+        if compact_before:
+            if end_next <= compact_before:
+                continue
+            start = max(start, compact_before)
+        leave[(school_id, start)] += 1
+        leave[(school_id, end_next)] -= 1
+
+    db.session.execute(delete(SchoolHeadcount))
+    db.session.execute(delete(SchoolLeaveDelta))
+    if totals:
+        db.session.execute(insert(SchoolHeadcount), [
+            {'school_id': sid, 'total': total, 'not_eating': not_eating or 0}
+            for sid, total, not_eating in totals
+        ])
+    deltas = [{'school_id': sid, 'day': day, 'delta': d} for (sid, day), d in leave.items() if d]
+    if deltas:
+        db.session.execute(insert(SchoolLeaveDelta), deltas)
+    return len(totals), len(deltas)
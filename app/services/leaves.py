@@ -0,0 +1,162 @@
+# app/services/leaves.py
+"""
+请假时间段（student_leaves）的读写：
+- 单个学生的写接口先锁学生行，照旧在前后各取一次 student_state()（已包含全部请假区间），差值写入人数统计
+- 批量设置先锁住命中的学生行，按 (学校, 区间) 分组计数后整体写入统计，请假表与镜像列都用集合语句更新
+Student.leave_start_date / leave_end_date 是“当前或下一个”请假区间的镜像，每次写请假后同步。
+"""
+from __future__ import annotations
+from collections import Counter
+from datetime import date, timedelta
+
+from sqlalchemy import select, update, insert, func, and_, literal
+
+from app.extensions import db
+from app.models.student import Student
+from app.models.student_leave import StudentLeave
+from app.services.headcounts import HeadcountDelta, lock_students, id_batches
+from app.utils.exceptions import BizError
+from app.utils.tz import now_local
+
+
+# ---------------- 查询条件 ----------------
+def active_on(day: date):
+    """day 当天处于请假中。"""
+    return and_(StudentLeave.is_deleted.is_(False), StudentLeave.start_date <= day, StudentLeave.end_date >= day)
+
+
+def overlapping(start: date, end: date):
+    """与 [start, end] 有交集。"""
+    return and_(StudentLeave.is_deleted.is_(False), StudentLeave.start_date <= end, StudentLeave.end_date >= start)
+
+
+def on_leave_students(day: date):
+    """day 当天在请假的学生 ID 子查询（列表筛选用）。"""
+    return select(StudentLeave.student_id).where(active_on(day))
+
+
+def current_leave(student_id: int, today: date | None = None) -> tuple[date, date] | None:
+    """今天进行中的请假，没有则取下一个将要开始的请假。"""
+    today = today or now_local().date()
+    row = db.session.execute(
+        select(StudentLeave.start_date, StudentLeave.end_date)
+        .where(StudentLeave.student_id == student_id, StudentLeave.is_deleted.is_(False),
+               StudentLeave.end_date >= today)
+        .order_by(StudentLeave.start_date)
+        .limit(1)
+    ).first()
+    return tuple(row) if row else None
+
+
+# ---------------- 单个学生 ----------------
+def add_leave(student: Student, start: date, end: date):
+    """新增一段请假；与该学生已有的请假重叠时抛出 BizError。"""
+    clash = db.session.execute(
+        select(StudentLeave.id).where(StudentLeave.student_id == student.id, overlapping(start, end)).limit(1)
+    ).first()
+    if clash:
+        raise BizError("与已有的请假时间段重叠")
+    db.session.add(StudentLeave(student_id=student.id, school_id=student.school_id,
+                                start_date=start, end_date=end))
+    sync_mirror(student)
+
+
+def cancel_leaves(student: Student, from_day: date):
+    """取消 from_day 及以后的请假：之后才开始的删除，进行中的截断到前一天，更早的记录保留。"""
+    for leave in StudentLeave.query.filter(StudentLeave.student_id == student.id,
+                                           StudentLeave.is_deleted.is_(False),
+                                           StudentLeave.end_date >= from_day):
+        if leave.start_date >= from_day:
+            leave.soft_delete()
+        else:
+            leave.end_date = from_day - timedelta(days=1)
+    sync_mirror(student)
+
+
+def replace_leave(student: Student, start: date | None, end: date | None):
+    """
+    管理员直接设置请假时间段：取消今天以后的请假，再写入 [start, end]（start 早于今天时从今天算起）。
+    start/end 为 None 时只取消。
+    """
+    today = now_local().date()
+    start = _from_today(start, end, today)
+    cancel_leaves(student, today)
+    if start:
+        add_leave(student, start, end)
+
+
+def _from_today(start: date | None, end: date | None, today: date) -> date | None:
+    """过去的日期已计入统计与快照，不再改写：开始日期截到今天，整段都在过去时抛出 BizError。"""
+    if start is None:
+        return None
+    if end < today:
+        raise BizError("请假结束日期不能早于今天")
+    return max(start, today)
+
+
+def sync_mirror(student: Student):
+    cur = current_leave(student.id)
+    student.leave_start_date, student.leave_end_date = cur or (None, None)
+
+
+# ---------------- 批量 ----------------
+def _mirror_values(today: date) -> dict:
+    """镜像列的集合更新：关联子查询取每个学生当前或下一个请假区间。"""
+    nearest = (select(StudentLeave.start_date, StudentLeave.end_date)
+               .where(StudentLeave.student_id == Student.id, StudentLeave.is_deleted.is_(False),
+                      StudentLeave.end_date >= today)
+               .order_by(StudentLeave.start_date)
+               .limit(1))
+    return {
+        'leave_start_date': nearest.with_only_columns(StudentLeave.start_date).scalar_subquery(),
+        'leave_end_date': nearest.with_only_columns(StudentLeave.end_date).scalar_subquery(),
+    }
+
+
+def bulk_replace_leave(where: list, start: date | None, end: date | None) -> int:
+    """
+    对满足 where 的学生批量执行 replace_leave，返回涉及的学生数。
+    先锁住命中的学生行（lock_students），之后每一步都是按这些学生 ID 分批的集合语句：
+    截断/删除旧请假、INSERT ... SELECT 新请假、同步镜像列；人数统计的差值按锁住的行分组计数得出，与学生数无关。
+    """
+    today = now_local().date()
+    start = _from_today(start, end, today)
+    rows = lock_students([*where, Student.is_deleted.is_(False)], Student.school_id, Student.is_eating)
+    if not rows:
+        return 0
+    groups = Counter((school_id, is_eating) for _, school_id, is_eating in rows)
+    school_ids = tuple(sorted({school_id for school_id, _ in groups}))
+    opts = {'synchronize_session': False, 'version_scopes': school_ids}
+
+    delta = HeadcountDelta()
+    if start:
+        for (school_id, is_eating), n in groups.items():
+            if is_eating:
+                delta.add_leave(school_id, start, end, n)
+    now = now_local()
+    for ids in id_batches([sid for sid, _, _ in rows]):
+        later = [StudentLeave.student_id.in_(ids), StudentLeave.is_deleted.is_(False), StudentLeave.end_date >= today]
+        # 只有就餐学生的请假计入统计：被取消的部分是 [max(start, today), end]
+        for school_id, s, e, n in db.session.execute(
+            select(Student.school_id, StudentLeave.start_date, StudentLeave.end_date, func.count())
+            .join(Student, Student.id == StudentLeave.student_id)
+            .where(*later, Student.is_eating.is_(True))
+            .group_by(Student.school_id, StudentLeave.start_date, StudentLeave.end_date)
+        ):
+            delta.add_leave(school_id, max(s, today), e, -n)
+
+        db.session.execute(update(StudentLeave).where(*later, StudentLeave.start_date >= today)
+                           .values(is_deleted=True).execution_options(**opts))
+        db.session.execute(update(StudentLeave).where(*later, StudentLeave.start_date < today)
+                           .values(end_date=today - timedelta(days=1)).execution_options(**opts))
+        if start:
+            db.session.execute(insert(StudentLeave).from_select(
+                ['student_id', 'school_id', 'start_date', 'end_date', 'created_at', 'updated_at', 'is_deleted'],
+                select(Student.id, Student.school_id, literal(start), literal(end),
+                       literal(now), literal(now), literal(False)).where(Student.id.in_(ids))
+            ).execution_options(**opts))
+        db.session.execute(
+            update(Student).where(Student.id.in_(ids)).values(**_mirror_values(today)).execution_options(**opts)
+        )
+    delta.flush()
+    return len(rows)
@@ -0,0 +1,143 @@
+# app/services/login_guard.py
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+
+class MemoryGuardStore:
+    """进程内存储：每个 key 一条滑动窗口 + 连续封禁次数（用于指数退避）。"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._max_keys = max_keys
+
+    def blocked_until(self, key: str) -> float:
+        entry = self._entries.get(key)
+        return entry['until'] if entry else 0.0
+
+    def add_failure(self, key: str, now: float, window: int, threshold: int, base: int, cap: int) -> float:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self._max_keys:
+                    self._prune(now, cap)
+                entry = self._entries[key] = {'hits': deque(), 'strikes': 0, 'until': 0.0, 'touched': now}
+            # 距上次封禁足够久，退避次数清零
+            if entry['strikes'] and now - entry['touched'] > cap:
+                entry['strikes'] = 0
+            entry['touched'] = now
+            hits = entry['hits']
+            hits.append(now)
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= threshold:
+                entry['strikes'] += 1
+                entry['until'] = now + min(base * 2 ** (entry['strikes'] - 1), cap)
+                hits.clear()
+            return entry['until']
+
+    def reset(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _prune(self, now: float, cap: int):
+        stale = [k for k, e in self._entries.items() if e['until'] <= now and now - e['touched'] > cap]
+        for k in stale:
+            del self._entries[k]
+
+
+class RedisGuardStore:
+    """多 worker 共享存储（需要安装 redis 包）。"""
+
+    def __init__(self, url: str, prefix: str = 'login_guard:'):
+        try:
+            import redis
+        except ImportError as e:  # pragma: no cover - 仅在配置了 REDIS 时需要
+            raise RuntimeError('LOGIN_GUARD_REDIS_URL 已配置，但未安装 redis 包') from e
+        self._r = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def blocked_until(self, key: str) -> float:
+        val = self._r.get(f'{self._prefix}b:{key}')
+        return float(val) if val else 0.0
+
+    def add_failure(self, key: str, now: float, window: int, threshold: int, base: int, cap: int) -> float:
+        hits_key = f'{self._prefix}f:{key}'
+        strikes_key = f'{self._prefix}s:{key}'
+        pipe = self._r.pipeline()
+        pipe.zadd(hits_key, {repr(now): now})
+        pipe.zremrangebyscore(hits_key, '-inf', now - window)
+        pipe.zcard(hits_key)
+        pipe.expire(hits_key, window)
+        count = pipe.execute()[2]
+        if count < threshold:
+            return 0.0
+        pipe = self._r.pipeline()
+        pipe.incr(strikes_key)
+        pipe.expire(strikes_key, cap * 2)
+        pipe.delete(hits_key)
+        strikes = pipe.execute()[0]
+        lock = min(base * 2 ** (strikes - 1), cap)
+        until = now + lock
+        self._r.set(f'{self._prefix}b:{key}', until, ex=max(int(lock), 1))
+        return until
+
+    def reset(self, key: str):
+        self._r.delete(f'{self._prefix}f:{key}', f'{self._prefix}s:{key}', f'{self._prefix}b:{key}')
+
+
+class LoginGuard:
+    """
+    登录失败短路，滑动窗口内的失败次数达到阈值后按指数退避封禁一段时间：
+    - 账号：存在的账号密码错误时计数，封禁期内该账号的登录在查库和 bcrypt 之前直接拒绝
+    - 客户端 IP：统计该 IP 的全部失败（账号存在与否都算，防止对真实账号轮流猜密码），
+      封禁期内该 IP 的登录同样在查库和 bcrypt 之前拒绝；阈值应明显高于账号阈值，避免误伤共用出口的用户
+    """
+
+    def __init__(self):
+        self._store = None
+        self._store_lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    url = current_app.config.get('LOGIN_GUARD_REDIS_URL')
+                    self._store = RedisGuardStore(url) if url else MemoryGuardStore()
+        return self._store
+
+    @staticmethod
+    def account_key(user_type: str, account: str) -> str:
+        return f'acct:{user_type}:{account}'
+
+    @staticmethod
+    def ip_key(ip: str | None) -> str:
+        return f'ip:{ip or "-"}'
+
+    def retry_after(self, keys) -> int:
+        """返回需要等待的秒数，0 表示放行。"""
+        now = time.time()
+        until = max(self.store.blocked_until(k) for k in keys)
+        return int(until - now) + 1 if until > now else 0
+
+    def record_failure(self, account_key: str | None, ip_key: str):
+        """一次登录失败：计入客户端 IP；账号存在（account_key 不为空）时同时计入账号。"""
+        if account_key:
+            self._add(account_key, 'LOGIN_GUARD_ACCOUNT_THRESHOLD')
+        self._add(ip_key, 'LOGIN_GUARD_IP_THRESHOLD')
+
+    def _add(self, key: str, threshold_key: str):
+        cfg = current_app.config
+        self.store.add_failure(key, time.time(), cfg['LOGIN_GUARD_WINDOW'], cfg[threshold_key],
+                               cfg['LOGIN_GUARD_BASE_LOCK'], cfg['LOGIN_GUARD_MAX_LOCK'])
+
+    def record_success(self, account_key: str):
+        self.store.reset(account_key)
+
+
+login_guard = LoginGuard()
@@ -0,0 +1,215 @@
+# app/services/projections.py
+"""
+列表接口的只读投影：只查需要的列（连同学校/类别等名称一并 JOIN 出来），
+结果装进 __slots__ 行对象直接交给编译好的序列化器，不创建 ORM 实例、不进 identity map。
+行对象的属性名与对应 Schema 字段一致，可直接复用 StudentSchema / EvaluationSchema / AdminShowSchema。
+"""
+from __future__ import annotations
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import select, literal
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from app.models import Student, School, Admin, AdminSchoolMap, Evaluation, EvaluationCategory
+
+
+class SchoolRef:
+    __slots__ = ('id', 'name', 'alias')
+
+    def __init__(self, id, name, alias=None):
+        self.id, self.name, self.alias = id, name, alias
+
+
+class NamedRef:
+    """类别/学生等只需 id + name 的嵌套对象。"""
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id, name):
+        self.id, self.name = id, name
+
+
+class AdminRef:
+    __slots__ = ('id', 'display_name')
+
+    def __init__(self, id, display_name):
+        self.id, self.display_name = id, display_name
+
+
+class SchoolMapRef:
+    __slots__ = ('school_id', 'is_deleted')
+
+    def __init__(self, school_id):
+        self.school_id, self.is_deleted = school_id, False
+
+
+# ---------------- 学校 ----------------
+class SchoolRow:
+    __slots__ = ('id', 'name', 'alias', 'created_at', 'updated_at')
+
+    COLUMNS = (School.id, School.name, School.alias, School.created_at, School.updated_at)
+
+    def __init__(self, row):
+        self.id, self.name, self.alias, self.created_at, self.updated_at = row
+
+
+def project_schools(q):
+    return q.with_entities(*SchoolRow.COLUMNS)
+
+
+# ---------------- 学生 ----------------
+class StudentRow:
+    __slots__ = ('id', 'name', 'student_number', 'is_eating', 'leave_start_date', 'leave_end_date',
+                 'created_at', 'updated_at', 'school')
+
+    COLUMNS = (Student.id, Student.name, Student.student_number, Student.is_eating,
+               Student.leave_start_date, Student.leave_end_date, Student.created_at, Student.updated_at,
+               School.id, School.name, School.alias)
+
+    def __init__(self, row):
+        (self.id, self.name, self.student_number, self.is_eating, self.leave_start_date,
+         self.leave_end_date, self.created_at, self.updated_at, school_id, school_name, alias) = row
+        self.school = SchoolRef(school_id, school_name, alias) if school_id is not None else None
+
+    @property
+    def account(self):
+        """与 Student.account 一致：学校别名 + 学号。"""
+        if self.school:
+            return f"{self.school.alias}{self.student_number}"
+        return self.student_number
+
+
+def project_students(q):
+    """把 Student 过滤查询改为只取列表所需的列（外连学校）。"""
+    return q.outerjoin(School, School.id == Student.school_id).with_entities(*StudentRow.COLUMNS)
+
+
+# ---------------- 管理员 ----------------
+class AdminRow:
+    __slots__ = ('id', 'account', 'display_name', 'created_at', 'updated_at', 'school_maps')
+
+    COLUMNS = (Admin.id, Admin.account, Admin.display_name, Admin.created_at, Admin.updated_at)
+
+    def __init__(self, row):
+        self.id, self.account, self.display_name, self.created_at, self.updated_at = row
+        self.school_maps = []
+
+
+def project_admins(q):
+    return q.with_entities(*AdminRow.COLUMNS)
+
+
+def admin_rows(rows) -> list[AdminRow]:
+    """构造管理员行，并用一条查询补齐本页所有管理员的（未删除）学校绑定。"""
+    admins = [AdminRow(r) for r in rows]
+    if admins:
+        by_id = {a.id: a for a in admins}
+        maps = db.session.execute(
+            select(AdminSchoolMap.admin_id, AdminSchoolMap.school_id)
+            .where(AdminSchoolMap.admin_id.in_(list(by_id)), AdminSchoolMap.is_deleted.is_(False))
+        ).all()
+        for admin_id, school_id in maps:
+            by_id[admin_id].school_maps.append(SchoolMapRef(school_id))
+    return admins
+
+
+# ---------------- 评价 ----------------
+_EvalStudent = aliased(Student)
+
+
+class EvaluationRow:
+    __slots__ = ('id', 'content', 'created_at', 'school', 'category', 'student', 'admin', 'replies')
+
+    COLUMNS = (Evaluation.id, Evaluation.content, Evaluation.created_at,
+               School.id, School.name, EvaluationCategory.id, EvaluationCategory.name,
+               _EvalStudent.id, _EvalStudent.name, Admin.id, Admin.display_name)
+
+    def __init__(self, row):
+        (self.id, self.content, self.created_at, school_id, school_name, category_id, category_name,
+         student_id, student_name, admin_id, admin_name) = row
+        self.school = SchoolRef(school_id, school_name) if school_id is not None else None
+        self.category = NamedRef(category_id, category_name) if category_id is not None else None
+        self.student = NamedRef(student_id, student_name) if student_id is not None else None
+        self.admin = AdminRef(admin_id, admin_name) if admin_id is not None else None
+        self.replies = []
+
+
+class EvaluationListRow:
+    """列表用的评价行：不带回复树，只带顶层评价上冗余的回复统计。"""
+    __slots__ = ('id', 'content', 'created_at', 'school', 'category', 'student', 'admin',
+                 'reply_count', 'last_reply_at', 'last_reply_by')
+
+    COLUMNS = (*EvaluationRow.COLUMNS, Evaluation.reply_count, Evaluation.last_reply_at, Evaluation.last_reply_by)
+
+    def __init__(self, row):
+        (self.id, self.content, self.created_at, school_id, school_name, category_id, category_name,
+         student_id, student_name, admin_id, admin_name,
+         self.reply_count, self.last_reply_at, self.last_reply_by) = row
+        self.school = SchoolRef(school_id, school_name) if school_id is not None else None
+        self.category = NamedRef(category_id, category_name) if category_id is not None else None
+        self.student = NamedRef(student_id, student_name) if student_id is not None else None
+        self.admin = AdminRef(admin_id, admin_name) if admin_id is not None else None
+
+
+def _join_evaluation_refs(q):
+    return (q.outerjoin(School, School.id == Evaluation.school_id)
+            .outerjoin(EvaluationCategory, EvaluationCategory.id == Evaluation.category_id)
+            .outerjoin(_EvalStudent, _EvalStudent.id == Evaluation.student_id)
+            .outerjoin(Admin, Admin.id == Evaluation.admin_id))
+
+
+def project_evaluations(q):
+    return _join_evaluation_refs(q).with_entities(*EvaluationRow.COLUMNS)
+
+
+def project_evaluation_list(q):
+    return _join_evaluation_refs(q).with_entities(*EvaluationListRow.COLUMNS)
+
+
+def evaluation_rows(rows) -> list[EvaluationRow]:
+    """构造评价行，并逐层（每层一条查询）挂上回复树，与 Evaluation.replies 的内容一致。"""
+    roots = [EvaluationRow(r) for r in rows]
+    _attach_replies(roots)
+    return roots
+
+
+def load_thread(root_id: int, max_depth: int) -> EvaluationRow | None:
+    """
+    一条递归 CTE 取出整棵回复树（不含已删除的回复及其下级，最多 max_depth 层回复），
+    再在内存中按 parent_id 组装；查询次数与树的深度无关。
+    """
+    tree = (select(Evaluation.id, Evaluation.parent_id, literal(0).label('depth'))
+            .where(Evaluation.id == root_id, Evaluation.is_deleted.is_(False))
+            .cte('thread', recursive=True))
+    child = aliased(Evaluation)
+    tree = tree.union_all(
+        select(child.id, child.parent_id, tree.c.depth + 1)
+        .where(child.parent_id == tree.c.id, child.is_deleted.is_(False), tree.c.depth < max_depth)
+    )
+    q = _join_evaluation_refs(db.session.query(Evaluation).join(tree, tree.c.id == Evaluation.id))
+    rows = q.with_entities(tree.c.parent_id, *EvaluationRow.COLUMNS).order_by(tree.c.depth, Evaluation.id).all()
+    if not rows:
+        return None
+
+    root = EvaluationRow(rows[0][1:])
+    by_id = {root.id: root}
+    for parent_id, *cols in rows[1:]:
+        node = by_id[cols[0]] = EvaluationRow(cols)
+        by_id[parent_id].replies.append(node)
+    return root
+
+
+def _attach_replies(level: Iterable[EvaluationRow]):
+    by_id = {e.id: e for e in level}
+    while by_id:
+        q = db.session.query(Evaluation).filter(Evaluation.parent_id.in_(list(by_id)))
+        q = _join_evaluation_refs(q).with_entities(Evaluation.parent_id, *EvaluationRow.COLUMNS)
+        children = defaultdict(list)
+        for parent_id, *cols in q.order_by(Evaluation.id).all():
+            children[parent_id].append(EvaluationRow(cols))
+        next_level = {}
+        for parent_id, kids in children.items():
+            by_id[parent_id].replies = kids
+            next_level.update((k.id, k) for k in kids)
+        by_id = next_level
@@ -0,0 +1,63 @@
+# app/services/school_alias.py
+from __future__ import annotations
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.school import School
+
+
+class SchoolAliasIndex:
+    """
+    进程级学校别名前缀索引：把学生账号（别名+学号）一步拆成 (school_id, student_number) 候选。
+
+    - 别名唯一且不超过 16 位，按长度分桶的字典即可做最长前缀匹配，单次拆分最多 16 次字典查找
+    - 本进程内的学校增/改/删 commit 后调用 invalidate()；
+      其他 worker 的修改依赖 SCHOOL_ALIAS_INDEX_TTL 过期后重建
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (by_len, lengths) 作为一个整体发布，读方只取一次，不会看到新旧混搭的两半
+        self._index: tuple[dict[int, dict[str, str]], tuple[int, ...]] = ({}, ())
+        self._built_at: float | None = None
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_fresh(self):
+        ttl = current_app.config.get('SCHOOL_ALIAS_INDEX_TTL', 60)
+        built_at = self._built_at
+        if built_at is not None and time.monotonic() - built_at < ttl:
+            return
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+                return
+            rows = db.session.execute(
+                select(School.alias, School.id).where(School.is_deleted.is_(False))
+            ).all()
+            by_len: dict[int, dict[str, str]] = {}
+            for alias, school_id in rows:
+                by_len.setdefault(len(alias), {})[alias] = school_id
+            self._index = (by_len, tuple(sorted(by_len, reverse=True)))
+            self._built_at = time.monotonic()
+
+    def candidates(self, account: str) -> list[tuple[str, str]]:
+        """返回按别名长度从长到短排列的 (school_id, student_number) 候选列表。"""
+        self._ensure_fresh()
+        by_len, lengths = self._index
+        result = []
+        for n in lengths:
+            if n >= len(account):
+                continue
+            school_id = by_len[n].get(account[:n])
+            if school_id is not None:
+                result.append((school_id, account[n:]))
+        return result
+
+
+school_alias_index = SchoolAliasIndex()
@@ -0,0 +1,106 @@
+# app/services/snapshots.py
+"""
+就餐名单快照：每天过了 ROSTER_SNAPSHOT_CUTOFF 之后，把各校当天的名单冻结到 roster_snapshots。
+学生的就餐设置和请假之后还会改，过去日期的统计与导出读快照，不再按当前数据反推。
+生成方式：flask snapshot-rosters，或开启 ROSTER_SNAPSHOT_SCHEDULER 由进程内后台线程按截止时间补齐。
+"""
+from __future__ import annotations
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.school import School
+from app.models.roster_snapshot import RosterSnapshot
+from app.services.checkin import roster_states, EATING, NOT_EATING, ON_LEAVE, NOT_EATING_ON_LEAVE
+from app.utils.poller import BackgroundPoller
+from app.utils.tz import now_local
+
+
+class RosterSnapshots:
+    def __init__(self):
+        self._poller = BackgroundPoller('roster-snapshots', self._tick, 'ROSTER_SNAPSHOT_POLL_SECONDS', 60)
+
+    def init_app(self, app):
+        if not app.config['ROSTER_SNAPSHOT_SCHEDULER']:
+            return
+
+        # 按 pid 判断，gunicorn fork 出的每个 worker 在第一个请求时启动自己的线程
+        @app.before_request
+        def _start_roster_scheduler():
+            self._poller.ensure_started(app)
+
+    def take(self, day: date, school_ids: list[str] | None = None, workers: int | None = None) -> int:
+        """按当前数据为各校生成 day 的快照（已存在的覆盖），多所学校并行，返回处理的学校数。"""
+        app = current_app._get_current_object()
+        if school_ids is None:
+            school_ids = db.session.execute(select(School.id).where(School.is_deleted.is_(False))).scalars().all()
+        if not school_ids:
+            return 0
+
+        def run(school_id):
+            # 每个线程有自己的应用上下文与数据库会话，按学校各自提交
+            with app.app_context():
+                try:
+                    _snapshot_school(school_id, day)
+                    db.session.commit()
+                except IntegrityError:
+                    # 另一个进程同时写入了同一天的快照
+                    db.session.rollback()
+
+        workers = workers or app.config['ROSTER_SNAPSHOT_WORKERS']
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='roster-snapshot') as pool:
+            list(pool.map(run, school_ids))
+        return len(school_ids)
+
+    def _tick(self):
+        """调度：过了截止时间后，给当天还没有快照的学校补上。"""
+        now = now_local()
+        if now.time() < cutoff_time():
+            return
+        done = select(RosterSnapshot.school_id).where(RosterSnapshot.day == now.date())
+        missing = db.session.execute(
+            select(School.id).where(School.is_deleted.is_(False), School.id.notin_(done))
+        ).scalars().all()
+        if missing:
+            self.take(now.date(), missing)
+
+
+def cutoff_time():
+    return datetime.strptime(current_app.config['ROSTER_SNAPSHOT_CUTOFF'], '%H:%M').time()
+
+
+def _snapshot_school(school_id: str, day: date):
+    base, states = roster_states(school_id, day)
+    eating, on_leave = states.count(EATING), states.count(ON_LEAVE)
+    not_eating = states.count(NOT_EATING) + states.count(NOT_EATING_ON_LEAVE)
+    db.session.merge(RosterSnapshot(
+        school_id=school_id, day=day, total=eating + not_eating + on_leave,
+        eating=eating, not_eating=not_eating, on_leave=on_leave,
+        base_id=base, states=zlib.compress(bytes(states)), created_at=now_local(),
+    ))
+
+
+# ---------------- 读取 ----------------
+def snapshots_for(scope, day: date, school_id: str | None = None) -> list[RosterSnapshot]:
+    """范围内（或指定学校）某天的快照；今天及以后的日期不读快照。"""
+    if day >= now_local().date():
+        return []
+    q = RosterSnapshot.query.filter(RosterSnapshot.day == day)
+    q = scope.apply(q, RosterSnapshot.school_id)
+    if school_id:
+        q = q.filter(RosterSnapshot.school_id == school_id)
+    return q.all()
+
+
+def snapshot_student_ids(snap: RosterSnapshot, *wanted: int) -> list[int]:
+    """快照中处于给定状态之一的学生 ID。"""
+    states = zlib.decompress(snap.states)
+    return [snap.base_id + i for i, s in enumerate(states) if s in wanted]
+
+
+roster_snapshots = RosterSnapshots()
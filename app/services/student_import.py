@@ -0,0 +1,173 @@
+# app/services/student_import.py
+"""
+批量导入学生：请求体按行流式读取（CSV 或 NDJSON），每 BULK_IMPORT_BATCH_SIZE 行为一批：
+1. compiled_loader.load_many 逐行校验
+2. 权限（管理员学校范围）与批内/跨批重复检查
+3. 一条 (school_id, student_number) IN 查询找出库中已存在的学号
+4. 密码在 bcrypt 线程池中并行哈希
+5. INSERT executemany 写入，同步更新各校人数统计，每批提交一次
+失败的行不影响其他行，最终返回逐行的错误报告。
+哈希线程池繁忙时停在当前批：之前的批次已提交，当前批待写入的行记为失败，报告标记 truncated，
+客户端从第一条失败的行开始重试即可。
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import select, insert, tuple_
+
+from app.extensions import db
+from app.models.student import Student
+from app.schemas.student import StudentCreateSchema
+from app.schemas.validators import compiled_loader
+from app.services.headcounts import HeadcountDelta, StudentState
+from app.utils.exceptions import HashBusyError
+from app.utils.responses import fold_errors
+from app.utils.security import hash_passwords
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# CSV 表头：支持英文字段名与中文列名
+_CSV_HEADERS = {
+    '姓名': 'name', '学号': 'student_number', '学校ID': 'school_id', '密码': 'password', '就餐': 'is_eating',
+}
+_BOOL_WORDS = {'是': True, '否': False}
+
+student_import_loader = compiled_loader(StudentCreateSchema)
+
+
+def iter_import_rows(stream, fmt: str):
+    """逐行解析请求体，产出 (行号, dict 或 None, 解析错误)；不会一次读入整个请求体。"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            data = {}
+            for key, value in row.items():
+                if key is None:
+                    continue
+                key = _CSV_HEADERS.get(key.strip(), key.strip())
+                value = (value or '').strip()
+                if value == '':
+                    continue
+                data[key] = _BOOL_WORDS.get(value, value) if key == 'is_eating' else value
+            yield reader.line_num, data, None
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_no, None, '不是合法的 JSON'
+            continue
+        if not isinstance(data, dict):
+            yield line_no, None, '每行必须是一个 JSON 对象'
+            continue
+        yield line_no, data, None
+
+
+def import_students(rows, scope, default_school_id: str | None = None) -> dict:
+    cfg = current_app.config
+    batch_size, max_rows = cfg['BULK_IMPORT_BATCH_SIZE'], cfg['BULK_IMPORT_MAX_ROWS']
+    report = {'total': 0, 'created': 0, 'failed': 0, 'errors': []}
+    seen: set[tuple[str, str]] = set()
+    rows = iter(rows)
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        if report['total'] + len(batch) > max_rows:
+            batch = batch[:max_rows - report['total']]
+            report['truncated'] = True
+        report['total'] += len(batch)
+        try:
+            created = _import_batch(batch, scope, default_school_id, seen, report['errors'])
+        except HashBusyError:
+            # 本批还没有写入，之前的批次保持已提交；剩余的行不再读取
+            db.session.rollback()
+            report['truncated'] = True
+            break
+        db.session.commit()
+        report['created'] += created
+        if report.get('truncated'):
+            break
+
+    report['errors'].sort(key=lambda e: e['line'])
+    report['failed'] = len(report['errors'])
+    return report
+
+
+def _import_batch(batch, scope, default_school_id, seen, errors) -> int:
+    def reject(line, message, data=None):
+        errors.append({'line': line, 'student_number': (data or {}).get('student_number'), 'msg': message})
+
+    parsed = []
+    for line, data, parse_error in batch:
+        if parse_error:
+            reject(line, parse_error)
+            continue
+        if default_school_id and not data.get('school_id'):
+            data['school_id'] = default_school_id
+        parsed.append((line, data))
+
+    valid = []
+    for (line, raw), (data, err) in zip(parsed, student_import_loader.load_many([d for _, d in parsed])):
+        if err:
+            # 与单个新增接口一致：“参数校验失败,姓名不能为空”
+            reject(line, fold_errors({'msg': '参数校验失败', 'errors': err})['msg'], raw)
+        elif not scope.can_access(data['school_id']):
+            reject(line, '无权在该学校下创建学生', data)
+        elif (data['school_id'], data['student_number']) in seen:
+            reject(line, '导入数据中学号重复', data)
+        else:
+            seen.add((data['school_id'], data['student_number']))
+            valid.append((line, data))
+    if not valid:
+        return 0
+
+    # 一条查询找出库里已存在的 (学校, 学号)
+    keys = [(d['school_id'], d['student_number']) for _, d in valid]
+    existing = set(db.session.execute(
+        select(Student.school_id, Student.student_number)
+        .where(tuple_(Student.school_id, Student.student_number).in_(keys), Student.is_deleted.is_(False))
+    ).all())
+    to_insert = []
+    for line, data in valid:
+        if (data['school_id'], data['student_number']) in existing:
+            reject(line, '该学校下学号已存在', data)
+        else:
+            to_insert.append((line, data))
+    if not to_insert:
+        return 0
+
+    with_password = [d for _, d in to_insert if d.get('password')]
+    try:
+        hashed = hash_passwords([d['password'] for d in with_password])
+    except HashBusyError as e:
+        for line, data in to_insert:
+            reject(line, e.description, data)
+        raise
+    for d, h in zip(with_password, hashed):
+        d['password_hash'] = h
+
+    values = [{
+        'name': d['name'],
+        'student_number': d['student_number'],
+        'school_id': d['school_id'],
+        'is_eating': d['is_eating'],
+        'password_hash': d.get('password_hash'),
+    } for _, d in to_insert]
+    db.session.execute(insert(Student), values)
+
+    delta = HeadcountDelta()
+    for v in values:
+        delta.add(StudentState(v['school_id'], v['is_eating'], ()), 1)
+    delta.flush()
+    return len(values)
+
@@ -0,0 +1,158 @@
+# app/services/token_blocklist.py
+from __future__ import annotations
+import hashlib
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, select, delete
+
+from app.extensions import db
+from app.models.revoked_token import RevokedToken
+from app.utils.poller import BackgroundPoller
+
+_PENDING_KEY = 'token_blocklist.pending'
+
+
+class BloomFilter:
+    """定长位数组 + k 个哈希（由一次 blake2b 摘要切分），只用于“肯定不在”的快速判断。"""
+
+    def __init__(self, size_bits: int = 1 << 20, hashes: int = 4):
+        self.size = size_bits
+        self.k = hashes
+        self.bits = bytearray(size_bits // 8 + 1)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=self.k * 4).digest()
+        for i in range(self.k):
+            yield int.from_bytes(digest[i * 4:(i + 1) * 4], 'little') % self.size
+
+    def add(self, item: str):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class TokenBlocklist:
+    """
+    各 worker 的内存撤销表：
+    - 单令牌撤销：Bloom 过滤器 + 精确字典（jti -> 过期时间），绝大多数未撤销令牌在 Bloom 处就返回
+    - 用户级撤销：subject -> not_before，签发时间早于它的令牌全部失效
+    后台线程按 TOKEN_BLOCKLIST_POLL_SECONDS 拉取 id 大于已知版本的新记录，请求路径上不查库。
+    本进程的撤销在事务提交后才写入内存：回滚的撤销不会只在本进程生效。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter()
+        self._jtis: dict[str, int] = {}
+        self._subjects: dict[str, int] = {}
+        self._version = 0
+        self._loaded = False
+        self._poller = BackgroundPoller('token-blocklist', self.sync, 'TOKEN_BLOCKLIST_POLL_SECONDS')
+        self._installed = False
+
+    def init_app(self, app):
+        if self._installed:
+            return
+        self._installed = True
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_rollback', self._after_rollback)
+
+    @staticmethod
+    def subject_key(user_type: str | None, uid) -> str:
+        return f'{user_type or "student"}:{uid}'
+
+    def is_revoked(self, payload: dict) -> bool:
+        if not self._loaded:
+            self.sync()
+            self._poller.ensure_started(current_app._get_current_object())
+        # refresh token 的用户类型在 user_type（type 为 refresh）
+        user_type = payload.get('user_type', payload.get('type'))
+        not_before = self._subjects.get(self.subject_key(user_type, payload.get('sub')))
+        if not_before is not None and payload.get('iat', 0) <= not_before:
+            return True
+        jti = payload.get('jti')
+        return jti is not None and jti in self._bloom and jti in self._jtis
+
+    def _apply(self, kind: str, value: str, not_before: int | None, expires_at: int):
+        if kind == 'subject':
+            self._subjects[value] = max(self._subjects.get(value, 0), not_before or 0)
+        else:
+            self._jtis[value] = expires_at
+            self._bloom.add(value)
+
+    def sync(self):
+        """增量拉取新的撤销记录，并顺带清理已过期的 jti。"""
+        rows = db.session.execute(
+            select(RevokedToken.id, RevokedToken.kind, RevokedToken.value,
+                   RevokedToken.not_before, RevokedToken.expires_at)
+            .where(RevokedToken.id > self._version)
+            .order_by(RevokedToken.id)
+        ).all()
+        now = int(time.time())
+        with self._lock:
+            for row_id, kind, value, not_before, expires_at in rows:
+                if expires_at > now:
+                    self._apply(kind, value, not_before, expires_at)
+                self._version = max(self._version, row_id)
+            self._prune(now)
+            self._loaded = True
+
+    def _prune(self, now: int):
+        expired = [j for j, exp in self._jtis.items() if exp <= now]
+        if not expired:
+            return
+        for j in expired:
+            del self._jtis[j]
+        # Bloom 不支持删除，按剩余 jti 重建
+        bloom = BloomFilter(self._bloom.size, self._bloom.k)
+        for j in self._jtis:
+            bloom.add(j)
+        self._bloom = bloom
+
+    def revoke_jti(self, jti: str, expires_at: int):
+        """撤销单个令牌（写入会话，由调用方 commit），提交后本进程立即生效。"""
+        db.session.add(RevokedToken(kind='jti', value=jti, expires_at=int(expires_at)))
+        self._pending(db.session).append(('jti', jti, None, int(expires_at)))
+
+    def revoke_subject(self, user_type: str, uid):
+        """撤销某用户此刻之前签发的全部令牌（含 refresh token），由调用方 commit，提交后本进程立即生效。"""
+        now = int(time.time())
+        key = self.subject_key(user_type, uid)
+        keep = int(current_app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds())
+        db.session.add(RevokedToken(kind='subject', value=key, not_before=now, expires_at=now + keep))
+        self._pending(db.session).append(('subject', key, now, now + keep))
+
+    # ---------------- 会话事件 ----------------
+    @staticmethod
+    def _pending(session) -> list:
+        return session.info.setdefault(_PENDING_KEY, [])
+
+    def _after_commit(self, session):
+        # 保存点的提交同样会触发，只在最外层事务提交时写入内存
+        if session.in_nested_transaction():
+            return
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        with self._lock:
+            for item in pending:
+                self._apply(*item)
+
+    def _after_rollback(self, session):
+        if session.in_nested_transaction():
+            return
+        session.info.pop(_PENDING_KEY, None)
+
+    @staticmethod
+    def prune_expired() -> int:
+        """删除已过期的撤销记录，返回删除条数（不影响各 worker 的版本号）。"""
+        result = db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= int(time.time())))
+        db.session.commit()
+        return result.rowcount
+
+
+token_blocklist = TokenBlocklist()
@@ -0,0 +1,32 @@
+# app/services/token_refresh.py
+from __future__ import annotations
+import threading
+import time
+from typing import Callable
+
+
+class RefreshedTokenCache:
+    """
+    按旧令牌 jti 缓存续签出的新 access token：
+    同一令牌在刷新窗口内并发发出的多个请求共享同一个新令牌，只签名一次。
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[str, float]] = {}
+        self._max_entries = max_entries
+
+    def get_or_mint(self, jti: str, ttl: float, mint: Callable[[], str]) -> str:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(jti)
+            if hit and hit[1] > now:
+                return hit[0]
+            if len(self._entries) >= self._max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+            token = mint()
+            self._entries[jti] = (token, now + ttl)
+            return token
+
+
+refreshed_tokens = RefreshedTokenCache()
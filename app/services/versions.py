@@ -0,0 +1,161 @@
+# app/services/versions.py
+from __future__ import annotations
+import threading
+
+from flask import current_app
+from sqlalchemy import event, select, update, insert, inspect
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.table_version import TableVersion
+from app.utils.poller import BackgroundPoller
+
+# 按范围细分版本的表：表名 -> 范围字段
+SCOPED_TABLES = {
+    'students': 'school_id',
+    'student_leaves': 'school_id',
+    'evaluations': 'school_id',
+    'admin_school_map': 'admin_id',
+}
+
+_PENDING_KEY = 'table_versions.pending'
+
+
+class TableVersions:
+    """
+    各 worker 的版本计数器内存副本：
+    - ORM flush 时收集新增/修改/删除的行所属的表（及范围），记在会话上
+    - 批量 UPDATE/DELETE/INSERT 语句只能确定到表，记 '<表名>' 与 '<表名>:*'（声明了 version_scopes 的只记对应范围）
+    - 业务事务提交后，用一个单独的短事务把本次收集到的名字一次性自增（按名字排序加锁）；
+      业务事务内不写 table_versions，热点计数行不会在长事务里持锁，也不会与业务行交叉加锁造成死锁
+    - 本进程提交后立即标记过期，下次读取时重新加载；其他 worker 由后台线程按 TABLE_VERSION_POLL_SECONDS 拉取
+    读取路径只查内存，ETag 命中时整个请求不访问数据库。
+    先提交数据、后自增版本：期间按旧版本缓存的结果会在自增后失效，不会出现新版本对应旧数据的缓存。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        self._stale = True
+        self._installed = False
+        self._poller = BackgroundPoller('table-versions', self.sync, 'TABLE_VERSION_POLL_SECONDS')
+
+    def init_app(self, app):
+        if self._installed:
+            return
+        self._installed = True
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'do_orm_execute', self._on_orm_execute)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_rollback', self._after_rollback)
+
+    # ---------------- 读取 ----------------
+    def get(self, name: str) -> int:
+        if self._stale:
+            self.sync()
+            self._poller.ensure_started(current_app._get_current_object())
+        return self._versions.get(name, 0)
+
+    def scoped(self, table: str, scope) -> tuple[int, int]:
+        """某个范围的版本：(批量写入版本, 该范围版本)，任一变化都说明范围内数据可能变了。"""
+        return self.get(f'{table}:*'), self.get(f'{table}:{scope}')
+
+    def sync(self):
+        rows = db.session.execute(select(TableVersion.name, TableVersion.version)).all()
+        with self._lock:
+            self._versions = dict(rows)
+            self._stale = False
+
+    # ---------------- 写入 ----------------
+    def touch(self, table: str, *scopes):
+        """
+        手动标记变化（bulk_save_objects、原生 SQL 等不触发 ORM 事件的写入）：
+        给出范围时只自增这些范围，否则视为整表变化。随当前事务 commit 后自增，回滚则丢弃。
+        """
+        names = {table}
+        if scopes:
+            names.update(f'{table}:{s}' for s in scopes)
+        elif table in SCOPED_TABLES:
+            names.add(f'{table}:*')
+        self._pending(db.session()).update(names)
+
+    @staticmethod
+    def _pending(session) -> set:
+        return session.info.setdefault(_PENDING_KEY, set())
+
+    def _after_flush(self, session, flush_context):
+        names = set()
+        for obj in session.new | session.dirty | session.deleted:
+            if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            table = getattr(obj, '__tablename__', None)
+            if not table or table == TableVersion.__tablename__:
+                continue
+            names.add(table)
+            scope_attr = SCOPED_TABLES.get(table)
+            if scope_attr:
+                # 范围字段被修改时，新旧两个范围都要自增
+                hist = inspect(obj).attrs[scope_attr].history
+                for value in (*hist.added, *hist.unchanged, *hist.deleted):
+                    if value is not None:
+                        names.add(f'{table}:{value}')
+        if names:
+            self._pending(session).update(names)
+
+    def _on_orm_execute(self, state):
+        if not (state.is_update or state.is_delete or state.is_insert) or state.bind_mapper is None:
+            return
+        table = state.bind_mapper.local_table.name
+        if table == TableVersion.__tablename__:
+            return
+        # 语句可通过 execution_options(version_scopes=(...)) 声明影响的范围，避免整表范围失效
+        scopes = state.execution_options.get('version_scopes')
+        if scopes:
+            names = {table, *(f'{table}:{s}' for s in scopes)}
+        else:
+            names = {table, f'{table}:*'} if table in SCOPED_TABLES else {table}
+        self._pending(state.session).update(names)
+
+    def _after_commit(self, session):
+        # 保存点的提交同样会触发，只在最外层事务提交时处理
+        if session.in_nested_transaction():
+            return
+        names = session.info.pop(_PENDING_KEY, None)
+        if not names:
+            return
+        try:
+            # 业务事务已结束，另取连接做一个只含这条自增的短事务
+            with session.get_bind().begin() as conn:
+                _bump(conn, names)
+        except Exception:
+            # 数据已经提交，这里失败只会让缓存晚一些失效（下次同表写入时一并自增），不影响本次请求
+            current_app.logger.exception('版本计数自增失败: %s', sorted(names))
+        self._stale = True
+
+    def _after_rollback(self, session):
+        # 回滚到保存点时外层事务的写入还在，已收集的名字保留（多自增一次只是多失效一次缓存）
+        if session.in_nested_transaction():
+            return
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _bump(conn, names: set[str]):
+    """一条 UPDATE 给一次提交涉及的版本自增；首次出现的名字插入新行（并发插入冲突时改为自增）。"""
+    names = sorted(names)  # 固定加锁顺序，避免并发事务互相等待
+    res = conn.execute(update(TableVersion).where(TableVersion.name.in_(names))
+                       .values(version=TableVersion.version + 1))
+    if res.rowcount == len(names):
+        return
+    existing = set(conn.execute(select(TableVersion.name).where(TableVersion.name.in_(names))).scalars())
+    for name in names:
+        if name in existing:
+            continue
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(TableVersion).values(name=name, version=1))
+        except IntegrityError:
+            conn.execute(update(TableVersion).where(TableVersion.name == name)
+                         .values(version=TableVersion.version + 1))
+
+
+table_versions = TableVersions()
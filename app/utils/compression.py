@@ -0,0 +1,68 @@
+# app/utils/compression.py
+import gzip
+import zlib
+
+from flask import request, current_app, Response
+
+# 按优先级排列：客户端都接受时优先 gzip
+ENCODINGS = ('gzip', 'deflate')
+# 压缩后的表示使用不同的强 ETag（同一资源的不同字节表示）
+ETAG_SUFFIXES = {enc: f'-{enc}' for enc in ENCODINGS}
+
+_COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'application/javascript', 'application/xml')
+
+
+def negotiate_encoding():
+    """按 Accept-Encoding（含 q 值）选出压缩方式，不接受压缩时返回 None。"""
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def is_compressible(mimetype: str) -> bool:
+    mimetype = (mimetype or '').lower()
+    return mimetype.startswith('text/') or mimetype in _COMPRESSIBLE
+
+
+def compress_response(resp: Response):
+    """
+    响应压缩阶段，必须在 _unify_response 之后执行（after_request 按注册的逆序执行，需先注册）。
+    - 小于 COMPRESS_MIN_SIZE 的响应、非文本类响应、已有 Content-Encoding 的响应不压缩
+    - 流式响应（导出）在 stream_export 中自行分块压缩，这里跳过
+    """
+    if resp.status_code < 200 or resp.status_code in (204, 206, 304):
+        return resp
+    if resp.direct_passthrough or resp.is_streamed or 'Content-Encoding' in resp.headers:
+        return resp
+    if not is_compressible(resp.mimetype):
+        return resp
+
+    resp.vary.add('Accept-Encoding')
+    data = resp.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return resp
+    encoding = negotiate_encoding()
+    if not encoding:
+        return resp
+
+    level = current_app.config['COMPRESS_LEVEL']
+    if encoding == 'gzip':
+        body = gzip.compress(data, compresslevel=level, mtime=0)
+    else:
+        body = zlib.compress(data, level)
+    resp.set_data(body)
+    resp.headers['Content-Encoding'] = encoding
+    tag, weak = resp.get_etag()
+    if tag:
+        resp.set_etag(tag + ETAG_SUFFIXES[encoding], weak=weak)
+    return resp
+
+
+def compress_stream(chunks, encoding: str, level: int):
+    """把文本块生成器压缩成 gzip/deflate 字节流；每块同步刷新，客户端可以边收边解压。"""
+    # wbits=31 → gzip 封装，15 → zlib 封装（HTTP 的 deflate）
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == 'gzip' else 15)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,51 @@
+# app/utils/etag.py
+import hashlib
+from functools import wraps
+
+from flask import request, make_response, Response
+from flask_jwt_extended import get_jwt, get_jwt_request_location, verify_jwt_in_request
+
+from app.services.versions import table_versions
+from app.utils.compression import ETAG_SUFFIXES
+
+
+def etag(*tables: str, scoped=None, vary=None):
+    """
+    基于版本计数器的强 ETag（放在 jwt_required 之后）：
+    - tables: 结果依赖的表，取整表版本
+    - scoped: 可选，() -> [(表名, 范围值), ...]，只取对应范围的版本；返回 None 表示本次不启用 ETag
+    - vary: 可选，() -> 额外参与计算的值（如当天日期）
+    另外自动带上请求路径、查询参数和当前登录身份。
+    If-None-Match 命中时直接返回 304，不执行视图、不访问数据库。
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            pairs = scoped() if scoped else []
+            if pairs is None:
+                return fn(*args, **kwargs)
+
+            # 通过公开接口取身份；已由 jwt_required 校验过的请求不再重复解码
+            if get_jwt_request_location() is None:
+                verify_jwt_in_request(optional=True)
+            claims = get_jwt()
+            parts = [request.path, sorted(request.args.items(multi=True)),
+                     claims.get('type'), claims.get('sub'), vary() if vary else None]
+            parts.extend((t, table_versions.get(t)) for t in tables)
+            parts.extend((t, s, table_versions.scoped(t, s)) for t, s in pairs)
+            tag = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+            # 压缩后的表示带有编码后缀，同样视为命中
+            for candidate in (tag, *(tag + sfx for sfx in ETAG_SUFFIXES.values())):
+                if request.if_none_match.contains(candidate):
+                    resp = Response(status=304)
+                    resp.set_etag(candidate)
+                    return resp
+
+            resp = make_response(fn(*args, **kwargs))
+            if resp.status_code == 200:
+                # 导出等自行压缩的流式响应，同样按编码区分 ETag
+                resp.set_etag(tag + ETAG_SUFFIXES.get(resp.headers.get('Content-Encoding'), ''))
+            return resp
+        return wrapper
+    return decorator
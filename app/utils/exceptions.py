@@ -8,3 +8,9 @@ class BizError(HTTPException):
         super().__init__(description or self.description)
         if code is not None:
             self.code = code
+
+
+class HashBusyError(BizError):
+    """密码哈希线程池已满，提示客户端稍后重试。"""
+    code = 503
+    description = '系统繁忙，请稍后重试'
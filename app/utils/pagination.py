@@ -1,4 +1,12 @@
+import base64
+import json
+from datetime import datetime
+
 from flask import request
+from sqlalchemy import and_, or_
+
+from app.services.counts import count_cache
+from app.utils.exceptions import BizError
 
 def get_pagination(default_page=1, default_size=10, max_size=100):
     """
@@ -23,14 +31,115 @@ def get_pagination(default_page=1, default_size=10, max_size=100):
 
 def page_result(pagination, records):
     """
-    根据 Flask-SQLAlchemy 的 Pagination 对象，组装你要的返回结构。
-    pagination: q.paginate(...) 返回的对象
+    根据 Pagination 对象，组装你要的返回结构。
+    pagination: paginate(...) 或 q.paginate(...) 返回的对象
     records: 已序列化后的列表（比如 schema.dump(pagination.items)）
+    ?count=false 时 total/pages 为 None，用 has_more 判断是否还有下一页。
     """
-    return {
+    result = {
         "records": records,
         "total": pagination.total,
         "size": pagination.per_page,
         "current": pagination.page,
         "pages": pagination.pages,
+        "has_more": pagination.has_next,
+    }
+    if getattr(pagination, 'total_estimated', False):
+        result["total_estimated"] = True
+    return result
+
+
+class Page:
+    """paginate() 的结果，属性与 Flask-SQLAlchemy 的 Pagination 一致（total 可能为 None）。"""
+
+    def __init__(self, items, page, per_page, total, has_next, total_estimated=False):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+        self.total_estimated = total_estimated
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return max((self.total + self.per_page - 1) // self.per_page, 1) if self.total else 0
+
+
+def want_count() -> bool:
+    return (request.args.get('count') or 'true').strip().lower() not in ('false', '0', 'no')
+
+
+def paginate(q, page, size, tables: tuple[str, ...] = ()):
+    """
+    替代 q.paginate()：
+    - 多取一条判断 has_next，不依赖 total
+    - ?count=false 时不查总数；否则总数走 count_cache（按筛选条件缓存，tables 中任一表有写入即失效）
+    - 第一页就已取完时直接用本页条数作为总数
+    """
+    rows = q.limit(size + 1).offset((page - 1) * size).all()
+    items, has_next = rows[:size], len(rows) > size
+    total, estimated = None, False
+    if want_count():
+        if page == 1 and not has_next:
+            total = len(items)
+        else:
+            total, estimated = count_cache.count(q, tables)
+    return Page(items, page, size, total, has_next, estimated)
+
+
+# ---------------- 游标（keyset）分页 ----------------
+# 按 (created_at desc, id desc) 翻页：下一页条件为 (created_at, id) < 上一页最后一条，
+# 与页码无关，深翻页不做 OFFSET 扫描，也不需要 COUNT。
+
+def get_cursor():
+    """
+    ?cursor= 出现即进入游标模式：
+    - 不带 cursor 参数：返回 None（沿用 current/size 分页）
+    - cursor 为空：返回 ()，即第一页
+    - 否则返回解码后的 (created_at, id)
+    """
+    if 'cursor' not in request.args:
+        return None
+    raw = request.args.get('cursor', '').strip()
+    return decode_cursor(raw) if raw else ()
+
+
+def encode_cursor(created_at, id_) -> str:
+    raw = json.dumps([created_at.isoformat(), id_], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str):
+    try:
+        created_at, id_ = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return datetime.fromisoformat(created_at), id_
+    except (ValueError, TypeError):
+        raise BizError('无效的分页游标')
+
+
+def keyset_paginate(q, created_col, id_col, size, cursor):
+    """
+    q: 已加好筛选条件的查询（原有排序会被替换）
+    返回 (本页行, 是否还有下一页)；多取一条用于判断 has_more。
+    """
+    if cursor:
+        created_at, id_ = cursor
+        q = q.filter(or_(created_col < created_at, and_(created_col == created_at, id_col < id_)))
+    rows = q.order_by(None).order_by(created_col.desc(), id_col.desc()).limit(size + 1).all()
+    return rows[:size], len(rows) > size
+
+
+def cursor_result(items, records, size, has_more):
+    """
+    游标模式的返回结构：{records, size, next_cursor, has_more}
+    items: 本页行对象（需有 created_at / id 属性，用于生成下一页游标）
+    """
+    last = items[-1] if has_more and items else None
+    return {
+        "records": records,
+        "size": size,
+        "next_cursor": encode_cursor(last.created_at, last.id) if last else None,
+        "has_more": has_more,
     }
@@ -0,0 +1,39 @@
+# app/utils/poller.py
+import os
+import threading
+import time
+
+
+class BackgroundPoller:
+    """
+    每个进程一个的后台轮询线程：按固定间隔在应用上下文中执行 fn。
+    gunicorn fork 之后线程不会被继承，所以按 pid 判断是否需要重新启动。
+    """
+
+    def __init__(self, name: str, fn, interval_key: str, default_interval: float = 2.0):
+        self.name = name
+        self._fn = fn
+        self._interval_key = interval_key
+        self._default_interval = default_interval
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+    def ensure_started(self, app):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            interval = float(app.config.get(self._interval_key, self._default_interval))
+            t = threading.Thread(target=self._loop, args=(app, interval), name=self.name, daemon=True)
+            t.start()
+
+    def _loop(self, app, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    self._fn()
+            except Exception:  # 轮询失败不影响请求，下个周期重试
+                app.logger.exception('%s 轮询失败', self.name)
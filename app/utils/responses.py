@@ -1,6 +1,6 @@
 from functools import wraps
 
-from flask import jsonify
+from flask import current_app, Response
 
 class ApiCodes:
     OK = 0
@@ -9,17 +9,50 @@ class ApiCodes:
     FORBIDDEN = 403
     NOT_FOUND = 404
     CONFLICT = 409
+    TOO_MANY_REQUESTS = 429
     SERVER_ERROR = 500
+    SERVICE_UNAVAILABLE = 503
+
+class ApiResponse(Response):
+    """
+    已是统一结构的 JSON 响应：保留原始 payload，构造时只编码一次。
+    _unify_response 看到这个类型直接放行，不再 get_data → json.loads → json.dumps。
+    """
+    default_mimetype = 'application/json'
+
+    def __init__(self, payload: dict, status: int = 200):
+        self.payload = payload
+        super().__init__(current_app.json.dumps(payload, ensure_ascii=False) + '\n', status=status)
+
+
+def fold_errors(payload: dict) -> dict:
+    """把 marshmallow 的 errors 拼进 msg（如 “参数校验失败,姓名不能为空”）并移除 errors 键。"""
+    errors = payload.pop('errors', None)
+    if errors:
+        payload['msg'] = ','.join([payload['msg'], *_flatten_messages(errors)])
+    return payload
+
+
+def _flatten_messages(errors):
+    if isinstance(errors, dict):
+        for value in errors.values():
+            yield from _flatten_messages(value)
+    elif isinstance(errors, (list, tuple)):
+        for value in errors:
+            yield from _flatten_messages(value)
+    else:
+        yield str(errors)
+
 
 def success(data=None, msg='成功', code=ApiCodes.OK, **extra):
     payload = {'success': True, 'code': code, 'msg': msg, 'data': data}
     if extra: payload.update(extra)
-    return jsonify(payload), 200
+    return ApiResponse(fold_errors(payload)), 200
 
 def fail(code=ApiCodes.BAD_REQUEST, msg='失败', http_status: int | None = None, **extra):
     payload = {'success': False, 'code': code, 'msg': msg, 'data': None}
     if extra: payload.update(extra)
-    return jsonify(payload), http_status or 200
+    return ApiResponse(fold_errors(payload)), http_status or 200
 
 
 def no_wrapper(fn):
@@ -1,14 +1,238 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+
+from flask import current_app, g, has_app_context
 from passlib.hash import bcrypt
 
+from app.utils.exceptions import HashBusyError
+
 ROLE_STUDENT = 'student'
 ROLE_ADMIN = 'admin'
 ROLE_SUPERADMIN = 'superadmin'
 
+
+class HashExecutor:
+    """
+    bcrypt 专用的有界线程池：
+    - PASSWORD_HASH_WORKERS: 并发上限（bcrypt 计算期间会释放 GIL）
+    - PASSWORD_HASH_MAX_QUEUE: 排队上限，超出直接抛 HashBusyError，不占住请求线程
+    - PASSWORD_HASH_TIMEOUT: 单次等待（排队+计算）的最长秒数
+    排队等待时间记录在 g.hash_queue_wait_ms，并累计到 stats() 中。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._pid: int | None = None
+        self._workers = 0
+        self._max_queue = 0
+        self._pending = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_executor(self):
+        # gunicorn fork 之后线程池不可复用，按 pid 重建
+        if self._executor is not None and self._pid == os.getpid():
+            return
+        cfg = current_app.config
+        self._workers = max(int(cfg.get('PASSWORD_HASH_WORKERS', 2)), 1)
+        self._max_queue = max(int(cfg.get('PASSWORD_HASH_MAX_QUEUE', 16)), 0)
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='bcrypt')
+        self._pid = os.getpid()
+        self._pending = 0
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def run(self, fn, *args):
+        # 没有应用上下文（如脚本直接调用）时同步执行
+        if not has_app_context():
+            return fn(*args)
+
+        with self._lock:
+            self._ensure_executor()
+            if self._pending >= self._workers + self._max_queue:
+                self._rejected += 1
+                raise HashBusyError()
+            self._pending += 1
+            self._submitted += 1
+            executor = self._executor
+
+        enqueued_at = time.perf_counter()
+
+        def task():
+            return time.perf_counter() - enqueued_at, fn(*args)
+
+        future = executor.submit(task)
+        future.add_done_callback(self._release)
+        try:
+            waited, result = future.result(timeout=current_app.config.get('PASSWORD_HASH_TIMEOUT', 5))
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._rejected += 1
+            raise HashBusyError()
+
+        with self._lock:
+            self._completed += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        g.hash_queue_wait_ms = g.get('hash_queue_wait_ms', 0.0) + waited * 1000
+        return result
+
+    def map(self, fn, items) -> list:
+        """
+        批量执行（如导入学生时哈希多个密码），结果与输入顺序一致。
+        同一批最多同时占用 workers 个槽位，完成一个再补一个，不会把排队名额一次占满；
+        每次提交与 run() 一样受 workers + PASSWORD_HASH_MAX_QUEUE 的上限约束，排队等待时间同样计入统计。
+        池已满或任意一个等待超过 PASSWORD_HASH_TIMEOUT 即放弃剩余任务并抛出 HashBusyError。
+        """
+        items = list(items)
+        if not has_app_context():
+            return [fn(x) for x in items]
+
+        with self._lock:
+            self._ensure_executor()
+            executor = self._executor
+            window = self._workers
+        timeout = current_app.config.get('PASSWORD_HASH_TIMEOUT', 5)
+        results = [None] * len(items)
+        pending = iter(enumerate(items))
+        in_flight = {}
+        waits = []
+
+        def task(enqueued_at, item):
+            return time.perf_counter() - enqueued_at, fn(item)
+
+        def submit_next():
+            nxt = next(pending, None)
+            if nxt is None:
+                return
+            with self._lock:
+                if self._pending >= self._workers + self._max_queue:
+                    self._rejected += 1
+                    raise HashBusyError()
+                self._pending += 1
+                self._submitted += 1
+            future = executor.submit(task, time.perf_counter(), nxt[1])
+            future.add_done_callback(self._release)
+            in_flight[future] = nxt[0]
+
+        try:
+            for _ in range(window):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    with self._lock:
+                        self._rejected += 1
+                    raise HashBusyError()
+                for future in done:
+                    waited, results[in_flight.pop(future)] = future.result()
+                    waits.append(waited)
+                    submit_next()
+        except HashBusyError:
+            for future in in_flight:
+                future.cancel()
+            raise
+        finally:
+            with self._lock:
+                self._completed += len(waits)
+                self._wait_total += sum(waits)
+                self._wait_max = max(self._wait_max, *waits, 0.0)
+            g.hash_queue_wait_ms = g.get('hash_queue_wait_ms', 0.0) + sum(waits) * 1000
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._completed
+            return {
+                'workers': self._workers,
+                'max_queue': self._max_queue,
+                'pending': self._pending,
+                'submitted': self._submitted,
+                'rejected': self._rejected,
+                'avg_wait_ms': round(self._wait_total / done * 1000, 3) if done > 0 else 0.0,
+                'max_wait_ms': round(self._wait_max * 1000, 3),
+            }
+
+
+hash_executor = HashExecutor()
+
+# 当前生效的 bcrypt 处理器；configure_password_hashing() 会按配置/校准结果替换
+_hasher = bcrypt
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 15) -> int:
+    """
+    按本机实测耗时选择 rounds：每 +1 轮耗时翻倍，
+    以 min_rounds 的实测耗时外推，取最接近 target_ms 的轮数。
+    """
+    probe = bcrypt.using(rounds=min_rounds)
+    cost = min(_time_hash(probe) for _ in range(3))
+    rounds = min_rounds + round(math.log2(max(target_ms / 1000, 1e-6) / cost))
+    return min(max(rounds, min_rounds), max_rounds)
+
+
+def _time_hash(handler) -> float:
+    started = time.perf_counter()
+    handler.hash('calibration')
+    return time.perf_counter() - started
+
+
+def configure_password_hashing(app):
+    """
+    启动时确定 bcrypt 轮数：
+    - 配置了 BCRYPT_TARGET_MS：实测校准，使单次哈希接近该耗时
+    - 否则使用 BCRYPT_ROUNDS
+    已存储哈希的轮数与当前值不同（偏高或偏低）时，在下次登录校验成功后透明重算。
+    """
+    global _hasher
+    cfg = app.config
+    rounds = int(cfg['BCRYPT_ROUNDS'])
+    if cfg.get('BCRYPT_TARGET_MS'):
+        rounds = calibrate_bcrypt_rounds(float(cfg['BCRYPT_TARGET_MS']),
+                                         int(cfg['BCRYPT_MIN_ROUNDS']), int(cfg['BCRYPT_MAX_ROUNDS']))
+        app.logger.info('bcrypt 轮数校准为 %s（目标 %sms）', rounds, cfg['BCRYPT_TARGET_MS'])
+    cfg['BCRYPT_ROUNDS'] = rounds
+    _hasher = bcrypt.using(rounds=rounds, min_desired_rounds=rounds, max_desired_rounds=rounds)
+
+
+def hash_rounds(hashed: str | None) -> int | None:
+    """从 $2b$12$... 形式的哈希中取出轮数，无法识别返回 None。"""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
 def hash_password(raw: str) -> str:
-    return bcrypt.hash(raw)
+    return hash_executor.run(_hasher.hash, raw)
+
+def hash_passwords(raws) -> list[str]:
+    """批量哈希，在线程池中并行计算。"""
+    return hash_executor.map(_hasher.hash, raws)
 
 def verify_password(raw: str, hashed: str) -> bool:
-    return bcrypt.verify(raw, hashed)
+    return hash_executor.run(_hasher.verify, raw, hashed)
+
+def verify_and_update(raw: str, hashed: str) -> tuple[bool, str | None]:
+    """
+    校验密码；成功且存储哈希的轮数与当前配置不一致时，返回按当前轮数重算的新哈希。
+    返回 (是否通过, 新哈希或 None)，调用方负责写回并提交。
+    """
+    if not verify_password(raw, hashed):
+        return False, None
+    if _hasher.needs_update(hashed):
+        return True, hash_password(raw)
+    return True, None
 
 def is_super_id(uid: str | int) -> bool:
     """ID 包含 SUPER 即视为超管（大）。"""
@@ -0,0 +1,90 @@
+# app/utils/streaming.py
+import csv
+import io
+import json
+from urllib.parse import quote
+
+from flask import request, Response, current_app, stream_with_context
+
+from app.extensions import db
+from app.utils.compression import negotiate_encoding, compress_stream
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def get_export_format():
+    """读取 ?format=ndjson|csv；未指定或不支持时返回 None（走普通分页）。"""
+    fmt = (request.args.get('format') or '').strip().lower()
+    return fmt if fmt in EXPORT_FORMATS else None
+
+
+def stream_export(q, fmt: str, filename: str, dump, csv_columns, transform=None, batch_size: int = 500):
+    """
+    以流式响应导出整个查询结果，内存占用与结果总量无关：
+    - q: 已排好序的列投影查询（with_entities），不做 COUNT/OFFSET
+    - dump: 单行对象 → dict（一般是编译好的序列化器）
+    - csv_columns: [(表头, 'school.name' 形式的取值路径), ...]
+    - transform: 对每批原始行做加工（构造投影行对象等），返回对象列表
+    响应为 is_streamed，_unify_response 与压缩阶段会原样放行。
+    """
+    def batches():
+        for rows in iter_batches(q, batch_size):
+            yield transform(rows) if transform else rows
+
+    def ndjson():
+        for chunk in batches():
+            yield ''.join(json.dumps(dump(obj), ensure_ascii=False, default=str) + '\n' for obj in chunk)
+
+    def csv_rows():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        # 带 BOM，Excel 直接打开不乱码
+        buf.write('\ufeff')
+        writer.writerow([header for header, _ in csv_columns])
+        for chunk in batches():
+            for obj in chunk:
+                record = dump(obj)
+                writer.writerow([_pluck(record, path) for _, path in csv_columns])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+    body = ndjson() if fmt == 'ndjson' else csv_rows()
+    # 流式响应不经过统一压缩阶段，按 Accept-Encoding 分块压缩
+    encoding = negotiate_encoding()
+    if encoding:
+        body = compress_stream(body, encoding, current_app.config['COMPRESS_LEVEL'])
+    resp = Response(stream_with_context(body), mimetype=_MIMETYPES[fmt])
+    resp.vary.add('Accept-Encoding')
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(f'{filename}.{fmt}')}"
+    return resp
+
+
+def iter_batches(q, batch_size: int = 500):
+    """
+    用服务端游标（yield_per）分批读取查询结果。
+    游标单独占用一个连接，期间 db.session 仍可执行其他查询（如补齐回复），
+    MySQL 等非缓冲游标不允许同一连接上交叉查询。
+    """
+    with db.engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(q.statement)
+        for rows in result.partitions():
+            yield rows
+
+
+def _pluck(record, path: str):
+    value = record
+    for key in path.split('.'):
+        if value is None:
+            return ''
+        value = value.get(key)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return '是' if value else '否'
+    return value
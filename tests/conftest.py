@@ -0,0 +1,134 @@
+# tests/conftest.py
+"""
+测试环境：整个会话共用一个应用与临时 SQLite 数据库。
+进程级的缓存（别名索引、版本计数、核验名单等）不随数据库清空，
+所以每个用例通过 make_school / make_admin 等夹具创建自己的数据，互不干扰。
+"""
+import itertools
+import os
+import shutil
+import string
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+_DB_DIR = tempfile.mkdtemp(prefix='meal-tests-')
+# 必须在导入 app 之前设置：配置类在导入时读取环境变量
+os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.pop('BCRYPT_TARGET_MS', None)
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import Admin  # noqa: E402
+from app.utils.security import hash_password  # noqa: E402
+
+SUPER_ACCOUNT = 'root'
+PASSWORD = '123456'
+
+_names = (''.join(p) for n in itertools.count(2) for p in itertools.product(string.ascii_uppercase, repeat=n))
+
+
+def unique_name(prefix: str = 'T') -> str:
+    """纯字母的唯一名称：用作学校别名时不会与学号拼接出歧义。"""
+    return prefix + next(_names)
+
+
+def login(client, account, password=PASSWORD, user_type='admin'):
+    r = client.post('/auth/login', json={'username': account, 'password': password, 'type': user_type})
+    body = r.get_json()
+    assert body['success'], body
+    return {'Authorization': 'Bearer ' + body['data']['access_token']}
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        db.session.add(Admin(id='SUPER-1', account=SUPER_ACCOUNT, password_hash=hash_password(PASSWORD)))
+        db.session.commit()
+    yield app
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+        db.session.remove()
+
+
+@pytest.fixture
+def su(client):
+    """超级管理员的请求头。"""
+    return login(client, SUPER_ACCOUNT)
+
+
+@pytest.fixture
+def make_school(client, su):
+    def make(name=None):
+        alias = unique_name()
+        body = client.post('/schools', json={'name': name or alias, 'alias': alias}, headers=su).get_json()
+        assert body['success'], body
+        return body['data']
+    return make
+
+
+@pytest.fixture
+def make_student(client, su):
+    def make(school_id, number, **fields):
+        body = client.post('/students', json={'name': f's{number}', 'student_number': number,
+                                              'school_id': school_id, **fields}, headers=su).get_json()
+        assert body['success'], body
+        return body['data']
+    return make
+
+
+@pytest.fixture
+def make_admin(client, su):
+    """创建绑定到给定学校的普通管理员，返回 (账号, 请求头)。"""
+    def make(school_ids, display_name='管理员'):
+        account = unique_name('adm').lower()
+        body = client.post('/admins', json={'account': account, 'password': PASSWORD,
+                                            'display_name': display_name, 'school_ids': school_ids},
+                           headers=su).get_json()
+        assert body['success'], body
+        return account, login(client, account)
+    return make
+
+
+class QueryCounter:
+    """统计上下文内执行的 SQL 条数。"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries(app):
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', counter._record)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', counter._record)
+    return counting
@@ -0,0 +1,123 @@
+# tests/test_auth.py
+from datetime import timedelta
+
+import pytest
+
+from app import create_app
+from app.config import get_config
+from tests.conftest import PASSWORD, SUPER_ACCOUNT, unique_name
+
+
+def attempt(client, account, password=PASSWORD, ip='127.0.0.1', **headers):
+    return client.post('/auth/login', json={'username': account, 'password': password, 'type': 'admin'},
+                       environ_base={'REMOTE_ADDR': ip}, headers=headers)
+
+
+@pytest.fixture
+def ip_threshold(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'LOGIN_GUARD_IP_THRESHOLD', 3)
+
+
+def test_ip_budget_counts_failures_on_real_accounts(client, make_admin, ip_threshold, count_queries):
+    accounts = [make_admin([])[0] for _ in range(3)]
+    ip = '10.1.0.1'
+    # 对不同的真实账号轮流猜密码：账号各自未达阈值，但 IP 累计达到阈值
+    for account in accounts[:2]:
+        assert attempt(client, account, password='wrong', ip=ip).get_json()['code'] == 400
+    assert attempt(client, unique_name('ghost'), password='wrong', ip=ip).status_code == 429
+
+    # 封禁期内即使凭据正确也在查库和 bcrypt 之前拒绝
+    with count_queries() as counter:
+        r = attempt(client, accounts[2], ip=ip)
+    assert r.status_code == 429 and 'Retry-After' in r.headers
+    assert len(counter) == 0
+    # 其他 IP 不受影响
+    assert attempt(client, accounts[2], ip='10.2.0.1').get_json()['success']
+
+
+def test_unknown_accounts_fill_the_same_ip_budget(client, make_admin, ip_threshold):
+    account, _ = make_admin([])
+    ip = '10.3.0.1'
+    for _ in range(2):
+        assert attempt(client, unique_name('ghost'), ip=ip).get_json()['code'] == 400
+    assert attempt(client, account, password='wrong', ip=ip).status_code == 429
+    assert attempt(client, unique_name('ghost'), ip=ip).status_code == 429
+
+
+def test_account_lockout_still_applies(client, make_admin):
+    account, _ = make_admin([])
+    for _ in range(5):
+        attempt(client, account, password='wrong', ip='10.4.0.1')
+    # 换 IP、凭据正确也不行：账号级封禁
+    r = attempt(client, account, ip='10.4.0.2')
+    assert r.status_code == 429
+
+
+def test_trusted_proxy_resolves_client_ip(app, monkeypatch):
+    monkeypatch.setattr(get_config(), 'TRUSTED_PROXY_COUNT', 1)
+    proxied = create_app()
+    proxied.config.update(TESTING=True, LOGIN_GUARD_IP_THRESHOLD=2)
+    client = proxied.test_client()
+    for _ in range(2):
+        attempt(client, unique_name('ghost'), ip='192.168.0.10', **{'X-Forwarded-For': '203.0.113.7'})
+    # 同一个代理地址后面的其他客户端不受影响
+    other = attempt(client, unique_name('ghost'), ip='192.168.0.10', **{'X-Forwarded-For': '203.0.113.8'})
+    assert other.get_json()['code'] == 400
+    blocked = attempt(client, unique_name('ghost'), ip='192.168.0.10', **{'X-Forwarded-For': '203.0.113.7'})
+    assert blocked.status_code == 429
+
+
+def test_revocation_applies_only_after_commit(client, make_school, make_admin):
+    _, headers = make_admin([make_school()['id']])
+    # refresh_token 无效时不提交，access token 的撤销也不能在本进程生效
+    body = client.post('/auth/logout', json={'refresh_token': 'bogus'}, headers=headers).get_json()
+    assert not body['success']
+    assert client.get('/auth/me', headers=headers).get_json()['success']
+
+    assert client.post('/auth/logout', headers=headers).get_json()['success']
+    assert client.get('/auth/me', headers=headers).get_json()['code'] == 401
+
+
+def _tokens(client, account, password=PASSWORD, user_type='admin'):
+    body = client.post('/auth/login', json={'username': account, 'password': password, 'type': user_type}).get_json()
+    assert body['success'], body
+    return ({'Authorization': 'Bearer ' + body['data'][key]} for key in ('access_token', 'refresh_token'))
+
+
+def test_expiring_access_token_is_refreshed_but_refresh_token_is_not(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'JWT_REFRESH_IF_EXPIRES_IN', timedelta(days=365))
+    access, refresh = _tokens(client, SUPER_ACCOUNT)
+
+    assert client.get('/auth/me', headers=access).headers.get('X-Refreshed-Token')
+    r = client.post('/auth/refresh', headers=refresh)
+    assert r.get_json()['success'] and 'X-Refreshed-Token' not in r.headers
+    assert 'X-Refreshed-Token' not in client.get('/ping').headers
+
+
+def test_anonymous_requests_skip_jwt_lookup(client, monkeypatch):
+    import app as app_module
+
+    def no_jwt():
+        raise AssertionError('匿名请求不应读取 JWT')
+
+    monkeypatch.setattr(app_module, 'get_jwt', no_jwt)
+    assert client.get('/ping').status_code == 200
+    assert client.post('/auth/login', json={'username': unique_name('nobody'), 'password': 'x', 'type': 'admin'},
+                       environ_base={'REMOTE_ADDR': '10.9.9.9'}).status_code == 200
+
+
+def test_refresh_token_is_only_accepted_by_refresh(client):
+    _, refresh = _tokens(client, SUPER_ACCOUNT)
+    assert client.get('/auth/me', headers=refresh).get_json()['code'] == 401
+    body = client.post('/auth/refresh', headers=refresh).get_json()
+    assert body['data']['role'] == 'superadmin'
+
+
+def test_removing_student_revokes_refresh_token(client, su, make_school, make_student):
+    school = make_school()
+    s = make_student(school['id'], '01')
+    _, refresh = _tokens(client, school['alias'] + '01', password='', user_type='student')
+    assert client.post('/auth/refresh', headers=refresh).get_json()['success']
+
+    assert client.delete(f"/students/{s['id']}", headers=su).get_json()['success']
+    assert client.post('/auth/refresh', headers=refresh).get_json()['code'] == 401
@@ -0,0 +1,127 @@
+# tests/test_bulk_updates.py
+from datetime import timedelta
+
+from app.utils.tz import now_local
+
+
+def _stats(client, su, school_id, day):
+    args = {'date': day.isoformat(), 'school_id': school_id}
+    return client.get('/students/stats', query_string=args, headers=su).get_json()['data']
+
+
+def _reconciled(app, client, su, school_id, days):
+    """增量维护的统计与从 students / student_leaves 全量重建的结果一致。"""
+    before = [_stats(client, su, school_id, d) for d in days]
+    result = app.test_cli_runner().invoke(args=['reconcile-headcounts'])
+    assert result.exit_code == 0, result.output
+    return before == [_stats(client, su, school_id, d) for d in days]
+
+
+def test_bulk_eating_by_keyword_updates_matching_students(app, client, su, make_school, make_student):
+    school_id = make_school()['id']
+    for n in ('101', '102', '201'):
+        make_student(school_id, n)
+    today = now_local().date()
+
+    body = client.put('/students/bulk/eating', json={'school_id': school_id, 'kw': '10', 'is_eating': False},
+                      headers=su).get_json()
+    assert body['data']['affected'] == 2
+    # 已经是目标值的学生不再计入
+    body = client.put('/students/bulk/eating', json={'school_id': school_id, 'kw': '10', 'is_eating': False},
+                      headers=su).get_json()
+    assert body['data']['affected'] == 0
+    assert _stats(client, su, school_id, today) == {'total_students': 3, 'eating_count': 1, 'not_eating_count': 2}
+    assert _reconciled(app, client, su, school_id, [today])
+
+
+def test_bulk_leave_then_eating_off_counts_each_student_once(app, client, su, make_school, make_student):
+    school_id = make_school()['id']
+    ids = [make_student(school_id, f'0{i}')['id'] for i in range(4)]
+    today = now_local().date()
+    start, end = today + timedelta(days=1), today + timedelta(days=3)
+    days = [today + timedelta(days=i) for i in range(5)]
+
+    body = client.put('/students/bulk/leave', headers=su, json={
+        'ids': ids[:3], 'leave_start_date': start.isoformat(), 'leave_end_date': end.isoformat()}).get_json()
+    assert body['data']['affected'] == 3
+    assert [_stats(client, su, school_id, d)['not_eating_count'] for d in days] == [0, 3, 3, 3, 0]
+
+    # 请假中的学生再关闭就餐，不能重复计入未就餐人数
+    client.put('/students/bulk/eating', json={'ids': ids[:2], 'is_eating': False}, headers=su)
+    assert [_stats(client, su, school_id, d)['not_eating_count'] for d in days] == [2, 3, 3, 3, 2]
+
+    rows = client.get('/students', query_string={'school_id': school_id, 'size': 10},
+                      headers=su).get_json()['data']['records']
+    mirror = {r['id']: (r['leave_start_date'], r['leave_end_date']) for r in rows}
+    assert mirror[ids[0]] == (start.isoformat(), end.isoformat()) and mirror[ids[3]] == (None, None)
+
+    client.put('/students/bulk/leave', json={'school_id': school_id, 'leave_start_date': None,
+                                             'leave_end_date': None}, headers=su)
+    assert [_stats(client, su, school_id, d)['not_eating_count'] for d in days] == [2, 2, 2, 2, 2]
+    assert _reconciled(app, client, su, school_id, days)
+
+
+def test_bulk_update_stays_inside_admin_scope(client, su, make_school, make_student, make_admin):
+    mine, other = make_school()['id'], make_school()['id']
+    ids = [make_student(mine, '01')['id'], make_student(other, '01')['id']]
+    _, headers = make_admin([mine])
+
+    body = client.put('/students/bulk/eating', json={'ids': ids, 'is_eating': False}, headers=headers).get_json()
+    assert body['data']['affected'] == 1
+    body = client.put('/students/bulk/eating', json={'school_id': other, 'is_eating': False},
+                      headers=headers).get_json()
+    assert body['code'] == 403
+    body = client.put('/students/bulk/eating', json={'is_eating': False}, headers=headers).get_json()
+    assert body['code'] == 400
+    assert _stats(client, su, other, now_local().date())['not_eating_count'] == 0
+
+
+def _racing_insert(real, school_id, number):
+    """锁住目标行之后、UPDATE 之前，同一学校又新增一名学生（模拟并发写入）。"""
+    from app.extensions import db
+    from app.models import Student
+    from app.services.headcounts import record_student_change, student_state
+
+    def lock(where, *columns):
+        rows = real(where, *columns)
+        late = Student(name='late', student_number=number, school_id=school_id, is_eating=True)
+        db.session.add(late)
+        db.session.flush()
+        record_student_change(None, student_state(late))
+        return rows
+    return lock
+
+
+def test_bulk_eating_only_touches_locked_rows(app, client, su, make_school, make_student, monkeypatch):
+    from app.services import headcounts
+
+    school_id = make_school()['id']
+    for n in ('01', '02'):
+        make_student(school_id, n)
+    today = now_local().date()
+
+    monkeypatch.setattr(headcounts, 'lock_students', _racing_insert(headcounts.lock_students, school_id, '99'))
+    body = client.put('/students/bulk/eating', json={'school_id': school_id, 'is_eating': False},
+                      headers=su).get_json()
+    assert body['data']['affected'] == 2
+    assert _stats(client, su, school_id, today) == {'total_students': 3, 'eating_count': 1, 'not_eating_count': 2}
+    assert _reconciled(app, client, su, school_id, [today])
+
+
+def test_bulk_leave_only_touches_locked_rows(app, client, su, make_school, make_student, monkeypatch):
+    from app.services import headcounts, leaves
+
+    school_id = make_school()['id']
+    for n in ('01', '02'):
+        make_student(school_id, n)
+    today = now_local().date()
+    start, end = today + timedelta(days=1), today + timedelta(days=2)
+    days = [today, start, end]
+
+    monkeypatch.setattr(leaves, 'lock_students', _racing_insert(headcounts.lock_students, school_id, '99'))
+    body = client.put('/students/bulk/leave', headers=su, json={
+        'school_id': school_id, 'leave_start_date': start.isoformat(), 'leave_end_date': end.isoformat()}).get_json()
+    assert body['data']['affected'] == 2
+    assert [_stats(client, su, school_id, d)['not_eating_count'] for d in days] == [0, 2, 2]
+    assert _stats(client, su, school_id, today)['total_students'] == 3
+    assert _reconciled(app, client, su, school_id, days)
@@ -0,0 +1,57 @@
+# tests/test_checkin.py
+from app.extensions import db
+from app.models import Student
+from app.utils.tz import now_local
+
+
+def _check(client, headers, school_id, *ids):
+    body = client.post('/students/checkin', json={'school_id': school_id, 'ids': list(ids)},
+                       headers=headers).get_json()
+    assert body['success'], body
+    return [r['status'] for r in body['data']]
+
+
+def test_checkin_statuses_follow_writes(app, client, su, make_school, make_student):
+    school_id, other = make_school()['id'], make_school()['id']
+    a, b, c = (make_student(school_id, n)['id'] for n in ('01', '02', '03'))
+    stranger = make_student(other, '01')['id']
+    today = now_local().date().isoformat()
+
+    client.put(f'/students/{b}', json={'is_eating': False}, headers=su)
+    client.put(f'/students/{c}', json={'leave_start_date': today, 'leave_end_date': today}, headers=su)
+    assert _check(client, su, school_id, a, b, c, stranger, 10 ** 9) == \
+        ['eating', 'not_eating', 'on_leave', 'unknown', 'unknown']
+
+    # 名单已加载后的修改按版本戳增量修补
+    client.put(f'/students/{a}', json={'is_eating': False}, headers=su)
+    client.put(f'/students/{c}', json={'leave_start_date': None, 'leave_end_date': None}, headers=su)
+    # 接口不能改学校，直接写库模拟转学
+    with app.app_context():
+        db.session.get(Student, b).school_id = other
+        db.session.commit()
+    assert _check(client, su, school_id, a, b, c) == ['not_eating', 'unknown', 'eating']
+    assert _check(client, su, other, b, stranger) == ['not_eating', 'eating']
+
+    client.delete(f'/students/{c}', headers=su)
+    body = client.get('/students/checkin', query_string={'school_id': school_id, 'id': c}, headers=su).get_json()
+    assert body['data'] == {'id': c, 'is_eating': False, 'status': 'unknown'}
+
+
+def test_unchanged_roster_is_served_from_memory(client, su, make_school, make_student, count_queries):
+    school_id = make_school()['id']
+    ids = [make_student(school_id, f'0{i}')['id'] for i in range(3)]
+    _check(client, su, school_id, *ids)
+
+    with count_queries() as counter:
+        assert _check(client, su, school_id, *ids) == ['eating'] * 3
+    assert not [sql for sql in counter.statements if 'students' in sql or 'student_leaves' in sql]
+
+
+def test_checkin_requires_school_access(client, make_school, make_student, make_admin):
+    mine, other = make_school()['id'], make_school()['id']
+    sid = make_student(other, '01')['id']
+    _, headers = make_admin([mine])
+    body = client.post('/students/checkin', json={'school_id': other, 'ids': [sid]}, headers=headers).get_json()
+    assert body['code'] == 403
+    body = client.get('/students/checkin', query_string={'school_id': mine}, headers=headers).get_json()
+    assert body['code'] == 400
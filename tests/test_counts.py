@@ -0,0 +1,25 @@
+# tests/test_counts.py
+from app.services import counts
+from app.services.counts import count_cache
+
+
+def test_scoped_admin_gets_planner_estimate(client, make_school, make_student, make_admin, monkeypatch):
+    school = make_school()
+    for n in ('01', '02', '03'):
+        make_student(school['id'], n)
+    _, ha = make_admin([school['id']])
+
+    explained = []
+
+    def explain(conn, sql, params):
+        # SQLite 没有行数估算：能执行 EXPLAIN 就说明 SQL 与参数都已展开，返回一个固定值
+        conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).all()
+        explained.append(sql)
+        return 42
+
+    monkeypatch.setattr(count_cache, 'table_rows', lambda table: 10 ** 9)
+    monkeypatch.setattr(counts, '_explain_rows', explain)
+
+    data = client.get('/students', query_string={'size': 1}, headers=ha).get_json()['data']
+    assert explained and 'POSTCOMPILE' not in explained[0]
+    assert data['total'] == 42 and data['total_estimated'] is True
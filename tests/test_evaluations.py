@@ -0,0 +1,136 @@
+# tests/test_evaluations.py
+import pytest
+from sqlalchemy import update
+
+from app.extensions import db
+from app.models import Admin
+from app.models.evaluation import Evaluation
+from tests.conftest import login, unique_name
+
+
+@pytest.fixture
+def board(client, su, make_school, make_student):
+    """一所学校、一名学生、一个评价类别；返回 (学校 ID, 学生请求头, 类别 ID)。"""
+    school = make_school()
+    make_student(school['id'], '01')
+    hs = login(client, school['alias'] + '01', password='', user_type='student')
+    cat = client.post('/evaluations/categories', json={'name': unique_name('类别')}, headers=su).get_json()
+    return school['id'], hs, cat['data']['id']
+
+
+def post(client, headers, path, content, **extra):
+    body = client.post(path, json={'content': content, **extra}, headers=headers).get_json()
+    assert body['success'], body
+    return body['data']['id']
+
+
+def test_list_queries_do_not_grow_with_page_size(app, client, su, board, count_queries, make_admin):
+    school_id, hs, cat = board
+    ids = [post(client, hs, '/evaluations', f'评价{i}', category_id=cat) for i in range(6)]
+    # 每条顶层评价挂不同的管理员，未预加载时每行都会多一次查询
+    admins = [make_admin([school_id], f'管理员{i}')[0] for i in range(len(ids))]
+    with app.app_context():
+        admin_ids = dict(db.session.execute(db.select(Admin.account, Admin.id).where(Admin.account.in_(admins))).all())
+        for eid, account in zip(ids, admins):
+            db.session.execute(update(Evaluation).where(Evaluation.id == eid).values(admin_id=admin_ids[account]))
+        db.session.commit()
+
+    def queries(path, headers, size):
+        with count_queries() as counter:
+            body = client.get(path, query_string={'size': size, 'count': 'false', 'school_id': school_id},
+                              headers=headers).get_json()
+        assert body['success'], body
+        assert len(body['data']['records']) == size
+        assert all(r['admin']['display_name'].startswith('管理员') for r in body['data']['records'])
+        return len(counter)
+
+    assert queries('/evaluations', su, 2) == queries('/evaluations', su, 6)
+    assert queries('/evaluations/my-evaluations', hs, 2) == queries('/evaluations/my-evaluations', hs, 6)
+
+
+def stats_of(client, su, school_id, eid):
+    records = client.get('/evaluations', query_string={'school_id': school_id, 'size': 100},
+                         headers=su).get_json()['data']['records']
+    row = next(r for r in records if r['id'] == eid)
+    return row['reply_count'], row['last_reply_by']
+
+
+def test_deleting_reply_drops_its_subtree_from_stats(app, client, su, board):
+    school_id, hs, cat = board
+    root = post(client, hs, '/evaluations', '评价', category_id=cat)
+    first = post(client, hs, f'/evaluations/{root}/student-reply', '回复一')
+    nested = post(client, su, f'/evaluations/{first}/reply', '回复一的下级')
+    second = post(client, su, f'/evaluations/{root}/reply', '回复二')
+    assert stats_of(client, su, school_id, root)[0] == 3
+
+    assert client.delete(f'/evaluations/{first}', headers=su).get_json()['success']
+    assert stats_of(client, su, school_id, root) == (1, 'root')
+    thread = client.get(f'/evaluations/{root}', headers=su).get_json()['data']
+    assert [r['id'] for r in thread['replies']] == [second]
+    # 下级随之删除，不能再被回复
+    body = client.post(f'/evaluations/{nested}/reply', json={'content': 'x'}, headers=su).get_json()
+    assert body['code'] == 404
+
+
+def test_refresh_stats_skips_descendants_of_deleted_replies(app, client, su, board):
+    """级联删除之前留下的数据：只有中间一层标记了删除，重算时整棵子树都不计入。"""
+    from app.services.evaluation_threads import refresh_reply_stats
+
+    school_id, hs, cat = board
+    root = post(client, hs, '/evaluations', '评价', category_id=cat)
+    first = post(client, hs, f'/evaluations/{root}/student-reply', '回复一')
+    post(client, su, f'/evaluations/{first}/reply', '回复一的下级')
+    post(client, su, f'/evaluations/{root}/reply', '回复二')
+    with app.app_context():
+        db.session.execute(update(Evaluation).where(Evaluation.id == first).values(is_deleted=True))
+        refresh_reply_stats([root])
+        db.session.commit()
+    assert stats_of(client, su, school_id, root) == (1, 'root')
+
+
+def _chain(client, su, hs, cat, length):
+    """一条评价及其下 length 层逐级回复，返回 ID 列表（从顶层评价开始）。"""
+    ids = [post(client, hs, '/evaluations', '评价', category_id=cat)]
+    for i in range(length):
+        ids.append(post(client, su, f'/evaluations/{ids[-1]}/reply', f'第{i + 1}层'))
+    return ids
+
+
+def _depths(node):
+    """沿第一个回复往下的各层 ID。"""
+    ids = []
+    while node:
+        ids.append(node['id'])
+        node = node['replies'][0] if node['replies'] else None
+    return ids
+
+
+def test_thread_loads_in_fixed_queries_regardless_of_depth(client, su, board, count_queries):
+    _, hs, cat = board
+    shallow, deep = _chain(client, su, hs, cat, 2), _chain(client, su, hs, cat, 8)
+    post(client, su, f'/evaluations/{deep[3]}/reply', '分支')
+
+    def load(root, **args):
+        with count_queries() as counter:
+            body = client.get(f'/evaluations/{root}', query_string=args, headers=su).get_json()
+        assert body['success'], body
+        return body['data'], len(counter)
+
+    (s_tree, s_queries), (d_tree, d_queries) = load(shallow[0]), load(deep[0])
+    assert _depths(s_tree) == shallow and _depths(d_tree) == deep
+    assert s_queries == d_queries
+    branch = d_tree['replies'][0]['replies'][0]['replies'][0]
+    assert [r['content'] for r in branch['replies']] == ['第4层', '分支']
+
+    assert _depths(load(deep[0], depth=2)[0]) == deep[:3]
+    # 从中间的回复开始取子树
+    assert _depths(load(deep[5])[0]) == deep[5:]
+
+
+def test_thread_of_deleted_or_missing_evaluation_is_not_found(client, su, board):
+    _, hs, cat = board
+    ids = _chain(client, su, hs, cat, 2)
+    assert client.get(f'/evaluations/{ids[0]}', query_string={'depth': -1}, headers=su).get_json()['code'] == 400
+    assert client.delete(f'/evaluations/{ids[0]}', headers=su).get_json()['success']
+    for eid in ids:
+        assert client.get(f'/evaluations/{eid}', headers=su).get_json()['code'] == 404
@@ -0,0 +1,45 @@
+# tests/test_headcounts.py
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.headcount import SchoolHeadcount, SchoolLeaveDelta
+from app.services.headcounts import HeadcountDelta, compact_leave_deltas
+from app.utils.tz import now_local
+
+
+def test_compaction_keeps_stats_from_cutoff_on(app, client, su, make_school, make_student):
+    school_id = make_school()['id']
+    for n in ('01', '02', '03'):
+        make_student(school_id, n)
+    today = now_local().date()
+    with app.app_context():
+        delta = HeadcountDelta()
+        delta.add_leave(school_id, today - timedelta(days=10), today + timedelta(days=2), 1)
+        delta.add_leave(school_id, today - timedelta(days=5), today - timedelta(days=3), 1)
+        delta.add_leave(school_id, today - timedelta(days=1), today + timedelta(days=5), 1)
+        delta.flush()
+        db.session.commit()
+
+    first, last = today - timedelta(days=2), today + timedelta(days=7)
+
+    def stats():
+        days = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+        daily = [client.get('/students/stats', query_string={'date': d, 'school_id': school_id},
+                            headers=su).get_json()['data'] for d in days]
+        matrix = client.get('/students/stats/range', headers=su, query_string={
+            'start': first.isoformat(), 'end': last.isoformat(), 'school_id': school_id}).get_json()['data']
+        return daily, matrix['schools']
+
+    before = stats()
+    assert [d['not_eating_count'] for d in before[0]][:5] == [1, 2, 2, 2, 2]
+
+    with app.app_context():
+        assert compact_leave_deltas(first) > 0
+        db.session.commit()
+        assert compact_leave_deltas(first) == 0
+        rows = db.session.execute(select(SchoolLeaveDelta.day).where(SchoolLeaveDelta.school_id == school_id)).scalars()
+        assert all(day > first for day in rows)
+        assert db.session.get(SchoolHeadcount, school_id).on_leave == 1
+    assert stats() == before
@@ -0,0 +1,29 @@
+# tests/test_pagination.py
+import pytest
+from sqlalchemy import inspect
+
+from app.extensions import db
+
+
+@pytest.mark.parametrize('table', ['students', 'evaluations', 'schools', 'admins'])
+def test_keyset_tables_have_created_id_index(ctx, table):
+    indexes = {ix['name']: ix['column_names'] for ix in inspect(db.engine).get_indexes(table)}
+    assert indexes[f'ix_{table}_created_id'] == ['created_at', 'id']
+
+
+@pytest.mark.parametrize('path', ['/schools', '/admins'])
+def test_cursor_walks_every_row_once(client, su, make_school, make_admin, path):
+    school_id = make_school()['id']
+    for _ in range(3):
+        make_school()
+        make_admin([school_id])
+    full = client.get(path, query_string={'size': 1000}, headers=su).get_json()['data']['records']
+
+    seen, cursor = [], ''
+    while True:
+        data = client.get(path, query_string={'size': 2, 'cursor': cursor}, headers=su).get_json()['data']
+        seen += [r['id'] for r in data['records']]
+        if not data['has_more']:
+            break
+        cursor = data['next_cursor']
+    assert seen == [r['id'] for r in full]
@@ -0,0 +1,116 @@
+# tests/test_schema_compiler.py
+"""编译后的 dump 函数与 marshmallow 的输出逐项比对。"""
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace as NS
+
+import pytest
+from marshmallow import fields
+
+from app.schemas.admin import AdminShowSchema
+from app.schemas.base import BaseSchema
+from app.schemas.compiler import compile_schema
+from app.schemas.evaluation import EvaluationSchema, EvaluationListSchema
+from app.schemas.school import SchoolOutSchema
+from app.schemas.student import StudentSchema
+
+NOW = datetime(2026, 3, 4, 5, 6, 7, 890, tzinfo=timezone(timedelta(hours=8)))
+SCHOOL = NS(id='s1', name='一中', alias='YZ', created_at=NOW, updated_at=NOW)
+
+
+def student(**kw):
+    values = dict(id=1, name='张三', student_number='01', account='YZ01', is_eating=True,
+                  leave_start_date=date(2026, 3, 5), leave_end_date=date(2026, 3, 6),
+                  created_at=NOW, updated_at=NOW.replace(tzinfo=None), school=SCHOOL)
+    return NS(**{**values, **kw})
+
+
+def evaluation(**kw):
+    reply = NS(id=2, content='收到', created_at=NOW, school=None, category=None, student=None,
+               admin=NS(id='a1', display_name='管理员'), replies=[])
+    values = dict(id=1, content='好吃', created_at=NOW, school=SCHOOL, category=NS(id=3, name='饭菜'),
+                  student=NS(id=1, name='张三'), admin=None, replies=[reply],
+                  reply_count=1, last_reply_at=NOW, last_reply_by='管理员')
+    return NS(**{**values, **kw})
+
+
+def admin(**kw):
+    values = dict(id='a1', account='acc', display_name='管理员', created_at=NOW, updated_at=None,
+                  school_maps=[NS(school_id='s1', is_deleted=False), NS(school_id='s2', is_deleted=True)])
+    return NS(**{**values, **kw})
+
+
+CASES = [
+    (StudentSchema, student()),
+    (StudentSchema, student(leave_start_date=None, leave_end_date=None, school=None)),
+    # 类型不规范的值：与 marshmallow 一样做转换
+    (StudentSchema, student(id='7', name=123, is_eating=0, student_number=None)),
+    # 缺少的属性不输出
+    (StudentSchema, NS(id=1, name='只有姓名')),
+    (SchoolOutSchema, SCHOOL),
+    (SchoolOutSchema, NS(id='s2', name=None, alias='EZ', created_at=None, updated_at=NOW)),
+    (EvaluationSchema, evaluation()),
+    (EvaluationSchema, evaluation(school=None, category=None, student=None, replies=[])),
+    (EvaluationListSchema, evaluation()),
+    (EvaluationListSchema, evaluation(reply_count=0, last_reply_at=None, last_reply_by=None)),
+    (AdminShowSchema, admin()),
+    (AdminShowSchema, admin(display_name=None, school_maps=[])),
+]
+
+
+@pytest.mark.parametrize('schema_cls, obj', CASES)
+def test_matches_marshmallow(schema_cls, obj):
+    assert compile_schema(schema_cls)(obj) == schema_cls().dump(obj)
+
+
+@pytest.mark.parametrize('schema_cls, obj', CASES)
+def test_many_matches_marshmallow(schema_cls, obj):
+    assert compile_schema(schema_cls, many=True)([obj, obj]) == schema_cls(many=True).dump([obj, obj])
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'only': ('id', 'school')},
+    {'only': ('id', 'school.name')},
+    {'exclude': ('created_at', 'school')},
+    {'exclude': ('school.alias',)},
+])
+def test_only_and_exclude(kwargs):
+    schema = StudentSchema(**kwargs)
+    assert compile_schema(schema)(student()) == schema.dump(student())
+
+
+def test_nested_replies_are_recursive():
+    deep = evaluation()
+    deep.replies[0].replies = [evaluation(id=9, replies=[])]
+    assert compile_schema(EvaluationSchema)(deep) == EvaluationSchema().dump(deep)
+
+
+class FormatsSchema(BaseSchema):
+    day = fields.Date()
+    custom_day = fields.Date(format='%d/%m/%Y')
+    iso = fields.DateTime(format='iso')
+    stamp = fields.DateTime(format='timestamp')
+    custom = fields.DateTime(format='%H:%M')
+    plain = fields.DateTime()
+    days = fields.List(fields.Date())
+    tags = fields.List(fields.Str())
+
+
+@pytest.mark.parametrize('obj', [
+    NS(day=date(2026, 1, 2), custom_day=date(2026, 1, 2), iso=NOW, stamp=NOW, custom=NOW, plain=NOW,
+       days=[date(2026, 1, 2), None], tags=['a', 1]),
+    # Date 字段拿到 datetime 时只输出日期部分
+    NS(day=NOW, custom_day=None, iso=None, stamp=None, custom=None, plain=None, days=[], tags=None),
+])
+def test_date_and_datetime_formats(obj):
+    assert compile_schema(FormatsSchema)(obj) == FormatsSchema().dump(obj)
+
+
+def test_orm_instances(app, make_school, make_student):
+    from app.extensions import db
+    from app.models import Student
+
+    school = make_school()
+    ids = [make_student(school['id'], n)['id'] for n in ('01', '02')]
+    with app.app_context():
+        rows = db.session.execute(db.select(Student).where(Student.id.in_(ids))).scalars().all()
+        assert compile_schema(StudentSchema, many=True)(rows) == StudentSchema(many=True).dump(rows)
@@ -0,0 +1,55 @@
+# tests/test_security.py
+import threading
+import time
+
+import pytest
+from flask import g
+
+from app.utils.exceptions import HashBusyError
+from app.utils.security import HashExecutor
+
+
+@pytest.fixture
+def executor(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_MAX_QUEUE', 1)
+    return HashExecutor()
+
+
+def test_map_respects_queue_bound(app, executor):
+    release, started = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    def occupy():
+        with app.app_context():
+            executor.run(block)
+
+    # 占满 1 个 worker + 1 个排队名额
+    holders = [threading.Thread(target=occupy) for _ in range(2)]
+    for t in holders:
+        t.start()
+    started.wait(5)
+    for _ in range(500):
+        if executor.stats()['pending'] == 2:
+            break
+        time.sleep(0.01)
+    try:
+        with app.app_context(), pytest.raises(HashBusyError):
+            executor.map(str, [1, 2, 3])
+        assert executor.stats()['rejected'] == 1
+    finally:
+        release.set()
+        for t in holders:
+            t.join()
+    assert executor.stats()['pending'] == 0
+
+
+def test_map_records_queue_wait(app, executor):
+    with app.app_context():
+        assert executor.map(str, [1, 2, 3]) == ['1', '2', '3']
+        assert g.hash_queue_wait_ms > 0
+    stats = executor.stats()
+    assert stats['submitted'] == 3 and stats['max_wait_ms'] > 0 and stats['pending'] == 0
@@ -0,0 +1,70 @@
+# tests/test_snapshots.py
+from datetime import timedelta
+
+from app.extensions import db
+from app.models.roster_snapshot import RosterSnapshot
+from app.models.student_leave import StudentLeave
+from app.services.snapshots import roster_snapshots
+from app.utils.tz import now_local
+
+
+def _stats(client, su, school_id, day):
+    args = {'date': day.isoformat(), 'school_id': school_id}
+    return client.get('/students/stats', query_string=args, headers=su).get_json()['data']
+
+
+def _on_leave(client, su, school_id, day):
+    args = {'date': day.isoformat(), 'school_id': school_id, 'size': 10}
+    return sorted(r['id'] for r in client.get('/students', query_string=args, headers=su).get_json()['data']['records'])
+
+
+def test_past_day_reads_frozen_roster(app, client, su, make_school, make_student):
+    school_id = make_school()['id']
+    a, b, c, d = (make_student(school_id, f'0{i}', is_eating=i % 2 == 0)['id'] for i in range(4))
+    today = now_local().date()
+    yesterday = today - timedelta(days=1)
+    with app.app_context():
+        for sid in (c, d):
+            db.session.add(StudentLeave(student_id=sid, school_id=school_id, start_date=yesterday, end_date=yesterday))
+        db.session.commit()
+        assert roster_snapshots.take(yesterday, [school_id]) == 1
+        snap = db.session.get(RosterSnapshot, (school_id, yesterday))
+        assert (snap.total, snap.eating, snap.not_eating, snap.on_leave) == (4, 1, 2, 1)
+
+    frozen = {'total_students': 4, 'eating_count': 1, 'not_eating_count': 3}
+    assert _stats(client, su, school_id, yesterday) == frozen
+    assert _on_leave(client, su, school_id, yesterday) == [c, d]
+
+    # 之后的修改不影响过去日期，只影响今天
+    client.put(f'/students/{a}', json={'is_eating': False}, headers=su)
+    make_student(school_id, '09')
+    with app.app_context():
+        StudentLeave.query.filter(StudentLeave.student_id == c).update({'is_deleted': True})
+        db.session.commit()
+    assert _stats(client, su, school_id, yesterday) == frozen
+    assert _on_leave(client, su, school_id, yesterday) == [c, d]
+    assert _stats(client, su, school_id, today) == {'total_students': 5, 'eating_count': 2, 'not_eating_count': 3}
+
+    matrix = client.get('/students/stats/range', headers=su, query_string={
+        'start': yesterday.isoformat(), 'end': today.isoformat(), 'school_id': school_id}).get_json()['data']
+    row = matrix['schools'][0]
+    assert (row['eating'], row['not_eating']) == ([1, 2], [3, 3])
+
+
+def test_scheduler_fills_missing_schools_after_cutoff(app, make_school, monkeypatch):
+    school_id = make_school()['id']
+    today = now_local().date()
+    with app.app_context():
+        monkeypatch.setitem(app.config, 'ROSTER_SNAPSHOT_CUTOFF', '23:59')
+        if now_local().strftime('%H:%M') < '23:59':
+            roster_snapshots._tick()
+            assert db.session.get(RosterSnapshot, (school_id, today)) is None
+
+        monkeypatch.setitem(app.config, 'ROSTER_SNAPSHOT_CUTOFF', '00:00')
+        roster_snapshots._tick()
+        first = db.session.get(RosterSnapshot, (school_id, today))
+        assert first is not None
+        created_at = first.created_at
+        db.session.expire_all()
+        roster_snapshots._tick()
+        assert db.session.get(RosterSnapshot, (school_id, today)).created_at == created_at
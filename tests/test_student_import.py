@@ -0,0 +1,102 @@
+# tests/test_student_import.py
+import json
+
+import pytest
+
+from app.utils.tz import now_local
+from tests.conftest import login
+
+
+@pytest.fixture
+def small_batches(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'BULK_IMPORT_BATCH_SIZE', 2)
+
+
+def _stats(client, su, school_id):
+    args = {'date': now_local().date().isoformat(), 'school_id': school_id}
+    return client.get('/students/stats', query_string=args, headers=su).get_json()['data']
+
+
+def test_csv_import_reports_each_bad_line(client, su, make_school, make_student, small_batches):
+    school = make_school()
+    make_student(school['id'], '09')
+    body = '\n'.join([
+        '姓名,学号,学校ID,就餐',
+        f"张三,01,{school['id']},是",
+        f"李四,02,{school['id']},否",
+        f",03,{school['id']},是",
+        f"王五,01,{school['id']},是",   # 与第 2 行重复（跨批）
+        f"赵六,09,{school['id']},是",   # 库中已存在
+    ])
+    report = client.post('/students/bulk', data=body.encode(), content_type='text/csv', headers=su).get_json()['data']
+
+    assert (report['total'], report['created'], report['failed']) == (5, 2, 3)
+    assert [(e['line'], e['student_number']) for e in report['errors']] == [(4, '03'), (5, '01'), (6, '09')]
+    assert report['errors'][1]['msg'] == '导入数据中学号重复'
+    assert report['errors'][2]['msg'] == '该学校下学号已存在'
+    assert _stats(client, su, school['id']) == {'total_students': 3, 'eating_count': 2, 'not_eating_count': 1}
+    # 未填密码的学生用空密码登录
+    login(client, school['alias'] + '01', password='', user_type='student')
+
+
+def test_ndjson_import_with_default_school_and_scope(client, su, make_school, make_admin):
+    mine, other = make_school(), make_school()
+    _, headers = make_admin([mine['id']])
+    lines = [
+        json.dumps({'name': '甲', 'student_number': '01'}),
+        'not json',
+        json.dumps(['list']),
+        json.dumps({'name': '乙', 'student_number': '02', 'school_id': other['id']}),
+        json.dumps({'name': '丙', 'student_number': '03', 'password': 'pw123456'}),
+    ]
+    r = client.post('/students/bulk', query_string={'school_id': mine['id']},
+                    data='\n'.join(lines).encode(), content_type='application/x-ndjson', headers=headers)
+    report = r.get_json()['data']
+
+    assert (report['created'], report['failed']) == (2, 3)
+    assert [e['msg'] for e in report['errors']] == ['不是合法的 JSON', '每行必须是一个 JSON 对象', '无权在该学校下创建学生']
+    assert _stats(client, su, mine['id'])['total_students'] == 2
+    assert _stats(client, su, other['id'])['total_students'] == 0
+    login(client, mine['alias'] + '03', password='pw123456', user_type='student')
+
+    r = client.post('/students/bulk', query_string={'school_id': other['id']}, data=b'', headers=headers)
+    assert r.get_json()['code'] == 403
+
+
+def test_import_stops_at_max_rows(app, client, su, make_school, monkeypatch, small_batches):
+    monkeypatch.setitem(app.config, 'BULK_IMPORT_MAX_ROWS', 3)
+    school = make_school()
+    lines = [json.dumps({'name': f's{i}', 'student_number': f'0{i}'}) for i in range(5)]
+    report = client.post('/students/bulk', query_string={'school_id': school['id']},
+                         data='\n'.join(lines).encode(), headers=su).get_json()['data']
+    assert report['truncated'] and (report['total'], report['created']) == (3, 3)
+
+
+def test_busy_hash_pool_returns_partial_report(app, client, su, make_school, monkeypatch, small_batches):
+    from app.services import student_import
+    from app.utils.exceptions import HashBusyError
+
+    real, calls = student_import.hash_passwords, []
+
+    def flaky(raws):
+        calls.append(raws)
+        if len(calls) == 2:
+            raise HashBusyError()
+        return real(raws)
+
+    monkeypatch.setattr(student_import, 'hash_passwords', flaky)
+    school = make_school()
+    rows = [json.dumps({'name': f's{i}', 'student_number': f'0{i}', 'password': 'pw123456'}) for i in range(6)]
+    r = client.post('/students/bulk', query_string={'school_id': school['id']},
+                    data='\n'.join(rows).encode(), headers=su)
+    report = r.get_json()['data']
+
+    assert r.status_code == 200 and report['truncated']
+    assert (report['total'], report['created'], report['failed']) == (4, 2, 2)
+    assert [(e['line'], e['msg']) for e in report['errors']] == [(3, '系统繁忙，请稍后重试'), (4, '系统繁忙，请稍后重试')]
+    assert _stats(client, su, school['id'])['total_students'] == 2
+
+    # 从第一条失败的行重试，不会与已提交的批次冲突
+    report = client.post('/students/bulk', query_string={'school_id': school['id']},
+                         data='\n'.join(rows[2:]).encode(), headers=su).get_json()['data']
+    assert (report['created'], report['failed']) == (4, 0)
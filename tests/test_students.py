@@ -0,0 +1,70 @@
+# tests/test_students.py
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.student_leave import StudentLeave
+from app.utils.tz import now_local
+
+
+def test_leave_filter_total_follows_student_leaves(app, client, su, make_school, make_student):
+    school = make_school()
+    students = [make_student(school['id'], f'0{i}') for i in range(3)]
+    today = now_local().date().isoformat()
+    for s in students[:2]:
+        body = client.put(f"/students/{s['id']}", json={'leave_start_date': today, 'leave_end_date': today},
+                          headers=su).get_json()
+        assert body['success'], body
+
+    def total():
+        args = {'school_id': school['id'], 'date': today, 'size': 1}
+        return client.get('/students', query_string=args, headers=su).get_json()['data']['total']
+
+    assert total() == 2
+    # 只写请假表、不改 students 的写入（如其他 worker 的批量请假）也要让缓存的总数失效
+    with app.app_context():
+        db.session.add(StudentLeave(student_id=students[2]['id'], school_id=school['id'],
+                                    start_date=now_local().date(), end_date=now_local().date()))
+        db.session.commit()
+    assert total() == 3
+
+
+def _not_eating(client, su, school_id, day):
+    return client.get('/students/stats', query_string={'date': day.isoformat(), 'school_id': school_id},
+                      headers=su).get_json()['data']['not_eating_count']
+
+
+def test_admin_leave_never_rewrites_past_days(app, client, su, make_school, make_student):
+    school_id = make_school()['id']
+    one, two = make_student(school_id, '01'), make_student(school_id, '02')
+    today = now_local().date()
+    past, future = today - timedelta(days=3), today + timedelta(days=2)
+
+    body = client.put(f"/students/{one['id']}", headers=su, json={
+        'leave_start_date': past.isoformat(), 'leave_end_date': future.isoformat()}).get_json()
+    assert body['success'], body
+    body = client.put('/students/bulk/leave', headers=su, json={
+        'ids': [two['id']], 'leave_start_date': past.isoformat(), 'leave_end_date': future.isoformat()}).get_json()
+    assert body['data']['affected'] == 1
+
+    assert _not_eating(client, su, school_id, past) == 0
+    assert _not_eating(client, su, school_id, today) == 2
+    assert _not_eating(client, su, school_id, future) == 2
+    with app.app_context():
+        starts = db.session.execute(select(StudentLeave.start_date).where(
+            StudentLeave.student_id.in_([one['id'], two['id']]), StudentLeave.is_deleted.is_(False))).scalars()
+        assert list(starts) == [today, today]
+
+
+def test_admin_leave_entirely_in_the_past_is_rejected(app, client, su, make_school, make_student):
+    school_id = make_school()['id']
+    s = make_student(school_id, '01')
+    past = (now_local().date() - timedelta(days=1)).isoformat()
+    leave = {'leave_start_date': past, 'leave_end_date': past}
+
+    for path, payload in ((f"/students/{s['id']}", leave), ('/students/bulk/leave', {'ids': [s['id']], **leave})):
+        body = client.put(path, json=payload, headers=su).get_json()
+        assert body['code'] == 400 and not body['success'], body
+    with app.app_context():
+        assert db.session.execute(select(StudentLeave.id).where(StudentLeave.student_id == s['id'])).first() is None
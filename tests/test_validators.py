@@ -0,0 +1,125 @@
+# tests/test_validators.py
+"""CompiledLoader 与直接 schema.load() 的结果与错误信息逐项比对。"""
+import pytest
+from marshmallow import fields, ValidationError
+
+from app.schemas import validators
+from app.schemas.admin import AdminUpdateSchema
+from app.schemas.base import BaseSchema
+from app.schemas.evaluation import EvaluationCategorySchema, EvaluationCreateSchema, StudentEvaluationCreateSchema
+from app.schemas.profile import ProfileUpdateSchema
+from app.schemas.school import SchoolCreateSchema, SchoolUpdateSchema
+from app.schemas.student import (StudentCreateSchema, StudentUpdateSchema, StudentLeaveSchema,
+                                 StudentBulkLeaveSchema, StudentBulkEatingSchema, StudentCheckinSchema)
+from app.schemas.validators import CompiledLoader
+
+
+def outcome(load, data, **kw):
+    try:
+        return 'ok', load(data, **kw)
+    except ValidationError as err:
+        return 'error', err.normalized_messages()
+
+
+def assert_same(schema_cls, data, **kw):
+    assert outcome(CompiledLoader(schema_cls()).load, data, **kw) == outcome(schema_cls().load, data, **kw)
+
+
+CASES = {
+    StudentCreateSchema: [
+        {'name': '张三', 'student_number': '01', 'school_id': 's1'},
+        {'name': '张三', 'student_number': '01', 'school_id': 's1', 'is_eating': False, 'password': None},
+        {'name': '', 'student_number': '01', 'school_id': 's1'},
+        {'name': None, 'student_number': 1, 'school_id': 's1'},
+        {'student_number': '01', 'is_eating': 'yes', 'extra': 1},
+    ],
+    StudentUpdateSchema: [
+        {'leave_start_date': '2026-03-04', 'leave_end_date': None},
+        {'leave_start_date': '2026-3-4'},
+        {'leave_start_date': '2026-02-30'},
+        {'leave_start_date': '2026-03-04T10:00:00'},
+        {'is_eating': 1, 'name': 'x' * 65},
+    ],
+    StudentLeaveSchema: [
+        {'leave_start_date': '2026-03-04', 'leave_end_date': '2026-03-05'},
+        {'leave_start_date': '2026-03-05', 'leave_end_date': '2026-03-04'},
+        {'leave_start_date': '2026-03-05'},
+    ],
+    StudentBulkLeaveSchema: [
+        {'school_id': 's1', 'leave_start_date': None, 'leave_end_date': None},
+        {'ids': [1, 2], 'leave_start_date': '2026-03-04', 'leave_end_date': None},
+        {'kw': ' ', 'leave_start_date': '2026-03-04', 'leave_end_date': '2026-03-04'},
+        {'ids': [], 'leave_start_date': '2026-03-04', 'leave_end_date': '2026-03-04'},
+    ],
+    StudentBulkEatingSchema: [
+        {'ids': [1, '2'], 'is_eating': True},
+        {'ids': [1, 'x'], 'is_eating': True},
+        {'school_id': 's1'},
+    ],
+    StudentCheckinSchema: [
+        {'school_id': 's1', 'ids': [1, 2, 3]},
+        {'school_id': None, 'ids': []},
+        {'school_id': 's1', 'ids': 5},
+    ],
+    SchoolCreateSchema: [
+        {'name': '一中', 'alias': 'YZ'},
+        {'name': '一中', 'alias': '1Z'},
+        {'alias': 'YZ'},
+    ],
+    SchoolUpdateSchema: [{'alias': 'EZ'}, {'name': ''}],
+    AdminUpdateSchema: [
+        {'account': 'a1', 'display_name': 'A', 'school_ids': ['s1'], 'password': '  '},
+        {'account': 'a1', 'display_name': 'A', 'school_ids': []},
+    ],
+    ProfileUpdateSchema: [
+        {'name': '张三', 'password': '', 'current_password': ' '},
+        {'name': '张三', 'password': 'new'},
+        {'name': '张三', 'password': 'new', 'current_password': 'old'},
+    ],
+    EvaluationCategorySchema: [{'name': '饭菜'}, {'name': ''}],
+    EvaluationCreateSchema: [{'content': '好'}, {'content': ''}, {}],
+    StudentEvaluationCreateSchema: [{'content': '好', 'category_id': 1}, {'content': '好', 'category_id': '1'},
+                                    {'content': '好', 'category_id': True}],
+}
+
+
+@pytest.mark.parametrize('schema_cls, data', [(cls, data) for cls, rows in CASES.items() for data in rows])
+def test_matches_schema_load(schema_cls, data):
+    assert_same(schema_cls, data)
+
+
+@pytest.mark.parametrize('partial', [True, ('name',)])
+def test_partial(partial):
+    assert_same(StudentCreateSchema, {'student_number': '01'}, partial=partial)
+
+
+def test_load_many_reports_each_row():
+    rows = CASES[StudentCreateSchema]
+    loader = CompiledLoader(StudentCreateSchema())
+    assert loader.load_many(rows) == [
+        (value, None) if kind == 'ok' else (None, value)
+        for kind, value in (outcome(StudentCreateSchema().load, r) for r in rows)
+    ]
+
+
+class FormattedDateSchema(BaseSchema):
+    day = fields.Date(format='%d/%m/%Y')
+    days = fields.List(fields.Date(format='%d/%m/%Y'))
+
+
+@pytest.mark.parametrize('data', [
+    {'day': '04/03/2026', 'days': ['05/03/2026']},
+    # ISO 字符串不符合字段声明的格式，必须报错而不是被快速路径接受
+    {'day': '2026-03-04'},
+    {'days': ['2026-03-04']},
+])
+def test_date_format_is_honored(data):
+    assert_same(FormattedDateSchema, data)
+
+
+def test_falls_back_without_private_api(monkeypatch):
+    monkeypatch.setattr(validators, '_PRIVATE_API', validators._PRIVATE_API + ('_missing_in_this_version',))
+    loader = CompiledLoader(StudentLeaveSchema())
+    assert not loader._enabled
+    for data in CASES[StudentLeaveSchema]:
+        assert outcome(loader.load, data) == outcome(StudentLeaveSchema().load, data)
@@ -0,0 +1,62 @@
+# tests/test_versions.py
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Student
+from app.models.table_version import TableVersion
+from app.services.versions import table_versions
+
+
+def stored_version(name):
+    # 另开连接读取，看到的是已提交的值
+    with db.engine.connect() as conn:
+        return conn.execute(select(TableVersion.version).where(TableVersion.name == name)).scalar() or 0
+
+
+def test_versions_are_bumped_after_commit(app, make_school, count_queries):
+    school_id = make_school()['id']
+    name = f'students:{school_id}'
+    with app.app_context():
+        before = stored_version(name)
+
+        db.session.add(Student(name='a', student_number='01', school_id=school_id))
+        db.session.flush()
+        assert stored_version(name) == before  # 业务事务内不写 table_versions
+        db.session.rollback()
+        assert stored_version(name) == before
+
+        with count_queries() as counter:
+            db.session.add(Student(name='b', student_number='02', school_id=school_id))
+            db.session.add(Student(name='c', student_number='03', school_id=school_id))
+            db.session.commit()
+        bumps = [sql for sql in counter.statements if sql.startswith('UPDATE table_versions')]
+        assert len(bumps) == 1  # 一次提交涉及的名字合并为一条自增
+        assert stored_version(name) == before + 1
+        assert table_versions.scoped('students', school_id)[1] == before + 1
+
+
+def test_savepoint_does_not_flush_pending_versions(app, make_school):
+    school_id = make_school()['id']
+    name = f'students:{school_id}'
+    with app.app_context():
+        before = stored_version(name)
+        db.session.add(Student(name='a', student_number='01', school_id=school_id))
+        with db.session.begin_nested():
+            db.session.flush()
+        assert stored_version(name) == before
+        db.session.commit()
+        assert stored_version(name) == before + 1
+
+
+def test_if_none_match_returns_empty_304(client, su, make_admin):
+    first = client.get('/evaluations/categories', headers=su)
+    assert first.status_code == 200 and first.headers.get('ETag')
+
+    again = client.get('/evaluations/categories', headers={**su, 'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    # 换一个身份，ETag 不同，不能命中
+    _, headers = make_admin([], 'etag')
+    other = client.get('/evaluations/categories', headers={**headers, 'If-None-Match': first.headers['ETag']})
+    assert other.status_code == 200